@@ -1,6 +1,8 @@
+import asyncio
 import logging
+import signal
 
-from flask_bcrypt import Bcrypt
+import click
 from pydantic import ValidationError
 from quart import Quart
 from quart.typing import ResponseReturnValue
@@ -8,17 +10,36 @@ from quart_jwt_extended import JWTManager
 from quart_schema import Info, QuartSchema, RequestSchemaValidationError, ResponseSchemaValidationError
 from werkzeug.exceptions import HTTPException
 
+from ads_directory import cache, startup
+from ads_directory.blueprints.admin import bp as admin_bp
 from ads_directory.blueprints.category import bp as category_bp
 from ads_directory.blueprints.custom_fields import bp as custom_fields_bp
+from ads_directory.blueprints.jobs import bp as jobs_bp
 from ads_directory.blueprints.listing import bp as listing_bp
+from ads_directory.commands.import_listings import DEFAULT_BATCH_SIZE, FORMATS, import_file
+from ads_directory.commands.rebuild_read_model import DEFAULT_BATCH_SIZE as REBUILD_BATCH_SIZE
+from ads_directory.commands.rebuild_read_model import rebuild_read_model
 from ads_directory.commands.seed import seed_data
-from ads_directory.config import settings
+from ads_directory.commands.synthetic_data import DEFAULT_BATCH_SIZE as SEED_BATCH_SIZE
+from ads_directory.commands.synthetic_data import DEFAULT_CATEGORIES, seed_scale
+from ads_directory.config import get_settings
+from ads_directory.database import instrumentation, routing
+from ads_directory.database.connection import (
+    dispose_engine,
+    get_engine,
+    init_engine,
+    replica_engines,
+    replica_uris,
+    warm_up_pool,
+)
+from ads_directory.jobs import JOB_TYPES, Worker
 from ads_directory.routes import bp
 
 logger = logging.getLogger(__name__)
 
 
 def create_app() -> Quart:
+    settings = get_settings()
     app = Quart(__name__)
     # load the settings from the config file
     app.config.from_object(settings.quart)
@@ -27,10 +48,39 @@ def create_app() -> Quart:
     app.register_blueprint(category_bp, url_prefix=f"{settings.base_path}/categories")
     app.register_blueprint(custom_fields_bp, url_prefix=f"{settings.base_path}/custom-fields")
     app.register_blueprint(listing_bp, url_prefix=f"{settings.base_path}/listings")
+    app.register_blueprint(admin_bp, url_prefix=f"{settings.base_path}/admin")
+    app.register_blueprint(jobs_bp, url_prefix=f"{settings.base_path}/jobs")
 
-    Bcrypt(app)
     JWTManager(app)
 
+    if settings.instrumentation.ENABLED:
+        instrumentation.init_app(app, settings.instrumentation.N_PLUS_ONE_THRESHOLD)
+
+    if replica_uris(settings.database):
+        routing.init_app(app, settings.database.READ_YOUR_WRITES_WINDOW)
+
+    @app.before_serving
+    async def start_database() -> None:
+        with startup.phase("init_engine"):
+            init_engine(settings.database)
+            if settings.instrumentation.ENABLED:
+                for target in [get_engine(), *replica_engines]:
+                    instrumentation.instrument_engine(target)
+        with startup.phase("warm_up"):
+            await warm_up_pool(settings.database.POOL_WARM_UP)
+
+    # registered after start_database, its listener starts once the database is up
+    cache.init_app(app)
+
+    @app.before_serving
+    async def ready() -> None:
+        startup.mark_ready(settings.startup.READY_DIR)
+
+    @app.after_serving
+    async def stop_database() -> None:
+        startup.mark_stopping(settings.startup.READY_DIR)
+        await dispose_engine()
+
     QuartSchema(
         app,
         info=Info(title="Ads Directory", version="0.0.1"),
@@ -66,10 +116,66 @@ def create_app() -> Quart:
         return {"error": message}, status_code
 
     @app.cli.command("seed-db")
-    def seed_db():
-        """Seed the database with dummy data."""
+    @click.option("--scale", type=int, default=0, help="Also generate that many synthetic listings.")
+    @click.option("--seed", type=int, default=0, show_default=True, help="The random seed of the generated listings.")
+    @click.option("--categories", type=int, default=DEFAULT_CATEGORIES, show_default=True)
+    @click.option("--batch-size", type=int, default=SEED_BATCH_SIZE, show_default=True)
+    def seed_db(scale: int, seed: int, categories: int, batch_size: int):
+        """Seed the database with dummy data, and with --scale a benchmark database."""
+        init_engine(settings.database)
         seed_data()
         print("Database seeded with dummy data.")
+        if scale > 0:
+            written = seed_scale(scale, seed, categories, batch_size)
+            print(f"Generated {written} listings in {categories} categories.")
+
+    @app.cli.command("import-listings")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(FORMATS), default="ndjson", show_default=True)
+    @click.option("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, show_default=True)
+    def import_listings_command(path: str, fmt: str, batch_size: int):
+        """Import a ndjson or csv feed of listings."""
+        init_engine(settings.database)
+        report = import_file(path, fmt, batch_size)
+        for error in report.errors:
+            print(f"line {error.line}: {error.error}")
+        print(f"Imported {report.imported} listings, {report.failed} rows failed.")
+
+    @app.cli.command("run-worker")
+    @click.option("--types", default="", help="Comma separated job types to run, all of them by default.")
+    @click.option("--slots", type=int, default=settings.jobs.WORKER_SLOTS, show_default=True)
+    def run_worker_command(types: str, slots: int):
+        """Run the background jobs until SIGTERM or SIGINT, then let the running ones finish."""
+        names = [name for name in types.split(",") if name] or list(JOB_TYPES)
+        unknown = [name for name in names if name not in JOB_TYPES]
+        if unknown:
+            raise click.BadParameter(f"Unknown job types {', '.join(unknown)}", param_hint="--types")
+        init_engine(settings.database)
+        worker = Worker(
+            {name: JOB_TYPES[name] for name in names},
+            slots=slots,
+            poll_interval=settings.jobs.POLL_INTERVAL,
+            lease=settings.jobs.LEASE,
+            backoff_base=settings.jobs.BACKOFF_BASE,
+            backoff_max=settings.jobs.BACKOFF_MAX,
+        )
+
+        async def run() -> None:
+            stop = asyncio.Event()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+            await worker.run(stop)
+
+        asyncio.run(run())
+
+    @app.cli.command("rebuild-read-model")
+    @click.option("--missing", is_flag=True, help="Only write the documents of the listings without one.")
+    @click.option("--batch-size", type=int, default=REBUILD_BATCH_SIZE, show_default=True)
+    def rebuild_read_model_command(missing: bool, batch_size: int):
+        """Rewrite the listing documents read by the listing endpoints, e.g. after a migration."""
+        init_engine(settings.database)
+        written = rebuild_read_model(batch_size, missing)
+        print(f"Wrote {written} listing documents.")
 
     return app
 
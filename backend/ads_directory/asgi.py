@@ -1,3 +1,7 @@
-from ads_directory.app import create_app
+from ads_directory import startup
 
-app = create_app()
+with startup.phase("import"):
+    from ads_directory.app import create_app
+
+with startup.phase("create_app"):
+    app = create_app()
@@ -0,0 +1,28 @@
+from quart import Blueprint
+
+from ads_directory.cache import cache
+from ads_directory.dao.schema_cache import schema_cache
+from ads_directory.database.connection import get_engine, replica_engines
+from ads_directory.database.pool import pool_status
+
+bp = Blueprint("admin", __name__)
+
+
+@bp.get("/schema-cache")
+async def schema_cache_stats():
+    return {"schema_cache": schema_cache.stats()}
+
+
+@bp.get("/cache")
+async def cache_stats():
+    """Hits and misses of the shared response cache, counted by the worker that served the request."""
+    return {"cache": cache.stats()}
+
+
+@bp.get("/pool")
+async def pool_stats():
+    """The connection pool of the worker that served the request, the pid tells the workers apart."""
+    return {
+        "pool": pool_status(get_engine().pool),
+        "replicas": [pool_status(replica.pool) for replica in replica_engines],
+    }
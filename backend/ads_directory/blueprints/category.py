@@ -1,38 +1,62 @@
+from typing import Any
+
 from pydantic.main import BaseModel
 from quart import Blueprint
 from quart_schema import validate_querystring, validate_request, validate_response
 
 from ads_directory.blueprints.custom_fields import CustomFieldSchema
-from ads_directory.blueprints.schema import CategorySchema, CreateCategorySchema
-from ads_directory.dao.base_dao import BaseDao
+from ads_directory.blueprints.schema import CategoriesResponse, CategorySchema, CreateCategorySchema
+from ads_directory.cache import CATEGORIES, cache, cached_response
+from ads_directory.conditional import Version, conditional
 from ads_directory.dao.category_dao import CategoryDao
+from ads_directory.dao.pagination import next_cursor
 from ads_directory.models.models import Category
 from ads_directory.routes import CreatedResponse, DeletedResponse, ErrorResponse, PaginatedRequest
+from ads_directory.serialization import ORJSONResponse, category_to_dict, document_response
 
 bp = Blueprint("categories", __name__)
 
 
+def category_tags(*args: Any, **kwargs: Any) -> list[str]:
+    return [CATEGORIES]
+
+
+async def categories_version(query_args: PaginatedRequest) -> Version:
+    rows, custom_fields = await CategoryDao.get_paginated_categories_versions(
+        per_page=query_args.per_page, page=query_args.page, cursor=query_args.cursor
+    )
+    return Version.of(*rows, custom_fields, last_modified=False)
+
+
 @bp.get("/")
 @validate_querystring(PaginatedRequest)
+@document_response(CategoriesResponse)
+@cached_response(cache, category_tags)
+@conditional(categories_version)
 async def categories(query_args: PaginatedRequest):
     categories: list[Category] = await CategoryDao.get_paginated_categories(
-        per_page=query_args.per_page, page=query_args.page
+        per_page=query_args.per_page, page=query_args.page, cursor=query_args.cursor
     )
 
-    result = []
-    for c in categories:
-        # build the custom fields schema
-        custom_fields = []
-        for custom_field in c.custom_fields:
-            custom_fields.append(CustomFieldSchema(id=custom_field.id, name=custom_field.name, type=custom_field.type))
-        result.append(CategorySchema(id=c.id, name=c.name, description=c.description, custom_fields=custom_fields))
-    return {"categories": result}
+    return ORJSONResponse(
+        {
+            "categories": [category_to_dict(c, with_custom_fields=True) for c in categories],
+            "next_cursor": next_cursor(categories, query_args.per_page, "id"),
+        }
+    )
+
+
+async def category_version(category_id: int) -> Version | None:
+    row = await CategoryDao.get_category_version(category_id)
+    return Version.of(category_id, *row) if row is not None else None
 
 
 @bp.get("/<int:category_id>")
+@cached_response(cache, category_tags)
+@conditional(category_version)
 async def category(category_id: int):
     try:
-        category: Category = await CategoryDao.get_one(Category, Category.id == category_id)
+        category: Category | None = await CategoryDao.get_category(category_id)
         if category is None:
             raise Exception("Category not found")
         custom_fields = []
@@ -65,5 +89,5 @@ async def update_category(category_id: int, data: CreateCategorySchema):
 @bp.delete("/<int:category_id>")
 @validate_response(DeletedResponse)
 async def delete_category(category_id: int):
-    rowcount: int = await BaseDao.delete(Category, Category.id == category_id)
+    rowcount: int = await CategoryDao.delete_category(category_id)
     return DeletedResponse(success=True, rowcount=rowcount)
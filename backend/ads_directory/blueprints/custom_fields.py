@@ -1,35 +1,63 @@
 from typing import Any
 
+import sqlalchemy as sa
 from pydantic.main import BaseModel
 from quart import Blueprint
 from quart_schema import validate_querystring, validate_request, validate_response
 
-from ads_directory.blueprints.schema import CreateCustomFieldSchema, CustomFieldSchema
+from ads_directory.blueprints.schema import CreateCustomFieldSchema, CustomFieldSchema, CustomFieldsResponse
+from ads_directory.cache import CATEGORIES, cache
+from ads_directory.conditional import Version, conditional, set_version
 from ads_directory.dao.base_dao import BaseDao
+from ads_directory.dao.custom_field_dao import CustomFieldDao
+from ads_directory.dao.pagination import next_cursor
 from ads_directory.models.models import CustomFields
 from ads_directory.routes import PaginatedRequest
+from ads_directory.serialization import ORJSONResponse, custom_field_to_dict, document_response
 
 bp = Blueprint("custom_fields", __name__)
 
 
+async def custom_fields_version(query_args: PaginatedRequest) -> Version:
+    rows = await BaseDao.get_versions(
+        BaseDao.paginated_select(
+            CustomFields, per_page=query_args.per_page, page=query_args.page, cursor=query_args.cursor
+        ),
+        CustomFields.id,
+        CustomFields.updated_at,
+    )
+    return Version.of(*rows, last_modified=False)
+
+
 @bp.get("/")
 @validate_querystring(PaginatedRequest)
+@document_response(CustomFieldsResponse)
+@conditional(custom_fields_version)
 async def custom_fields(query_args: PaginatedRequest):
     custom_fields: list[CustomFields] = await BaseDao.get_paginated(
-        CustomFields, per_page=query_args.per_page, page=query_args.page
+        CustomFields, per_page=query_args.per_page, page=query_args.page, cursor=query_args.cursor
     )
-    return {
-        "custom_fields": [
-            CustomFieldSchema(id=c.id, name=c.name, type=c.type, description=c.description, field_config=c.field_config)
-            for c in custom_fields
-            if c is not None
-        ]
-    }
+    set_version(Version.of(*((c.id, c.updated_at) for c in custom_fields if c is not None), last_modified=False))
+    return ORJSONResponse(
+        {
+            "custom_fields": [custom_field_to_dict(c) for c in custom_fields if c is not None],
+            "next_cursor": next_cursor(custom_fields, query_args.per_page, "id"),
+        }
+    )
+
+
+async def custom_field_version(custom_field_id: int) -> Version | None:
+    rows = await BaseDao.get_versions(
+        sa.select(CustomFields).where(CustomFields.id == custom_field_id), CustomFields.updated_at
+    )
+    return Version.of(custom_field_id, *rows) if rows else None
 
 
 @bp.get("/<int:custom_field_id>")
+@conditional(custom_field_version)
 async def custom_field(custom_field_id: int):
     custom_field: CustomFields = await BaseDao.get_one(CustomFields, CustomFields.id == custom_field_id)
+    set_version(Version.of(custom_field_id, custom_field.updated_at))
     return {
         "custom_field": CustomFieldSchema(
             id=custom_field.id,
@@ -59,7 +87,8 @@ async def create_custom_field(data: CreateCustomFieldSchema):
 @bp.put("/<int:custom_field_id>")
 @validate_request(CreateCustomFieldSchema)
 async def update_custom_field(custom_field_id: int, data: CreateCustomFieldSchema):
-    await BaseDao.update(CustomFields, CustomFields.id == custom_field_id, **data.dict())
+    await CustomFieldDao.update_custom_field(custom_field_id, **data.dict())
+    await cache.invalidate(CATEGORIES)
     return {
         "custom_field": CustomFieldSchema(
             id=custom_field_id,
@@ -74,4 +103,5 @@ async def update_custom_field(custom_field_id: int, data: CreateCustomFieldSchem
 @bp.delete("/<int:custom_field_id>")
 async def delete_custom_field(custom_field_id: int):
     await BaseDao.delete(CustomFields, CustomFields.id == custom_field_id)
+    await cache.invalidate(CATEGORIES)
     return {"success": True}
@@ -0,0 +1,42 @@
+from quart import Blueprint, url_for
+from quart_schema import validate_request, validate_response
+from werkzeug.exceptions import BadRequest, NotFound
+
+from ads_directory.blueprints.schema import JobSchema, SubmitJobSchema, SubmittedJobResponse
+from ads_directory.jobs import JOB_TYPES, get_job, submit
+
+bp = Blueprint("jobs", __name__)
+
+
+def submitted(job_id: int) -> tuple[SubmittedJobResponse, int]:
+    return SubmittedJobResponse(job_id=job_id, status_url=url_for("jobs.job", job_id=job_id)), 202
+
+
+@bp.get("/<int:job_id>")
+@validate_response(JobSchema)
+async def job(job_id: int):
+    job = await get_job(job_id)
+    if job is None:
+        raise NotFound(f"Job {job_id} not found")
+    return JobSchema(
+        id=job.id,
+        type=job.type,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        run_at=job.run_at,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+
+@bp.post("/")
+@validate_request(SubmitJobSchema)
+@validate_response(SubmittedJobResponse, 202)
+async def submit_job(data: SubmitJobSchema):
+    """Queue a maintenance job, the imports are submitted by POST /listings/import?background=true."""
+    if data.type not in JOB_TYPES or data.type == "import_listings":
+        raise BadRequest(f"Unknown job type {data.type}")
+    return submitted(await submit(data.type, data.payload))
@@ -1,94 +1,231 @@
-from quart import Blueprint
+import asyncio
+import functools
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator
+
+import orjson
+from quart import Blueprint, Response, g, request
 from quart_schema import validate_querystring, validate_request, validate_response
+from werkzeug.exceptions import BadRequest
 
+from ads_directory.blueprints.jobs import submitted
 from ads_directory.blueprints.schema import (
-    CategorySchema,
+    BatchListingsRequest,
+    BatchListingsResponse,
     CreateListingSchema,
     CustomFieldSchema,
+    ExportListingsRequest,
+    FacetsRequest,
+    FacetsResponse,
+    ImportListingsRequest,
     ListingRecordSchema,
     ListingSchema,
+    ListingsRequest,
+    ListingsResponse,
+    SearchListingRequest,
 )
-from ads_directory.dao.base_dao import BaseDao
-from ads_directory.dao.ListingDao import ListingDao
-from ads_directory.models.models import Listing
-from ads_directory.routes import PaginatedRequest
+from ads_directory.cache import CATEGORIES, cache, cached_response, listing_tag
+from ads_directory.commands.batch_listings import apply_batch
+from ads_directory.commands.import_listings import FORMATS, import_listings, iter_lines
+from ads_directory.conditional import Version, conditional, set_version
+from ads_directory.config import get_settings
+from ads_directory.dao.custom_field_filters import parse_custom_field_filters
+from ads_directory.dao.facets import facets_signature
+from ads_directory.dao.ListingDao import LISTING_SORTS, ListingDao
+from ads_directory.dao.pagination import next_cursor
+from ads_directory.jobs import submit
+from ads_directory.serialization import ORJSONResponse, document_response, listing_to_dict
 
 bp = Blueprint("listing", __name__)
 
 
+def listings_filters(query_args: ListingsRequest) -> dict[str, Any]:
+    return {
+        "category_id": query_args.category_id,
+        "price_min": query_args.price_min,
+        "price_max": query_args.price_max,
+        "custom_field_filters": parse_custom_field_filters(request.args),
+    }
+
+
+async def listings_total(query_args: ListingsRequest) -> tuple[int, bool] | None:
+    # counted once per request, by the probe of a conditional request or else by the view
+    if not query_args.total:
+        return None
+    if "listings_total" not in g:
+        g.listings_total = await ListingDao.count_listings(**listings_filters(query_args))
+    return g.listings_total
+
+
+async def listings_version(query_args: ListingsRequest) -> Version:
+    filters = listings_filters(query_args)
+    rows = await ListingDao.get_paginated_listing_versions(
+        per_page=query_args.per_page, page=query_args.page, cursor=query_args.cursor, sort=query_args.sort, **filters
+    )
+    # the total changes with listings out of the page
+    return Version.of(*rows, await listings_total(query_args), last_modified=False)
+
+
 @bp.get("/")
-@validate_querystring(PaginatedRequest)
-async def listing(query_args: PaginatedRequest):
-    listings = await ListingDao.get_paginated_listing(per_page=query_args.per_page, page=query_args.page)
+@validate_querystring(ListingsRequest)
+@document_response(ListingsResponse)
+@conditional(listings_version)
+async def listing(query_args: ListingsRequest):
+    filters = listings_filters(query_args)
+    rows = await ListingDao.get_paginated_listing_documents(
+        per_page=query_args.per_page, page=query_args.page, cursor=query_args.cursor, sort=query_args.sort, **filters
+    )
 
-    return {
-        "listings": [
-            ListingRecordSchema(
-                id=listing.id,
-                name=listing.name,
-                description=listing.description,
-                price=listing.price,
-                category=CategorySchema(
-                    id=listing.category.id, name=listing.category.name, description=listing.category.description
-                ),
-                custom_fields=[],
-                created_at=listing.created_at,
-            )
-            for listing in listings
-        ]
+    keyset, _ = LISTING_SORTS[query_args.sort]
+    response = {
+        "listings": [row.document for row in rows],
+        "next_cursor": next_cursor(rows, query_args.per_page, *(c.key for c in keyset), sort=query_args.sort),
     }
+    total = await listings_total(query_args)
+    if total is not None:
+        response["total"], response["total_exact"] = total
+    set_version(Version.of(*((row.id, row.updated_at) for row in rows), total, last_modified=False))
+    return ORJSONResponse(response)
+
+
+@bp.get("/search")
+@validate_querystring(SearchListingRequest)
+@document_response(ListingsResponse)
+async def search_listing(query_args: SearchListingRequest):
+    if not query_args.q:
+        raise BadRequest("The q parameter is required")
+    listings = await ListingDao.search_listing(query_args.q, per_page=query_args.per_page, page=query_args.page)
+
+    return ORJSONResponse({"listings": [listing_to_dict(listing) for listing in listings], "next_cursor": None})
+
+
+@bp.get("/facets")
+@validate_querystring(FacetsRequest)
+@document_response(FacetsResponse)
+async def listing_facets(query_args: FacetsRequest):
+    """
+    Count the listings matching the cf[...] filters, like the list, per value of the requested
+    custom fields and per category. The counts are cached per filter for FACETS_TTL seconds.
+    """
+    fields = [f.strip() for f in query_args.fields.split(",") if f.strip()] if query_args.fields else None
+    filters = parse_custom_field_filters(request.args)
+    key = f"facets:{facets_signature(fields, filters)}"
+    body, versions = await cache.get(key, [CATEGORIES])
+    if body is None:
+        body = orjson.dumps(await ListingDao.get_facets(fields, filters))
+        await cache.set(key, body, versions, ttl=get_settings().cache.FACETS_TTL)
+    return Response(body, mimetype="application/json")
+
+
+async def spool_body(path: str) -> None:
+    """Write the request body to `path`, the blocking file calls run in the default executor."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, functools.partial(os.makedirs, os.path.dirname(path), exist_ok=True))
+    f = await loop.run_in_executor(None, open, path, "wb")
+    try:
+        async for chunk in request.body:
+            await loop.run_in_executor(None, f.write, chunk)
+    except BaseException:
+        # e.g. the client went away, no job will read the partial feed
+        await loop.run_in_executor(None, f.close)
+        await loop.run_in_executor(None, os.remove, path)
+        raise
+    await loop.run_in_executor(None, f.close)
+
+
+@bp.post("/import")
+@validate_querystring(ImportListingsRequest)
+async def import_listing(query_args: ImportListingsRequest):
+    """
+    Import a feed of listings streamed in the request body, one listing per ndjson line
+    (same shape as the create payload) or per csv row (name, description, price, category_id
+    and one column per custom field name). Very large feeds should be sent chunked or through
+    the import-listings command, a Content-Length above MAX_CONTENT_LENGTH is rejected.
+    With background=true the feed is written by a job worker, the response is the job to poll.
+    """
+    if query_args.format not in FORMATS:
+        raise BadRequest(f"Unsupported format {query_args.format}, expected one of {', '.join(FORMATS)}")
+    if query_args.background:
+        # the request only spools the feed, a worker writes it
+        # absolute, the workers may run from another directory
+        spool = os.path.abspath(get_settings().jobs.SPOOL_DIR)
+        path = os.path.join(spool, f"import-{uuid.uuid4().hex}.{query_args.format}")
+        await spool_body(path)
+        payload = {"path": path, "format": query_args.format, "batch_size": query_args.batch_size}
+        return submitted(await submit("import_listings", payload))
+    report = await import_listings(iter_lines(request.body), query_args.format, query_args.batch_size)
+    return report.dict()
+
+
+@bp.post("/batch")
+@validate_request(BatchListingsRequest)
+@validate_response(BatchListingsResponse)
+async def batch_listing(data: BatchListingsRequest):
+    """
+    Create, update and delete listings in one request, `chunk_size` operations per transaction.
+    The results are in the order of the operations, a failed operation does not stop the others.
+    """
+    report = await apply_batch(data.operations, data.chunk_size)
+    return BatchListingsResponse(**report.dict())
+
+
+@bp.get("/export")
+@validate_querystring(ExportListingsRequest)
+async def export_listing(query_args: ExportListingsRequest):
+    """Stream all the listings as ndjson, one listing per line."""
+
+    async def generate() -> AsyncIterator[bytes]:
+        async for partition in ListingDao.stream_listings(
+            category_id=query_args.category_id, updated_since=query_args.updated_since
+        ):
+            yield "".join(json.dumps(row, default=_json_default) + "\n" for row in partition).encode("utf-8")
+
+    return generate(), 200, {"Content-Type": "application/x-ndjson"}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def listing_version(listing_id: int) -> Version | None:
+    row = await ListingDao.get_listing_version(listing_id)
+    return Version.of(listing_id, *row) if row is not None else None
 
 
 @bp.get("/<int:listing_id>")
+@document_response(ListingRecordSchema)
+@cached_response(cache, lambda listing_id: [listing_tag(listing_id), CATEGORIES])
+@conditional(listing_version)
 async def get_listing(listing_id: int):
-    listing = await BaseDao.get_one(Listing, Listing.id == listing_id)
-    if listing is None:
+    row = await ListingDao.get_listing_document(listing_id)
+    if row is None:
         return {"error": "Listing not found"}, 404
 
-    return ListingRecordSchema(
-        id=listing.id,
-        name=listing.name,
-        description=listing.description,
-        price=listing.price,
-        category=CategorySchema(
-            id=listing.category.id, name=listing.category.name, description=listing.category.description
-        ),
-        created_at=listing.created_at,
-    )
+    set_version(Version.of(listing_id, row.updated_at))
+    return ORJSONResponse(row.document)
 
 
 @bp.post("/")
 @validate_request(CreateListingSchema)
+@document_response(ListingRecordSchema)
 async def create_listing(data: CreateListingSchema):
     listing = await ListingDao.create_listing(data)
 
-    return ListingRecordSchema(
-        id=listing.id,
-        name=listing.name,
-        description=listing.description,
-        price=listing.price,
-        category=CategorySchema(
-            id=listing.category.id, name=listing.category.name, description=listing.category.description
-        ),
-        created_at=listing.created_at,
-    )
+    return ORJSONResponse(listing_to_dict(listing))
 
 
 @bp.put("/<int:listing_id>")
 @validate_request(CreateListingSchema)
+@document_response(ListingRecordSchema)
 async def update_listing(listing_id: int, data: CreateListingSchema):
     listing = await ListingDao.update_listing(listing_id, data)
 
-    return ListingRecordSchema(
-        id=listing.id,
-        name=listing.name,
-        description=listing.description,
-        price=listing.price,
-        category=CategorySchema(
-            id=listing.category.id, name=listing.category.name, description=listing.category.description
-        ),
-        created_at=listing.created_at,
-    )
+    return ORJSONResponse(listing_to_dict(listing))
 
 
 @bp.delete("/<int:listing_id>")
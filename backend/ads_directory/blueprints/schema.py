@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 
+from pydantic.fields import Field
 from pydantic.main import BaseModel
 
 
@@ -51,6 +52,7 @@ class ListingCustomFieldSchema(BaseModel):
     listing_id: int
     custom_field_id: int
     value: str
+    name: str | None = Field(None, description="The name of the custom field")
 
 
 class ListingRecordSchema(ListingSchema):
@@ -61,6 +63,23 @@ class ListingRecordSchema(ListingSchema):
     updated_at: datetime | None
 
 
+class ListingsResponse(BaseModel):
+    listings: list[ListingRecordSchema]
+    next_cursor: str | None
+    total: int | None = Field(None, description="The number of matching listings, when asked for")
+    total_exact: bool | None = Field(None, description="False when the total is an estimate")
+
+
+class CategoriesResponse(BaseModel):
+    categories: list[CategorySchema]
+    next_cursor: str | None
+
+
+class CustomFieldsResponse(BaseModel):
+    custom_fields: list[CustomFieldSchema]
+    next_cursor: str | None
+
+
 class CreateListingSchema(ListingSchema):
     class CustomFieldItem(BaseModel):
         id: int
@@ -68,3 +87,102 @@ class CreateListingSchema(ListingSchema):
 
     custom_fields: list[CustomFieldItem] | None
     category_id: int
+
+
+class ListingsRequest(BaseModel):
+    page: int = 1
+    per_page: int = 20
+    cursor: str | None = Field(None, description="The next_cursor of the previous page, takes precedence over page")
+    category_id: int | None = Field(None, description="Only the listings of this category")
+    price_min: float | None = Field(None, ge=0, description="Only the listings at this price or more")
+    price_max: float | None = Field(None, ge=0, description="Only the listings at this price or less")
+    sort: Literal["created_at", "-created_at", "price", "-price"] = Field(
+        "created_at", description="The order of the listings, descending with a leading -"
+    )
+    total: bool = Field(False, description="Also return the number of listings matching the filters")
+
+
+class SearchListingRequest(BaseModel):
+    q: str | None = Field(None, min_length=1, description="The text to search for in the listing name and description")
+    page: int = 1
+    per_page: int = 20
+
+
+class ImportListingsRequest(BaseModel):
+    format: str = Field("ndjson", description="The format of the feed, ndjson or csv")
+    batch_size: int = Field(1000, gt=0, le=10000, description="The number of listings written per transaction")
+    background: bool = Field(False, description="Import in a background job, the response is the job to poll")
+
+
+class ExportListingsRequest(BaseModel):
+    category_id: int | None = Field(None, description="Only export the listings of this category")
+    updated_since: datetime | None = Field(None, description="Only export the listings updated since this time")
+
+
+class FacetsRequest(BaseModel):
+    fields: str | None = Field(
+        None, description="Comma separated names of the custom fields, all the select fields by default"
+    )
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class CategoryCount(BaseModel):
+    id: int
+    name: str
+    count: int
+
+
+class FacetsResponse(BaseModel):
+    facets: dict[str, list[FacetCount]]
+    categories: list[CategoryCount]
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: int | None = Field(None, description="The listing to update or delete")
+    listing: CreateListingSchema | None = Field(None, description="The listing to create or the new values to update")
+
+
+class BatchListingsRequest(BaseModel):
+    operations: list[BatchOperation] = Field(..., min_items=1, max_items=1000)
+    chunk_size: int = Field(100, gt=0, le=500, description="The number of operations written per transaction")
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    id: int | None
+    success: bool
+    error: str | None
+
+
+class BatchListingsResponse(BaseModel):
+    results: list[BatchOperationResult]
+    transactions: int
+
+
+class SubmitJobSchema(BaseModel):
+    type: str = Field(..., description="A registered job type, e.g. rebuild_read_model, reindex_listings or purge_jobs")
+    payload: dict[str, Any] = Field(default_factory=dict)
+
+
+class SubmittedJobResponse(BaseModel):
+    job_id: int
+    status_url: str
+
+
+class JobSchema(BaseModel):
+    id: int
+    type: str
+    status: str
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    result: dict[str, Any] | None
+    error: str | None
+    created_at: datetime
+    updated_at: datetime
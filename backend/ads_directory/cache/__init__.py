@@ -0,0 +1,54 @@
+import asyncio
+import contextlib
+
+from quart import Quart
+
+from ads_directory.cache.backends import CacheBackend, MemoryBackend, RedisBackend, SQLiteBackend
+from ads_directory.cache.response import cached_response
+from ads_directory.cache.shared_cache import SharedCache
+from ads_directory.config import Cache, get_settings
+
+__all__ = ["CATEGORIES", "SharedCache", "cache", "cached_response", "init_app", "listing_tag"]
+
+# categories embed the names and types of their custom fields and listings embed their category,
+# any write to a category or a custom field invalidates this tag
+CATEGORIES = "categories"
+
+
+def listing_tag(listing_id: int) -> str:
+    return f"listing:{listing_id}"
+
+
+def create_backend(config: Cache) -> CacheBackend:
+    if config.BACKEND == "memory":
+        return MemoryBackend()
+    if config.BACKEND == "sqlite":
+        return SQLiteBackend(config.URL or "cache.db", poll_interval=config.POLL_INTERVAL)
+    if config.BACKEND == "redis":
+        return RedisBackend(config.URL)
+    raise ValueError(f"Unknown cache backend {config.BACKEND}, expected memory, sqlite or redis")
+
+
+# in memory until init_app gives it the backend of the settings
+cache = SharedCache(MemoryBackend())
+
+
+def init_app(app: Quart) -> None:
+    """Use the backend of the settings and listen to the invalidations of the other workers while serving."""
+    config = get_settings().cache
+    cache.backend = create_backend(config)
+    cache.default_ttl = config.DEFAULT_TTL
+    listener: asyncio.Task[None] | None = None
+
+    @app.before_serving
+    async def start_listening() -> None:
+        nonlocal listener
+        listener = asyncio.create_task(cache.listen())
+
+    @app.after_serving
+    async def stop_listening() -> None:
+        if listener is not None:
+            listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await listener
+        await cache.backend.close()
@@ -0,0 +1,212 @@
+import abc
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import AsyncIterator
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - optional dependency, see the redis extra
+    aioredis = None
+
+
+class CacheBackend(abc.ABC):
+    """
+    The key value store behind `SharedCache`. Values are bytes, counters are stored as their
+    decimal representation so that `incr` can be done atomically by the store.
+    """
+
+    @abc.abstractmethod
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def incr(self, keys: list[str]) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def publish(self, channel: str, message: bytes) -> None:
+        ...
+
+    @abc.abstractmethod
+    def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """A store private to the process, for a single worker and the tests."""
+
+    # expired entries that are never read again are swept every that many sets
+    PURGE_EVERY = 1000
+
+    def __init__(self) -> None:
+        self._values: dict[str, tuple[bytes, float]] = {}
+        self._subscribers: dict[str, list[asyncio.Queue[bytes]]] = {}
+        self._sets = 0
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        now = time.time()
+        values: list[bytes | None] = []
+        for key in keys:
+            value, expires_at = self._values.get(key, (None, 0.0))
+            if value is not None and expires_at < now:
+                del self._values[key]
+                value = None
+            values.append(value)
+        return values
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        self._values[key] = (value, now + ttl)
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            for expired in [k for k, (_, expires_at) in self._values.items() if expires_at < now]:
+                del self._values[expired]
+
+    async def incr(self, keys: list[str]) -> None:
+        for key in keys:
+            value, _ = self._values.get(key, (b"0", 0.0))
+            self._values[key] = (str(int(value) + 1).encode(), float("inf"))
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        for queue in self._subscribers.get(channel, []):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:  # type: ignore[override]
+        queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self._subscribers.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].remove(queue)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    A store in a sqlite file shared by the workers of one host, a stand-in for redis in
+    development and the tests. Messages are rows of an events table polled by the subscribers.
+    """
+
+    # published messages are kept that long for the subscribers to read them
+    EVENTS_RETENTION = 60.0
+    # expired entries that are never read again are deleted every that many sets
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, poll_interval: float = 0.05) -> None:
+        self.poll_interval = poll_interval
+        self._sets = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._connection.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL);
+            CREATE TABLE IF NOT EXISTS cache_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, message BLOB NOT NULL, created_at REAL
+            );
+            """
+        )
+
+    async def _run(self, sql: str, *params: object) -> list[tuple[object, ...]]:
+        def run() -> list[tuple[object, ...]]:
+            with self._lock:
+                return self._connection.execute(sql, params).fetchall()
+
+        return await asyncio.to_thread(run)
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        rows = await self._run(
+            f"SELECT key, value FROM cache_entries WHERE key IN ({', '.join('?' * len(keys))}) "
+            "AND (expires_at IS NULL OR expires_at >= ?)",
+            *keys,
+            time.time(),
+        )
+        values = {key: value for key, value in rows}
+        return [values.get(key) for key in keys]  # type: ignore
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        await self._run(
+            "INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            key,
+            value,
+            now + ttl,
+        )
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            await self._run("DELETE FROM cache_entries WHERE expires_at < ?", now)
+
+    async def incr(self, keys: list[str]) -> None:
+        def run() -> None:
+            with self._lock:
+                self._connection.executemany(
+                    "INSERT INTO cache_entries (key, value) VALUES (?, CAST(1 AS BLOB)) "
+                    "ON CONFLICT (key) DO UPDATE SET value = CAST(CAST(value AS INTEGER) + 1 AS BLOB)",
+                    [(key,) for key in keys],
+                )
+
+        await asyncio.to_thread(run)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        now = time.time()
+        await self._run(
+            "INSERT INTO cache_events (channel, message, created_at) VALUES (?, ?, ?)", channel, message, now
+        )
+        await self._run("DELETE FROM cache_events WHERE created_at < ?", now - self.EVENTS_RETENTION)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:  # type: ignore[override]
+        ((last_id,),) = await self._run("SELECT coalesce(max(id), 0) FROM cache_events")
+        while True:
+            rows = await self._run(
+                "SELECT id, message FROM cache_events WHERE id > ? AND channel = ? ORDER BY id", last_id, channel
+            )
+            for last_id, message in rows:
+                yield message  # type: ignore
+            await asyncio.sleep(self.poll_interval)
+
+    async def close(self) -> None:
+        self._connection.close()
+
+
+class RedisBackend(CacheBackend):
+    """A store shared by every worker and host, needs the redis extra."""
+
+    def __init__(self, url: str) -> None:
+        if aioredis is None:
+            raise RuntimeError("The redis cache backend needs the redis package, install the redis extra")
+        self._redis = aioredis.from_url(url)
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        return await self._redis.mget(keys)  # type: ignore
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._redis.set(key, value, px=int(ttl * 1000))
+
+    async def incr(self, keys: list[str]) -> None:
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.incr(key)
+            await pipeline.execute()
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        await self._redis.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:  # type: ignore[override]
+        async with self._redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+            await pubsub.subscribe(channel)
+            async for message in pubsub.listen():
+                yield message["data"]
+
+    async def close(self) -> None:
+        await self._redis.close()
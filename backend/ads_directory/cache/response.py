@@ -0,0 +1,71 @@
+from functools import wraps
+from typing import Any, Callable, Iterable, TypeVar, cast
+
+import orjson
+from pydantic import BaseModel
+from quart import Response, make_response, request
+
+from ads_directory.cache.shared_cache import SharedCache
+from ads_directory.conditional import Version
+from ads_directory.database.routing import on_primary
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# headers kept together with a cached body
+_CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+
+def cached_response(
+    cache: SharedCache, tags: Callable[..., Iterable[str]], ttl: float | None = None
+) -> Callable[[F], F]:
+    """
+    Serve the 200 responses of a GET view from `cache`, keyed by the path and the validated
+    query arguments, so that unknown query parameters do not add entries. Put it below
+    `validate_querystring`, a view without validated query arguments is keyed by its path.
+    `tags` is called with the arguments of the view and returns the tags of the response,
+    it is dropped by every worker as soon as one of them is invalidated.
+
+    Put it above `conditional` so that a hit answers conditional requests from the cached
+    validators, without any query. Misses are read from the primary database.
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = _key(kwargs)
+            value, versions = await cache.get(key, tags(*args, **kwargs))
+            if value is not None:
+                return _cached(value)
+
+            # a lagging replica could put back a response older than the last invalidation
+            with on_primary():
+                response = await make_response(await func(*args, **kwargs))
+            if response.status_code == 200:
+                await cache.set(key, _dump(response, await response.get_data()), versions, ttl)
+            return response
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def _key(view_args: dict[str, Any]) -> str:
+    query = {name: value.dict() for name, value in view_args.items() if isinstance(value, BaseModel)}
+    if not query:
+        return f"response:{request.path}"
+    return f"response:{request.path}?{orjson.dumps(query, option=orjson.OPT_SORT_KEYS).decode()}"
+
+
+def _dump(response: Response, body: bytes) -> bytes:
+    headers = {name: response.headers[name] for name in _CACHED_HEADERS if name in response.headers}
+    return orjson.dumps(headers) + b"\n" + body
+
+
+def _cached(value: bytes) -> Response:
+    raw_headers, _, body = value.partition(b"\n")
+    headers = orjson.loads(raw_headers)
+    response = Response(body, headers=headers)
+    etag, _ = response.get_etag()
+    if etag is not None and Version(etag, response.last_modified).not_modified():
+        return Response("", status=304, headers={k: v for k, v in headers.items() if k != "Content-Type"})
+    return response
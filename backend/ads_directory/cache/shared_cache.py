@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Iterable
+
+import orjson
+
+from ads_directory.cache.backends import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "ads_directory:invalidations"
+_TAG_PREFIX = "tag:"
+
+TagVersions = dict[str, int]
+
+
+class SharedCache:
+    """
+    A cache shared by the workers, on top of a `CacheBackend`.
+
+    Entries are tagged, an entry stores the versions its tags had when the value started
+    being computed and is a miss as soon as one of them was bumped by `invalidate`. The
+    check is done on every read against the shared store, so a write is seen by all the
+    workers at once. Invalidations are also published on a channel for the in-process caches
+    of the other workers, see `on_invalidate`.
+    """
+
+    def __init__(self, backend: CacheBackend, default_ttl: float = 60) -> None:
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        # messages published by this process are skipped by its own listener
+        self._origin = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self._handlers: dict[str, list[Callable[[], Any]]] = defaultdict(list)
+
+    async def get(self, key: str, tags: Iterable[str]) -> tuple[bytes | None, TagVersions]:
+        """
+        The value of `key` if its tags were not invalidated since it was stored, together
+        with the current tag versions to be passed to `set` on a miss.
+        """
+        tags = list(tags)
+        entry, *versions = await self.backend.mget([key, *(_TAG_PREFIX + t for t in tags)])
+        current = {tag: int(version or 0) for tag, version in zip(tags, versions)}
+        if entry is not None:
+            header, _, value = entry.partition(b"\n")
+            if orjson.loads(header) == current:
+                self.hits += 1
+                return value, current
+        self.misses += 1
+        return None, current
+
+    async def set(self, key: str, value: bytes, versions: TagVersions, ttl: float | None = None) -> None:
+        await self.backend.set(key, orjson.dumps(versions) + b"\n" + value, self.default_ttl if ttl is None else ttl)
+
+    async def invalidate(self, *tags: str) -> None:
+        """Drop the entries tagged with any of `tags` in every worker."""
+        if not tags:
+            return
+        await self.backend.incr([_TAG_PREFIX + t for t in tags])
+        self._dispatch(tags)
+        try:
+            await self.backend.publish(CHANNEL, orjson.dumps({"origin": self._origin, "tags": tags}))
+        except Exception:
+            # the entries are already stale for everyone, only the other in-process caches miss the news
+            logger.exception("Failed to publish the invalidation of %s", tags)
+
+    def on_invalidate(self, tag: str, handler: Callable[[], Any]) -> None:
+        """Call `handler` when `tag` is invalidated, by this worker or any other."""
+        self._handlers[tag].append(handler)
+
+    def _dispatch(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for handler in self._handlers.get(tag, []):
+                handler()
+
+    async def listen(self) -> None:
+        """Apply the invalidations published by the other workers, runs until cancelled."""
+        while True:
+            try:
+                async for message in self.backend.subscribe(CHANNEL):
+                    event = orjson.loads(message)
+                    if event["origin"] != self._origin:
+                        self._dispatch(event["tags"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Lost the cache invalidation channel, reconnecting")
+                await asyncio.sleep(1)
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": type(self.backend).__name__, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,122 @@
+import logging
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from werkzeug.exceptions import BadRequest, HTTPException
+
+from ..blueprints.schema import BatchOperation, CreateListingSchema
+from ..dao.category_dao import CategoryDao
+from ..dao.ListingDao import ListingDao, ListingRows
+
+logger = logging.getLogger(__name__)
+
+# a batch may not run more statements than that, whatever its chunk size
+MAX_BATCH_STATEMENTS = 500
+
+
+@dataclass
+class OperationResult:
+    index: int
+    op: str
+    id: int | None
+    success: bool = True
+    error: str | None = None
+
+    def fail(self, error: str) -> None:
+        self.success = False
+        self.error = error
+
+
+@dataclass
+class BatchReport:
+    results: list[OperationResult] = field(default_factory=list)
+    transactions: int = 0
+
+    def dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+async def _validate(listing: CreateListingSchema | None) -> ListingRows:
+    if listing is None:
+        raise ValueError("The listing is required")
+    category = await CategoryDao.get_category(listing.category_id)
+    if category is None:
+        raise ValueError(f"Category {listing.category_id} not found")
+    return (
+        {"name": listing.name, "description": listing.description, "price": listing.price, "category_id": category.id},
+        ListingDao.custom_field_rows(category, listing.custom_fields),
+    )
+
+
+async def _write_chunk(
+    chunk: list[tuple[OperationResult, BatchOperation, ListingRows | None]], report: BatchReport
+) -> None:
+    creates: list[tuple[OperationResult, ListingRows]] = []
+    updates: dict[int, tuple[OperationResult, ListingRows]] = {}
+    deletes: dict[int, OperationResult] = {}
+    # apply_batch only passes the operations with an id and, but for deletes, with their rows
+    for result, operation, rows in chunk:
+        if operation.op == "create" and rows is not None:
+            creates.append((result, rows))
+        elif operation.op == "update" and operation.id is not None and rows is not None:
+            updates[operation.id] = (result, rows)
+        elif operation.op == "delete" and operation.id is not None:
+            deletes[operation.id] = result
+    try:
+        ids, missing = await ListingDao.write_batch(
+            [rows for _, rows in creates], {i: rows for i, (_, rows) in updates.items()}, list(deletes)
+        )
+    except Exception:
+        # a failing chunk is reported on each of its operations, the next chunks are still written,
+        # the database error is only logged
+        logger.exception("Failed to write a chunk of %s listing operations", len(chunk))
+        for result, _, _ in chunk:
+            result.fail("Chunk failed, none of its operations were written")
+        return
+    report.transactions += 1
+
+    for (result, _), listing_id in zip(creates, ids):
+        result.id = listing_id
+    for listing_id in missing:
+        (updates[listing_id][0] if listing_id in updates else deletes[listing_id]).fail("Listing not found")
+
+
+async def apply_batch(operations: list[BatchOperation], chunk_size: int) -> BatchReport:
+    """
+    Apply a mixed list of listing creates, updates and deletes, `chunk_size` operations per
+    transaction. Every operation gets its result, an invalid one is reported and skipped
+    while the others are still applied.
+    """
+    chunks = math.ceil(len(operations) / chunk_size)
+    if chunks * ListingDao.MAX_BATCH_STATEMENTS > MAX_BATCH_STATEMENTS:
+        raise BadRequest(
+            f"A batch of {len(operations)} operations in chunks of {chunk_size} may run more than "
+            f"{MAX_BATCH_STATEMENTS} statements, use a larger chunk_size or split the batch"
+        )
+
+    report = BatchReport()
+    valid: list[tuple[OperationResult, BatchOperation, ListingRows | None]] = []
+    seen: set[int] = set()
+    for index, operation in enumerate(operations):
+        result = OperationResult(index=index, op=operation.op, id=operation.id)
+        report.results.append(result)
+        try:
+            if operation.op != "create":
+                if operation.id is None:
+                    raise ValueError(f"The id of the listing to {operation.op} is required")
+                # the order of the operations on a listing would depend on the chunks
+                if operation.id in seen:
+                    raise ValueError(f"Listing {operation.id} appears more than once in the batch")
+                seen.add(operation.id)
+            rows = await _validate(operation.listing) if operation.op != "delete" else None
+        except HTTPException as e:
+            result.fail(e.description or str(e))
+        except ValueError as e:
+            result.fail(str(e))
+        else:
+            valid.append((result, operation, rows))
+
+    for start in range(0, len(valid), chunk_size):
+        await _write_chunk(valid[start : start + chunk_size], report)
+    return report
@@ -0,0 +1,226 @@
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from pydantic import ValidationError
+from werkzeug.exceptions import HTTPException
+
+from ..blueprints.schema import CreateListingSchema
+from ..dao.category_dao import CategoryDao
+from ..dao.ListingDao import ListingDao
+from ..models.models import Category
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "csv")
+DEFAULT_BATCH_SIZE = 1000
+# keep the response small when a whole feed is broken
+MAX_REPORTED_ERRORS = 1000
+# a stray opening quote would otherwise join the rest of the feed into one record
+MAX_RECORD_LINES = 100
+MAX_RECORD_BYTES = 1024 * 1024
+
+# csv columns mapped on the listing itself, every other column is a custom field name
+_CSV_LISTING_COLUMNS = ("name", "description", "price", "category_id")
+
+
+@dataclass
+class RowError:
+    line: int
+    error: str
+
+
+@dataclass
+class BatchReport:
+    rows: int
+    seconds: float
+    rows_per_second: float
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    failed: int = 0
+    errors: list[RowError] = field(default_factory=list)
+    batches: list[BatchReport] = field(default_factory=list)
+
+    def add_error(self, line: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(line=line, error=error))
+
+    def dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a stream of utf-8 encoded chunks into lines without buffering the whole stream."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+class _RecordContinues(Exception):
+    """Raised to the csv reader when the record it parses continues on the next line."""
+
+
+def _parse_csv_record(lines: list[str]) -> list[str]:
+    def source() -> Iterator[str]:
+        for line in lines:
+            yield f"{line}\n"
+        raise _RecordContinues
+
+    return next(csv.reader(source()))
+
+
+async def _iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Yield (line number, record) pairs, the raw json line for ndjson and a column dict for csv.
+    A csv record that cannot be parsed, or that grows past MAX_RECORD_LINES or MAX_RECORD_BYTES,
+    is yielded as a ValueError, reported like an invalid row.
+    """
+    header: list[str] | None = None
+    record: list[str] = []
+    record_bytes = 0
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if fmt == "ndjson":
+            if line.strip():
+                yield line_no, line
+            continue
+
+        if not record and not line.strip():
+            continue
+        record.append(line)
+        record_bytes += len(line) + 1
+        if len(record) > MAX_RECORD_LINES or record_bytes > MAX_RECORD_BYTES:
+            yield line_no - len(record) + 1, ValueError(
+                f"Csv record too long, over {MAX_RECORD_LINES} lines or {MAX_RECORD_BYTES} bytes, "
+                "check for an unterminated quoted value"
+            )
+            record, record_bytes = [], 0
+            continue
+        # a quoted csv value may span several lines, it only ends on a line with a quote
+        if len(record) > 1 and '"' not in line:
+            continue
+        try:
+            values = _parse_csv_record(record)
+        except _RecordContinues:
+            continue
+        except csv.Error as e:
+            yield line_no, ValueError(f"Invalid csv record: {e}")
+            record, record_bytes = [], 0
+            continue
+        record, record_bytes = [], 0
+        if header is None:
+            header = values
+        else:
+            yield line_no, dict(zip(header, values))
+
+    if record:
+        yield line_no - len(record) + 1, ValueError("Unterminated quoted csv value, the record has no closing quote")
+
+
+def _csv_custom_fields(record: dict[str, str], category: Category) -> list[CreateListingSchema.CustomFieldItem]:
+    fields_by_name = {c.name: c.id for c in category.custom_fields}
+    unknown = [k for k in record if k not in _CSV_LISTING_COLUMNS and k not in fields_by_name]
+    if unknown:
+        raise ValueError(f"Unknown custom fields for category {category.name}: {', '.join(unknown)}")
+    return [
+        CreateListingSchema.CustomFieldItem(id=fields_by_name[k], value=v)
+        for k, v in record.items()
+        if k in fields_by_name and v != ""
+    ]
+
+
+async def _validate(record: Any, fmt: str) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    if isinstance(record, ValueError):
+        raise record
+    if fmt == "ndjson":
+        data = CreateListingSchema.parse_raw(record)
+    else:
+        data = CreateListingSchema.parse_obj({k: record.get(k) for k in _CSV_LISTING_COLUMNS})
+
+    category = await CategoryDao.get_category(data.category_id)
+    if category is None:
+        raise ValueError(f"Category {data.category_id} not found")
+    if fmt == "csv":
+        data.custom_fields = _csv_custom_fields(record, category)
+
+    listing = {"name": data.name, "description": data.description, "price": data.price, "category_id": category.id}
+    return listing, ListingDao.custom_field_rows(category, data.custom_fields)
+
+
+async def _write_batch(batch: list[tuple[int, tuple[dict[str, Any], list[dict[str, Any]]]]], report: ImportReport):
+    start = time.perf_counter()
+    try:
+        await ListingDao.bulk_create_listings([row for _, row in batch])
+    except Exception as e:
+        # a failing batch is reported on each of its rows, the rest of the feed is still imported
+        logger.exception("Failed to write a batch of %s listings", len(batch))
+        for line, _ in batch:
+            report.add_error(line, f"Batch failed: {e}")
+        return
+    seconds = time.perf_counter() - start
+    report.imported += len(batch)
+    report.batches.append(
+        BatchReport(rows=len(batch), seconds=round(seconds, 4), rows_per_second=round(len(batch) / seconds, 1))
+    )
+    logger.info("Imported a batch of %s listings in %.3fs", len(batch), seconds)
+
+
+async def import_listings(lines: AsyncIterator[str], fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> ImportReport:
+    """
+    Import a feed of listings, one listing per ndjson line or csv row. Rows are validated
+    against the custom fields of their category and written in batches of `batch_size`,
+    invalid rows are reported and skipped.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt}, expected one of {', '.join(FORMATS)}")
+
+    report = ImportReport()
+    batch: list[tuple[int, tuple[dict[str, Any], list[dict[str, Any]]]]] = []
+    async for line, record in _iter_records(lines, fmt):
+        try:
+            batch.append((line, await _validate(record, fmt)))
+        except ValidationError as e:
+            report.add_error(line, json.dumps(e.errors(), default=str))
+        except HTTPException as e:
+            report.add_error(line, e.description or str(e))
+        except ValueError as e:
+            report.add_error(line, str(e))
+
+        if len(batch) >= batch_size:
+            await _write_batch(batch, report)
+            batch = []
+
+    if batch:
+        await _write_batch(batch, report)
+    return report
+
+
+async def _lines_from_file(lines: Iterable[str]) -> AsyncIterator[str]:
+    for line in lines:
+        yield line.rstrip("\r\n")
+
+
+async def import_path(path: str, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> ImportReport:
+    with open(path, encoding="utf-8", newline="") as f:
+        return await import_listings(_lines_from_file(f), fmt, batch_size)
+
+
+def import_file(path: str, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> ImportReport:
+    return asyncio.get_event_loop().run_until_complete(import_path(path, fmt, batch_size))
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+import sqlalchemy as sa
+
+from ..dao.read_model import refresh_documents
+from ..database.connection import async_session
+from ..models.models import Listing, ListingDocument
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+async def rebuild_documents(batch_size: int = DEFAULT_BATCH_SIZE, missing_only: bool = False) -> int:
+    """
+    Rewrite the listing documents, or only the missing ones, `batch_size` listings at a time in
+    id order with one transaction each, so that a backfill of the whole table holds no long
+    transaction. Returns the number of documents written.
+    """
+    written, last_id = 0, 0
+    while True:
+        ids = sa.select(Listing.id).where(Listing.id > last_id).order_by(Listing.id).limit(batch_size)
+        if missing_only:
+            ids = ids.where(~sa.exists().where(ListingDocument.listing_id == Listing.id))
+        async with async_session.begin() as session:
+            batch = list((await session.scalars(ids)).all())
+            if not batch:
+                return written
+            written += await refresh_documents(session, Listing.id.in_(batch))
+        last_id = batch[-1]
+        logger.info("Wrote %s listing documents, up to listing %s", written, last_id)
+
+
+def rebuild_read_model(batch_size: int = DEFAULT_BATCH_SIZE, missing_only: bool = False) -> int:
+    return asyncio.get_event_loop().run_until_complete(rebuild_documents(batch_size, missing_only))
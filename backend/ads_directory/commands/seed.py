@@ -1,11 +1,12 @@
 import asyncio
 import logging
 
-from flask_bcrypt import generate_password_hash
 from sqlalchemy import select
 
+from ..config import get_settings
 from ..database.connection import async_session
 from ..models.models import Category, CustomFields, User
+from ..passwords import hash_password
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,10 @@ async def create_user(session: async_session):
         return
 
     user1 = User(
-        name="John", last_name="Dow", email="jd@email.com", password=generate_password_hash("pass").decode("utf-8")
+        name="John",
+        last_name="Dow",
+        email="jd@email.com",
+        password=hash_password("pass", get_settings().security.BCRYPT_ROUNDS),
     )
     session.add(user1)
 
@@ -0,0 +1,320 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+import orjson
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..dao.custom_field_filters import typed_value
+from ..dao.listing_counts import adjust_listing_counts
+from ..dao.read_model import row_document
+from ..dao.search import index_listing_range
+from ..database.connection import async_session
+from ..models.models import Category, CategoryCustomFields, CustomFields, Listing, ListingCustomFields, ListingDocument
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATEGORIES = 60
+DEFAULT_BATCH_SIZE = 10_000
+
+# the generated listings are spread over the year before ANCHOR, a fixed date so that a seed
+# always generates the same rows
+ANCHOR = datetime(2026, 1, 1)
+SPAN = timedelta(days=365)
+# a listing has a value for each custom field of its category with that probability
+FILLED_FIELD_RATE = 0.9
+# the share of listings of the nth largest category decreases as 1 / n ** CATEGORY_SKEW
+CATEGORY_SKEW = 0.8
+
+ADJECTIVES = (
+    "Used New Vintage Compact Spacious Modern Classic Reliable Rare Bright Quiet Sturdy Elegant Practical Renovated "
+    "Premium Affordable Lightweight Unique"
+).split()
+WORDS = (
+    "excellent condition owner delivery available price negotiable pickup warranty original documents included "
+    "recently serviced clean smoke free garage kept contact evenings weekend viewing quick sale moving abroad minor "
+    "scratches fully working tested extras city center quiet street family home light"
+).split()
+CONDITIONS = ("New", "Like new", "Good", "Fair", "For parts")
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """A custom field of the generated data, its values are drawn from `options` or `low`..`high`."""
+
+    name: str
+    type: str
+    description: str
+    options: tuple[str, ...] = ()
+    low: int = 0
+    high: int = 0
+
+    def field_config(self) -> dict[str, Any]:
+        config: dict[str, Any] = {"placeholder": self.description.lower()}
+        if self.options:
+            config["options"] = [{"label": option, "value": option} for option in self.options]
+        return config
+
+    def sample(self, rng: random.Random) -> str:
+        return rng.choice(self.options) if self.options else str(rng.randint(self.low, self.high))
+
+
+@dataclass(frozen=True)
+class Vertical:
+    """A kind of category: its custom fields, the nouns of its listing names and its log-normal prices."""
+
+    fields: tuple[FieldSpec, ...]
+    nouns: tuple[str, ...]
+    price_mu: float
+    price_sigma: float
+
+
+# "Car Make", "Car Fuel Type", "Bedrooms" and "Bathrooms" are the custom fields of commands/seed.py
+VERTICALS = {
+    "Cars": Vertical(
+        fields=(
+            FieldSpec("Car Make", "select", "Car make", options=("Toyota", "Honda", "BMW", "Mercedes")),
+            FieldSpec("Car Fuel Type", "select", "Car fuel type", options=("Petrol", "Diesel", "Electric")),
+            FieldSpec("Year", "number", "Year of the first registration", low=1990, high=2025),
+            FieldSpec("Mileage", "number", "Mileage in km", low=0, high=300_000),
+        ),
+        nouns=("sedan", "hatchback", "SUV", "estate", "coupe", "convertible", "van"),
+        price_mu=9.2,
+        price_sigma=0.7,
+    ),
+    "Real Estate": Vertical(
+        fields=(
+            FieldSpec("Bedrooms", "number", "Number of bedrooms", low=1, high=6),
+            FieldSpec("Bathrooms", "number", "Number of bathrooms", low=1, high=4),
+            FieldSpec("Surface", "number", "Surface in square meters", low=20, high=400),
+            FieldSpec("Heating", "select", "Heating", options=("Gas", "Electric", "Heat pump", "District")),
+        ),
+        nouns=("apartment", "house", "studio", "loft", "villa", "townhouse"),
+        price_mu=12.3,
+        price_sigma=0.6,
+    ),
+    "Electronics": Vertical(
+        fields=(
+            FieldSpec("Brand", "select", "Brand", options=("Apple", "Samsung", "Sony", "Lenovo", "Dell", "LG")),
+            FieldSpec("Condition", "select", "Condition", options=CONDITIONS),
+            FieldSpec("Warranty Months", "number", "Remaining warranty in months", low=0, high=36),
+        ),
+        nouns=("laptop", "phone", "tablet", "camera", "monitor", "headphones", "console", "television"),
+        price_mu=5.5,
+        price_sigma=0.9,
+    ),
+    "Furniture": Vertical(
+        fields=(
+            FieldSpec("Material", "select", "Material", options=("Wood", "Metal", "Glass", "Fabric", "Leather")),
+            FieldSpec("Condition", "select", "Condition", options=CONDITIONS),
+            FieldSpec("Color", "select", "Color", options=("Black", "White", "Grey", "Brown", "Blue", "Green")),
+        ),
+        nouns=("sofa", "table", "chair", "wardrobe", "bed", "desk", "bookcase", "dresser"),
+        price_mu=4.8,
+        price_sigma=0.8,
+    ),
+    "Bikes": Vertical(
+        fields=(
+            FieldSpec("Bike Type", "select", "Bike type", options=("Road", "Mountain", "City", "Gravel", "E-bike")),
+            FieldSpec("Condition", "select", "Condition", options=CONDITIONS),
+            FieldSpec("Frame Size", "number", "Frame size in cm", low=44, high=62),
+        ),
+        nouns=("bike", "bicycle", "e-bike", "tandem", "cargo bike"),
+        price_mu=6.0,
+        price_sigma=0.7,
+    ),
+    "Jobs": Vertical(
+        fields=(
+            FieldSpec("Contract", "select", "Contract", options=("Full time", "Part time", "Freelance", "Internship")),
+            FieldSpec("Remote", "select", "Remote work", options=("Yes", "No", "Hybrid")),
+            FieldSpec("Experience Years", "number", "Years of experience required", low=0, high=15),
+        ),
+        nouns=("developer", "designer", "accountant", "driver", "nurse", "teacher", "chef", "technician"),
+        price_mu=10.5,
+        price_sigma=0.4,
+    ),
+}
+
+
+@dataclass
+class GeneratedCategory:
+    category: Category
+    vertical: Vertical
+    custom_fields: list[tuple[CustomFields, FieldSpec]]
+
+
+@dataclass
+class ListingGenerator:
+    """
+    Draw listings and their custom field values from `random.Random(seed)`, the same seed and
+    categories always give the same rows whatever the ids they are generated with.
+    """
+
+    categories: list[GeneratedCategory]
+    seed: int = 0
+    rng: random.Random = field(init=False)
+    cum_weights: list[float] = field(init=False)
+    field_names: dict[int, str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.rng = random.Random(self.seed)
+        # a few large categories and a long tail of small ones
+        weights = [1 / (rank + 1) ** CATEGORY_SKEW for rank in range(len(self.categories))]
+        self.rng.shuffle(weights)
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.field_names = {c.id: c.name for category in self.categories for c, _ in category.custom_fields}
+
+    def batch(self, first_id: int, count: int) -> tuple[list[dict[str, Any]], ...]:
+        """
+        The listings rows of ids `first_id`..`first_id + count - 1`, their listing_custom_fields
+        rows and their listing_documents rows.
+        """
+        rng = self.rng
+        listings, custom_fields, documents = [], [], []
+        categories = rng.choices(self.categories, cum_weights=self.cum_weights, k=count)
+        for listing_id, category in enumerate(categories, first_id):
+            vertical = category.vertical
+            created_at = ANCHOR - SPAN * rng.random()
+            listing = {
+                "id": listing_id,
+                "name": f"{rng.choice(ADJECTIVES)} {rng.choice(vertical.nouns)} {rng.randint(1, 9999)}",
+                "description": " ".join(rng.choices(WORDS, k=rng.randint(6, 20))).capitalize(),
+                "price": round(rng.lognormvariate(vertical.price_mu, vertical.price_sigma), 2),
+                "category_id": category.category.id,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+            values = [
+                {
+                    "listing_id": listing_id,
+                    "custom_field_id": custom_field.id,
+                    **typed_value(custom_field, spec.sample(rng)),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+                for custom_field, spec in category.custom_fields
+                if rng.random() < FILLED_FIELD_RATE
+            ]
+            listings.append(listing)
+            custom_fields.extend(values)
+            documents.append(
+                {
+                    "listing_id": listing_id,
+                    "document": row_document(listing, category.category, values, self.field_names),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+        return listings, custom_fields, documents
+
+
+async def create_catalog(session: AsyncSession, categories: int) -> list[GeneratedCategory]:
+    """
+    The custom fields of the verticals and `categories` categories cycling through them, the
+    ones with the same name are reused so that seeding again adds listings to the same catalog.
+    """
+    specs = {spec.name: spec for vertical in VERTICALS.values() for spec in vertical.fields}
+    existing = await session.scalars(sa.select(CustomFields).where(CustomFields.name.in_(specs)))
+    custom_fields = {custom_field.name: custom_field for custom_field in existing}
+    for name, spec in specs.items():
+        if name not in custom_fields:
+            custom_fields[name] = CustomFields(
+                name=name, type=spec.type, description=spec.description, field_config=spec.field_config()
+            )
+            session.add(custom_fields[name])
+
+    verticals = itertools.cycle(VERTICALS)
+    names = [f"{vertical} {i // len(VERTICALS) + 1}" for i, vertical in zip(range(categories), verticals)]
+    existing = await session.scalars(sa.select(Category).where(Category.name.in_(names)))
+    by_name = {category.name: category for category in existing}
+    for name in names:
+        if name not in by_name:
+            vertical = name.rsplit(" ", 1)[0]
+            by_name[name] = Category(name=name, description=f"{vertical} listings")
+            session.add(by_name[name])
+    await session.flush()
+
+    links = set(
+        (await session.execute(sa.select(CategoryCustomFields.category_id, CategoryCustomFields.custom_field_id))).all()
+    )
+    generated = []
+    for name in names:
+        category, vertical = by_name[name], VERTICALS[name.rsplit(" ", 1)[0]]
+        fields = [(custom_fields[spec.name], spec) for spec in vertical.fields]
+        missing = [
+            {"category_id": category.id, "custom_field_id": c.id} for c, _ in fields if (category.id, c.id) not in links
+        ]
+        if missing:
+            await session.execute(sa.insert(CategoryCustomFields), missing)
+        generated.append(GeneratedCategory(category=category, vertical=vertical, custom_fields=fields))
+    return generated
+
+
+async def _copy(session: AsyncSession, table: sa.Table, rows: list[dict[str, Any]]) -> None:
+    """Insert `rows` with COPY on postgres, with a core executemany elsewhere."""
+    if not rows:
+        return
+    if session.bind.dialect.name != "postgresql":  # type: ignore
+        await session.execute(sa.insert(table), rows)
+        return
+    columns = list(rows[0])
+    # asyncpg takes json values encoded
+    encoded = {c.name for c in table.columns if isinstance(c.type, sa.JSON)}
+    records = [tuple(orjson.dumps(row[c]).decode() if c in encoded else row[c] for c in columns) for row in rows]
+    connection = await (await session.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(  # type: ignore
+        table.name, records=records, columns=columns
+    )
+
+
+async def generate_listings(
+    scale: int, seed: int = 0, categories: int = DEFAULT_CATEGORIES, batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """
+    Add `scale` synthetic listings, `batch_size` per transaction. The ids are given explicitly
+    after the largest existing one so that the custom field values and the listing documents
+    are written in the same batch without reading anything back, the text index and the
+    listing counters are kept up to date in each transaction. Returns the number of listings.
+    """
+    async with async_session.begin() as session:
+        generator = ListingGenerator(await create_catalog(session, categories), seed)
+        first_id = (await session.scalar(sa.select(sa.func.max(Listing.id))) or 0) + 1
+
+    start = time.perf_counter()
+    for offset in range(0, scale, batch_size):
+        batch_start = time.perf_counter()
+        listings, custom_fields, documents = generator.batch(first_id + offset, min(batch_size, scale - offset))
+        async with async_session.begin() as session:
+            await _copy(session, Listing.__table__, listings)  # type: ignore
+            await _copy(session, ListingCustomFields.__table__, custom_fields)  # type: ignore
+            await _copy(session, ListingDocument.__table__, documents)  # type: ignore
+            await index_listing_range(session, listings[0]["id"], listings[-1]["id"])
+            await adjust_listing_counts(session, Counter(listing["category_id"] for listing in listings))
+        logger.info(
+            "Wrote %s of %s listings, %.0f listings/s",
+            offset + len(listings),
+            scale,
+            len(listings) / (time.perf_counter() - batch_start),
+        )
+
+    async with async_session.begin() as session:
+        if session.bind.dialect.name == "postgresql":  # type: ignore
+            # the ids were given explicitly, the next listing created by the API must not reuse one
+            await session.execute(
+                sa.text("SELECT setval(pg_get_serial_sequence('listings', 'id'), (SELECT max(id) FROM listings))")
+            )
+    logger.info("Wrote %s listings in %.0fs", scale, time.perf_counter() - start)
+    return scale
+
+
+def seed_scale(
+    scale: int, seed: int = 0, categories: int = DEFAULT_CATEGORIES, batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    return asyncio.get_event_loop().run_until_complete(generate_listings(scale, seed, categories, batch_size))
@@ -0,0 +1,103 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Awaitable, Callable, Iterable, TypeVar, cast
+
+from quart import Response, g, make_response, request
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass(frozen=True)
+class Version:
+    """The validators of a resource, computed from a cheap probe of its rows."""
+
+    etag: str
+    last_modified: datetime | None = None
+
+    @classmethod
+    def of(cls, *values: Any, last_modified: bool = True) -> "Version":
+        """
+        Version of the probed `values`, e.g. ids and updated_at columns. The Last-Modified date
+        is the latest datetime among them; lists should not set it as it misses deleted rows.
+        """
+        # rows are flattened into their columns
+        flat = [v for value in values for v in (value if _is_row(value) else [value])]
+        etag = hashlib.sha1(repr(flat).encode("utf-8")).hexdigest()
+        dates = [v for v in flat if isinstance(v, datetime)]
+        return cls(etag=etag, last_modified=max(dates) if last_modified and dates else None)
+
+    def not_modified(self) -> bool:
+        # If-Modified-Since is ignored when the client sent If-None-Match, see RFC 9110 13.1.3
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(self.etag)
+        if self.last_modified is not None and request.if_modified_since is not None:
+            return _utc(self.last_modified).replace(microsecond=0) <= request.if_modified_since
+        return False
+
+    def apply(self, response: Response) -> Response:
+        response.set_etag(self.etag, weak=True)
+        if self.last_modified is not None:
+            response.last_modified = _utc(self.last_modified)
+        if "Cache-Control" not in response.headers:
+            # caches may store the response but have to revalidate it
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+def _is_row(value: Any) -> bool:
+    return isinstance(value, Iterable) and not isinstance(value, (str, bytes))
+
+
+def _utc(value: datetime) -> datetime:
+    # the models store naive utc datetimes
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def set_version(version: Version) -> None:
+    """
+    Set the version of the response of a `conditional` view, computed from the rows the view
+    loaded, so that a request without validators gets its ETag without running the probe.
+    """
+    g.conditional_version = version
+
+
+def _has_validators() -> bool:
+    return bool(request.if_none_match) or request.if_modified_since is not None
+
+
+def conditional(probe: Callable[..., Awaitable[Version | None]]) -> Callable[[F], F]:
+    """
+    Answer conditional GET requests from `probe` instead of running the view. The probe is
+    called with the arguments of the view and returns the current `Version` of the resource,
+    or None to let the view answer (e.g. with a 404). Must be the closest decorator to the view
+    so that it gets the validated query arguments.
+
+    Requests without If-None-Match or If-Modified-Since are not probed first: the view answers
+    them and its response gets the version set by the view with `set_version`, views that do
+    not set one are probed after they answered.
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _has_validators():
+                response = await make_response(await func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                version = g.pop("conditional_version", None) or await probe(*args, **kwargs)
+                return version.apply(response) if version is not None else response
+
+            version = await probe(*args, **kwargs)
+            if version is None:
+                return await func(*args, **kwargs)
+            if version.not_modified():
+                return version.apply(Response("", status=304))
+
+            response = await make_response(await func(*args, **kwargs))
+            return version.apply(response) if response.status_code == 200 else response
+
+        return cast(F, wrapper)
+
+    return decorator
@@ -1,3 +1,6 @@
+import functools
+from typing import Any
+
 import typed_settings as typed_settings
 
 
@@ -13,6 +16,68 @@ class Quart:
 class Database:
     URI: str
     ECHO: bool
+    # connection pool, per hypercorn worker
+    POOL_SIZE: int = 5
+    MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT: float = 30
+    POOL_PRE_PING: bool = True
+    POOL_RECYCLE: int = 1800
+    # number of connections opened before the worker starts serving
+    POOL_WARM_UP: int = 0
+    # comma separated URIs of read replicas, the read methods of the DAOs are spread over them
+    REPLICA_URIS: str = ""
+    # seconds a client reads from the primary after a write, must cover the replication lag
+    READ_YOUR_WRITES_WINDOW: float = 5
+
+
+@typed_settings.settings
+class Instrumentation:
+    # count and time the sql statements of every request, see database/instrumentation.py
+    ENABLED: bool = False
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+
+@typed_settings.settings
+class Cache:
+    # shared response cache and invalidation channel of the workers, see cache/
+    # memory (one worker), sqlite (URL is the path of a file shared by the workers of a host) or redis
+    BACKEND: str = "memory"
+    URL: str = ""
+    DEFAULT_TTL: float = 60
+    # facet counts are not invalidated by the listing writes, they are only that old at most
+    FACETS_TTL: float = 30
+    # how often the sqlite backend polls for invalidations
+    POLL_INTERVAL: float = 0.05
+
+
+@typed_settings.settings
+class Security:
+    # bcrypt work factor of the new password hashes, each extra round doubles the cost
+    BCRYPT_ROUNDS: int = 12
+    # threads hashing passwords, per hypercorn worker, and calls allowed to wait for them
+    HASH_WORKERS: int = 4
+    HASH_QUEUE_LIMIT: int = 64
+
+
+@typed_settings.settings
+class Jobs:
+    # background job workers, started next to hypercorn with the run-worker command, see jobs/
+    WORKER_SLOTS: int = 4
+    POLL_INTERVAL: float = 1.0
+    # a running job without a heartbeat for that long is given to another worker
+    LEASE: float = 300
+    # a failed attempt is retried after BACKOFF_BASE * 2 ** (attempts - 1) seconds, at most BACKOFF_MAX
+    BACKOFF_BASE: float = 5
+    BACKOFF_MAX: float = 3600
+    # the feeds of the background imports wait there for their job, shared by the app and the workers
+    SPOOL_DIR: str = "spool"
+
+
+@typed_settings.settings
+class Startup:
+    # every hypercorn worker creates READY_DIR/<pid> once it serves and removes it when it stops,
+    # `python -m ads_directory.startup --wait-ready N` waits for N of them, empty to disable
+    READY_DIR: str = ""
 
 
 @typed_settings.settings
@@ -20,18 +85,37 @@ class Settings:
     base_path: str
     quart: Quart
     database: Database
+    instrumentation: Instrumentation = Instrumentation()
+    cache: Cache = Cache()
+    security: Security = Security()
+    jobs: Jobs = Jobs()
+    startup: Startup = Startup()
+
+
+def load_settings() -> Settings:
+    return typed_settings.load_settings(
+        cls=Settings,
+        loaders=[
+            typed_settings.FileLoader(
+                files=[typed_settings.find("config/config.toml")],
+                env_var="CONFIG",
+                formats={
+                    "*.toml": typed_settings.TomlFormat("ads_directory"),
+                },
+            ),
+            typed_settings.EnvLoader(prefix=""),
+        ],
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The settings, loaded from the config file and the environment on first use."""
+    return load_settings()
 
 
-settings = typed_settings.load_settings(
-    cls=Settings,
-    loaders=[
-        typed_settings.FileLoader(
-            files=[typed_settings.find("config/config.toml")],
-            env_var="CONFIG",
-            formats={
-                "*.toml": typed_settings.TomlFormat("ads_directory"),
-            },
-        ),
-        typed_settings.EnvLoader(prefix=""),
-    ],
-)
+def __getattr__(name: str) -> Any:
+    # `from ads_directory.config import settings` loads the settings when it runs, not when config is imported
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
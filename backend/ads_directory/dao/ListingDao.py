@@ -1,22 +1,337 @@
-from sqlalchemy import select
-from sqlalchemy.orm import joinedload
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+from sqlalchemy import Row, Select, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.elements import ColumnElement
+from werkzeug.exceptions import BadRequest
 
 from ads_directory.blueprints.schema import CreateListingSchema, ListingSchema
+from ads_directory.cache import cache, listing_tag
 from ads_directory.dao.base_dao import BaseDao
+from ads_directory.dao.category_dao import CategoryDao
+from ads_directory.dao.custom_field_filters import CustomFieldFilter, custom_field_criteria, fields_by_name, typed_value
+from ads_directory.dao.facets import FACETED_FIELD_TYPES, facets_document, facets_statement
+from ads_directory.dao.listing_counts import adjust_listing_counts, counted_total, estimated_total
+from ads_directory.dao.pagination import decode_cursor
+from ads_directory.dao.read_model import refresh_documents, remove_documents, source_documents
+from ads_directory.dao.search import index_listings, remove_listings, search_statement
 from ads_directory.database.connection import async_session
-from ads_directory.models.models import Category, CustomFields, Listing, ListingCustomFields
+from ads_directory.database.routing import read_session
+from ads_directory.models.models import Category, CustomFields, Listing, ListingCustomFields, ListingDocument
+
+# the listings row of a listing and its listing_custom_fields rows, see ListingDao.custom_field_rows
+ListingRows = tuple[dict[str, Any], list[dict[str, Any]]]
+
+# the keyset of each sort of the listings and whether it is descending. A sort of the listings, or of
+# a category, is read in order from ix_listings_created_at_id or ix_listings_price_id, or their
+# category_id prefixed version. A price range sorted by date is not: the range is searched on the
+# price index and its rows are sorted before the page is taken
+LISTING_SORTS = {
+    "created_at": ((Listing.created_at, Listing.id), False),
+    "-created_at": ((Listing.created_at, Listing.id), True),
+    "price": ((Listing.price, Listing.id), False),
+    "-price": ((Listing.price, Listing.id), True),
+}
 
 
 class ListingDao(BaseDao):
     @staticmethod
-    async def get_paginated_listing(page: int = 1, per_page: int = 20) -> list[Listing]:
+    async def listing_criteria(
+        session: AsyncSession,
+        custom_field_filters: list[CustomFieldFilter] | None = None,
+        category_id: int | None = None,
+        price_min: float | None = None,
+        price_max: float | None = None,
+    ) -> list[ColumnElement[bool]]:
+        """The where clause of the listings matching the filters of the listing page."""
+        if price_min is not None and price_max is not None and price_min > price_max:
+            raise BadRequest("price_min must not be greater than price_max")
+        criteria = []
+        if category_id is not None:
+            criteria.append(Listing.category_id == category_id)
+        if price_min is not None:
+            criteria.append(Listing.price >= price_min)
+        if price_max is not None:
+            criteria.append(Listing.price <= price_max)
+        if custom_field_filters:
+            names = {f.name for f in custom_field_filters}
+            fields = (await session.execute(select(CustomFields).where(CustomFields.name.in_(names)))).scalars()
+            criteria.extend(custom_field_criteria(custom_field_filters, fields_by_name(fields)))
+        return criteria
+
+    @classmethod
+    async def paginated_listing_select(
+        cls,
+        session: AsyncSession,
+        page: int = 1,
+        per_page: int = 20,
+        cursor: str | None = None,
+        sort: str = "created_at",
+        **filters: Any,
+    ) -> Select[Any]:
+        if sort not in LISTING_SORTS:
+            raise BadRequest(f"Unknown sort {sort}, use one of {', '.join(LISTING_SORTS)}")
+        keyset, descending = LISTING_SORTS[sort]
+        l = select(Listing).order_by(*(c.desc() if descending else c for c in keyset)).limit(per_page)
+        l = l.where(*await cls.listing_criteria(session, **filters))
+        if cursor:
+            # keyset pagination on the sort key, a cursor of another sort is rejected
+            last = tuple_(*decode_cursor(cursor, len(keyset), sort=sort))
+            l = l.where(tuple_(*keyset) < last if descending else tuple_(*keyset) > last)
+        else:
+            l = l.offset((page - 1) * per_page)
+        return l
+
+    @staticmethod
+    async def get_facets(fields: list[str] | None, custom_field_filters: list[CustomFieldFilter]) -> dict[str, Any]:
+        """
+        The counts of the listings matching the filters per value of the custom fields named in
+        `fields`, all the select fields by default, and per category.
+        """
+        names = {f.name for f in custom_field_filters} | set(fields or [])
+        condition = CustomFields.name.in_(names)
+        if fields is None:
+            condition = or_(condition, CustomFields.type.in_(FACETED_FIELD_TYPES))
+        async with read_session().begin() as session:
+            result = await session.execute(select(CustomFields).where(condition))
+            # names are not unique, a name facets and filters every custom field of that name
+            custom_fields = result.scalars().all()
+            by_name = fields_by_name(custom_fields)
+            unknown = [name for name in fields or [] if name not in by_name]
+            if unknown:
+                raise BadRequest(f"Unknown custom field {', '.join(unknown)}")
+            faceted = [
+                c for c in custom_fields if (c.name in fields if fields is not None else c.type in FACETED_FIELD_TYPES)
+            ]
+            rows = await session.execute(
+                facets_statement([c.id for c in faceted], custom_field_criteria(custom_field_filters, by_name))
+            )
+            return facets_document(rows, {c.id: c.name for c in faceted})
+
+    @classmethod
+    async def count_listings(cls, **filters: Any) -> tuple[int, bool]:
+        """
+        The number of listings matching the filters of `listing_criteria` and whether it is
+        exact. Without other filter than the category it is read from the counters maintained
+        on write, a filtered set is counted or estimated by `estimated_total`.
+        """
+        async with read_session().begin() as session:
+            category_id = filters.pop("category_id", None)
+            if all(value in (None, []) for value in filters.values()):
+                return await counted_total(session, category_id), True
+            criteria = await cls.listing_criteria(session, category_id=category_id, **filters)
+            return await estimated_total(session, select(Listing.id).where(*criteria))
+
+    @staticmethod
+    def _document_updated_at() -> ColumnElement[Any]:
+        # a listing written before its document, e.g. before rebuild-read-model ran, is versioned by its row
+        return func.coalesce(ListingDocument.updated_at, Listing.updated_at).label("updated_at")
+
+    @classmethod
+    async def get_paginated_listing_documents(cls, **kwargs: Any) -> list[Any]:
+        """
+        The documents of a page of listings and their updated_at, see `paginated_listing_select`, with
+        the columns of the sort keys. The listings index is scanned and each document is read by primary key,
+        the documents not written yet are rendered from the sources of the listing.
+        """
+        async with read_session().begin() as session:
+            l = (await cls.paginated_listing_select(session, **kwargs)).outerjoin(
+                ListingDocument, ListingDocument.listing_id == Listing.id
+            )
+            result = await session.execute(
+                l.with_only_columns(
+                    ListingDocument.document, cls._document_updated_at(), Listing.id, Listing.created_at, Listing.price
+                )
+            )
+            rows: list[Any] = list(result.all())
+            missing = [row.id for row in rows if row.document is None]
+            if missing:
+                documents = await source_documents(session, Listing.id.in_(missing))
+                rows = [
+                    SimpleNamespace(**{**row._mapping, "document": documents[row.id]}) if row.document is None else row
+                    for row in rows
+                ]
+            return rows
+
+    @classmethod
+    async def get_paginated_listing_versions(cls, **kwargs: Any) -> list[Row[Any]]:
+        """The id of the listings of a page and the updated_at of their document."""
+        async with read_session().begin() as session:
+            l = (await cls.paginated_listing_select(session, **kwargs)).outerjoin(
+                ListingDocument, ListingDocument.listing_id == Listing.id
+            )
+            result = await session.execute(l.with_only_columns(Listing.id, cls._document_updated_at()))
+            return list(result.all())
+
+    @classmethod
+    async def get_listing_version(cls, listing_id: int) -> Row[Any] | None:
+        # the document is rewritten whenever the listing, its category or its custom fields change
+        async with read_session().begin() as session:
+            result = await session.execute(
+                select(cls._document_updated_at())
+                .select_from(Listing)
+                .outerjoin(ListingDocument, ListingDocument.listing_id == Listing.id)
+                .where(Listing.id == listing_id)
+            )
+            return result.first()
+
+    @classmethod
+    async def get_listing_document(cls, listing_id: int) -> Any | None:
+        """The document of a listing and its updated_at, rendered from its sources when it is not written yet."""
+        async with read_session().begin() as session:
+            result = await session.execute(
+                select(ListingDocument.document, cls._document_updated_at())
+                .select_from(Listing)
+                .outerjoin(ListingDocument, ListingDocument.listing_id == Listing.id)
+                .where(Listing.id == listing_id)
+            )
+            row = result.first()
+            if row is None or row.document is not None:
+                return row
+            documents = await source_documents(session, Listing.id == listing_id)
+            return SimpleNamespace(document=documents[listing_id], updated_at=row.updated_at)
+
+    @staticmethod
+    def _typed_value(category: Category, custom_field_id: int, value: str) -> dict[str, Any]:
+        custom_field = next((c for c in category.custom_fields if c.id == custom_field_id), None)
+        if custom_field is None:
+            raise BadRequest(f"Custom field {custom_field_id} does not belong to category {category.name}")
+        return typed_value(custom_field, value)
+
+    @classmethod
+    def custom_field_rows(
+        cls, category: Category, custom_fields: list[CreateListingSchema.CustomFieldItem] | None
+    ) -> list[dict[str, Any]]:
+        """Validate the custom field values against the category and build the listing_custom_fields rows."""
+        return [{"custom_field_id": c.id, **cls._typed_value(category, c.id, c.value)} for c in custom_fields or []]
+
+    @staticmethod
+    async def bulk_create_listings(rows: list[ListingRows]) -> list[int]:
+        """
+        Insert a batch of already validated listings, each given as its listings row and its
+        listing_custom_fields rows, with one executemany per table in a single transaction.
+        """
         async with async_session.begin() as session:
-            l = select(Listing).options(joinedload(Listing.category)).limit(per_page).offset((page - 1) * per_page)
-            result = await session.execute(l)
-            return result.scalars().unique().all()
+            ids = await ListingDao._insert_listings(session, rows)
+            await adjust_listing_counts(session, Counter(listing["category_id"] for listing, _ in rows))
+            await index_listings(session, ids)
+            await refresh_documents(session, Listing.id.in_(ids))
+        return ids
+
+    @staticmethod
+    async def _insert_listings(session: AsyncSession, rows: list[ListingRows]) -> list[int]:
+        if not rows:
+            return []
+        ids = list(
+            (
+                await session.scalars(
+                    insert(Listing).returning(Listing.id, sort_by_parameter_order=True),
+                    [listing for listing, _ in rows],
+                )
+            ).all()
+        )
+        custom_fields = [{"listing_id": listing_id, **c} for listing_id, (_, cfs) in zip(ids, rows) for c in cfs]
+        if custom_fields:
+            await session.execute(insert(ListingCustomFields), custom_fields)
+        return ids
+
+    @staticmethod
+    async def _update_listings(session: AsyncSession, rows: dict[int, ListingRows]) -> None:
+        if not rows:
+            return
+        now = datetime.utcnow()
+        await session.execute(
+            update(Listing),
+            [{"id": listing_id, **listing, "updated_at": now} for listing_id, (listing, _) in rows.items()],
+        )
+
+        # diff the custom field values like update_listing, with one statement per kind of change
+        result = await session.execute(
+            select(
+                ListingCustomFields.listing_id,
+                ListingCustomFields.custom_field_id,
+                ListingCustomFields.value,
+                ListingCustomFields.value_number,
+            ).where(ListingCustomFields.listing_id.in_(rows))
+        )
+        current = {(r.listing_id, r.custom_field_id): (r.value, r.value_number) for r in result}
+        wanted = {(listing_id, c["custom_field_id"]): c for listing_id, (_, cfs) in rows.items() for c in cfs}
+        removed = [key for key in current if key not in wanted]
+        changed = [
+            {"listing_id": key[0], **c, "updated_at": now}
+            for key, c in wanted.items()
+            if key in current and current[key] != (c["value"], c["value_number"])
+        ]
+        added = [{"listing_id": key[0], **c} for key, c in wanted.items() if key not in current]
+        if removed:
+            await session.execute(
+                delete(ListingCustomFields).where(
+                    tuple_(ListingCustomFields.listing_id, ListingCustomFields.custom_field_id).in_(removed)
+                )
+            )
+        if changed:
+            await session.execute(update(ListingCustomFields), changed)
+        if added:
+            await session.execute(insert(ListingCustomFields), added)
 
     @staticmethod
-    async def create_listing(data: CreateListingSchema):
+    async def _delete_listings(session: AsyncSession, ids: list[int]) -> None:
+        if not ids:
+            return
+        await remove_listings(session, ids)
+        await remove_documents(session, ids)
+        await session.execute(delete(ListingCustomFields).where(ListingCustomFields.listing_id.in_(ids)))
+        await session.execute(delete(Listing).where(Listing.id.in_(ids)))
+
+    # upper bound of the statements of one write_batch call, sqlite being the worst case
+    MAX_BATCH_STATEMENTS = 19
+
+    @classmethod
+    async def write_batch(
+        cls, creates: list[ListingRows], updates: dict[int, ListingRows], deletes: list[int]
+    ) -> tuple[list[int], set[int]]:
+        """
+        Apply already validated creates, updates (by listing id) and deletes in one transaction,
+        with a constant number of statements whatever the number of listings, at most
+        MAX_BATCH_STATEMENTS. Returns the ids of the created listings and the ids to update or
+        delete that do not exist, those are skipped.
+        """
+        async with async_session.begin() as session:
+            # the current category of each listing, to move it between the listing counters
+            existing: dict[int, int] = {}
+            if updates or deletes:
+                result = await session.execute(
+                    select(Listing.id, Listing.category_id)
+                    .where(Listing.id.in_([*updates, *deletes]))
+                    .with_for_update()
+                )
+                existing = dict(result.tuples().all())
+            missing = {listing_id for listing_id in [*updates, *deletes] if listing_id not in existing}
+            updates = {listing_id: row for listing_id, row in updates.items() if listing_id in existing}
+            deletes = [listing_id for listing_id in deletes if listing_id in existing]
+
+            ids = await cls._insert_listings(session, creates)
+            await cls._update_listings(session, updates)
+            await cls._delete_listings(session, deletes)
+
+            deltas: Counter[int] = Counter(listing["category_id"] for listing, _ in creates)
+            for listing_id, (listing, _) in updates.items():
+                deltas[existing[listing_id]] -= 1
+                deltas[listing["category_id"]] += 1
+            deltas.subtract(existing[listing_id] for listing_id in deletes)
+            await adjust_listing_counts(session, deltas)
+            await index_listings(session, [*ids, *updates])
+            if ids or updates:
+                await refresh_documents(session, Listing.id.in_([*ids, *updates]))
+        await cache.invalidate(*(listing_tag(listing_id) for listing_id in [*updates, *deletes]))
+        return ids, missing
+
+    @classmethod
+    async def create_listing(cls, data: CreateListingSchema):
         async with async_session.begin() as session:
             listing = Listing(
                 name=data.name,
@@ -24,22 +339,12 @@ class ListingDao(BaseDao):
                 price=data.price,
             )
 
-            category = (
-                (
-                    await session.execute(
-                        select(Category)
-                        .options(joinedload(Category.custom_fields))
-                        .where(Category.id == data.category_id)
-                    )
-                )
-                .unique()
-                .scalar_one_or_none()
-            )
-
+            category = await CategoryDao.get_category(data.category_id)
             if category is None:
                 return {"error": "Category not found"}, 404
 
-            listing.category = category
+            # attach the cached category without reloading it
+            listing.category = await session.merge(category, load=False)
 
             # get the category custom fields
             # validate the custom fields
@@ -48,75 +353,74 @@ class ListingDao(BaseDao):
             if data.custom_fields:
                 for c in data.custom_fields:
                     # add the value in relation table listing_custom_fields
-                    lcf = ListingCustomFields(listing_id=listing.id, custom_field_id=c.id, value=c.value)
+                    lcf = ListingCustomFields(
+                        listing_id=listing.id, custom_field_id=c.id, **cls._typed_value(category, c.id, c.value)
+                    )
                     listing.custom_fields_association.append(lcf)
             session.add(listing)
+            await session.flush()
+            await adjust_listing_counts(session, {category.id: 1})
+            await index_listings(session, [listing.id])
+            await refresh_documents(session, Listing.id == listing.id)
             await session.commit()
             return listing
 
     @classmethod
     async def update_listing(cls, listing_id, data: CreateListingSchema):
-        async with async_session() as session:
+        """
+        Update the listing and its custom field values in one transaction. Only the values that
+        changed are written, the flush batches the inserts, updates and deletes per statement.
+        """
+        async with async_session.begin() as session:
             listing = (
-                (
-                    await session.execute(
-                        select(Listing)
-                        .options(
-                            joinedload(Listing.category),
-                            joinedload(Listing.custom_fields_association),
-                            joinedload(Listing.custom_fields),
-                        )
-                        .where(Listing.id == listing_id)
-                    )
+                await session.execute(
+                    select(Listing)
+                    .options(selectinload(Listing.custom_fields_association))
+                    .where(Listing.id == listing_id)
+                    # concurrent updates of the listing wait for this one, their diff starts from its result
+                    .with_for_update(of=Listing)
                 )
-                .unique()
-                .scalar_one_or_none()
-            )
+            ).scalar_one_or_none()
 
             if listing is None:
                 raise Exception("Listing not found")
 
-            listing.name = data.name
-            listing.description = data.description
-            listing.price = data.price
-
-            category = (
-                (
-                    await session.execute(
-                        select(Category)
-                        .options(joinedload(Category.custom_fields))
-                        .where(Category.id == data.category_id)
-                    )
-                )
-                .unique()
-                .scalar_one_or_none()
-            )
-
+            category = await CategoryDao.get_category(data.category_id)
             if category is None:
                 raise Exception("Category not found")
+            # validated before anything is written
+            rows = {row["custom_field_id"]: row for row in cls.custom_field_rows(category, data.custom_fields)}
 
-            listing.category = category
-
-            # get the category custom fields
-            # validate the custom fields
-            # ToDo add required field to custom fields and valiate
-
-            # delete the existing custom fields
-            # Clear current custom fields association
-            listing.custom_fields.clear()
-            await session.commit()
+            if listing.category_id != category.id:
+                await adjust_listing_counts(session, {listing.category_id: -1, category.id: 1})
+            reindex = (listing.name, listing.description) != (data.name, data.description)
+            listing.name = data.name
+            listing.description = data.description
+            listing.price = data.price
+            # the custom field values live in another table, bump the listing so its ETag changes with them
+            listing.updated_at = datetime.utcnow()
+            # attach the cached category without reloading it
+            listing.category = await session.merge(category, load=False)
 
-            if data.custom_fields:
-                for c in data.custom_fields:
-                    # add the value in relation table listing_custom_fields
-                    lcf = ListingCustomFields(listing_id=listing.id, custom_field_id=c.id, value=c.value)
-                    listing.custom_fields_association.append(lcf)
+            for lcf in list(listing.custom_fields_association):
+                row = rows.pop(lcf.custom_field_id, None)
+                if row is None:
+                    listing.custom_fields_association.remove(lcf)
+                    await session.delete(lcf)
+                elif (lcf.value, lcf.value_number) != (row["value"], row["value_number"]):
+                    lcf.update(**row)
+            for row in rows.values():
+                listing.custom_fields_association.append(ListingCustomFields(listing_id=listing.id, **row))
 
-            await session.commit()
-            return listing
+            await session.flush()
+            if reindex:
+                await index_listings(session, [listing.id])
+            await refresh_documents(session, Listing.id == listing.id)
+        await cache.invalidate(listing_tag(listing.id))
+        return listing
 
     @classmethod
-    def delete_listing(cls, listing_id) -> bool:
+    async def delete_listing(cls, listing_id) -> bool:
         async with async_session() as session:
             listing = (
                 (
@@ -132,6 +436,89 @@ class ListingDao(BaseDao):
             if listing is None:
                 raise Exception("Listing not found")
 
-            session.delete(listing)
+            await remove_listings(session, [listing.id])
+            await remove_documents(session, [listing.id])
+            await session.execute(delete(ListingCustomFields).where(ListingCustomFields.listing_id == listing.id))
+            await session.delete(listing)
+            await adjust_listing_counts(session, {listing.category_id: -1})
             await session.commit()
-            return True
+        await cache.invalidate(listing_tag(listing_id))
+        return True
+
+    @staticmethod
+    async def stream_listings(
+        category_id: int | None = None, updated_since: datetime | None = None, partition_size: int = 500
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        Stream every listing with its category and custom field values, in partitions of
+        `partition_size` rows read from a server side cursor. Custom field values are
+        loaded with one IN query per partition, so memory stays flat whatever the table size.
+        """
+        l = (
+            select(
+                Listing.id,
+                Listing.name,
+                Listing.description,
+                Listing.price,
+                Listing.category_id,
+                Category.name.label("category_name"),
+                Listing.created_at,
+                Listing.updated_at,
+            )
+            .join(Category, Category.id == Listing.category_id)
+            .order_by(Listing.id)
+            .execution_options(yield_per=partition_size)
+        )
+        if category_id is not None:
+            l = l.where(Listing.category_id == category_id)
+        if updated_since is not None:
+            l = l.where(Listing.updated_at >= updated_since)
+
+        reader = read_session()
+        async with reader() as session:
+            result = await session.stream(l)
+            async for partition in result.partitions():
+                custom_fields: dict[int, list[dict[str, Any]]] = {row.id: [] for row in partition}
+                values = await session.execute(
+                    select(
+                        ListingCustomFields.listing_id,
+                        ListingCustomFields.custom_field_id,
+                        CustomFields.name,
+                        ListingCustomFields.value,
+                    )
+                    .join(CustomFields, CustomFields.id == ListingCustomFields.custom_field_id)
+                    .where(ListingCustomFields.listing_id.in_(list(custom_fields)))
+                )
+                for value in values:
+                    custom_fields[value.listing_id].append(
+                        {"id": value.custom_field_id, "name": value.name, "value": value.value}
+                    )
+
+                yield [
+                    {
+                        "id": row.id,
+                        "name": row.name,
+                        "description": row.description,
+                        "price": row.price,
+                        "category": {"id": row.category_id, "name": row.category_name},
+                        "custom_fields": custom_fields[row.id],
+                        "created_at": row.created_at,
+                        "updated_at": row.updated_at,
+                    }
+                    for row in partition
+                ]
+
+    @staticmethod
+    async def search_listing(q: str, page: int = 1, per_page: int = 20) -> list[Listing]:
+        async with read_session().begin() as session:
+            l = (
+                search_statement(session, q)
+                .options(
+                    joinedload(Listing.category),
+                    selectinload(Listing.custom_fields_association).joinedload(ListingCustomFields.custom_field),
+                )
+                .limit(per_page)
+                .offset((page - 1) * per_page)
+            )
+            result = await session.execute(l)
+            return result.scalars().unique().all()
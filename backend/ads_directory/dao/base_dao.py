@@ -4,7 +4,9 @@ from typing import TypeVar
 import sqlalchemy as sa
 from sqlalchemy.orm import DeclarativeBase
 
+from ads_directory.dao.pagination import decode_cursor
 from ads_directory.database.connection import async_session
+from ads_directory.database.routing import read_session
 
 T = TypeVar("T", bound=DeclarativeBase)
 
@@ -12,7 +14,7 @@ T = TypeVar("T", bound=DeclarativeBase)
 class BaseDao:
     @staticmethod
     async def get_all(model: typing.Type[T], *criteria: typing.Any, opt: typing.Any | None = None) -> list[T]:
-        async with async_session.begin() as session:
+        async with read_session().begin() as session:
             select = sa.select(model).filter(*criteria)
             if opt:
                 select.options(opt)  # type: ignore
@@ -20,15 +22,40 @@ class BaseDao:
             return typing.cast(list[T], result.scalars().all())
 
     @staticmethod
-    async def get_paginated(model: typing.Type[T], *criteria: typing.Any, page: int = 1, per_page: int = 20) -> list[T]:
-        async with async_session.begin() as session:
-            select = sa.select(model).filter(*criteria).limit(per_page).offset((page - 1) * per_page)
+    def paginated_select(
+        model: typing.Type[T], *criteria: typing.Any, page: int = 1, per_page: int = 20, cursor: str | None = None
+    ) -> sa.Select[typing.Any]:
+        select = sa.select(model).filter(*criteria).order_by(model.id).limit(per_page)  # type: ignore
+        if cursor:
+            # keyset pagination, seek past the last id of the previous page
+            (last_id,) = decode_cursor(cursor, 1)
+            select = select.where(model.id > last_id)  # type: ignore
+        else:
+            select = select.offset((page - 1) * per_page)
+        return select
+
+    @staticmethod
+    async def get_paginated(
+        model: typing.Type[T], *criteria: typing.Any, page: int = 1, per_page: int = 20, cursor: str | None = None
+    ) -> list[T]:
+        async with read_session().begin() as session:
+            select = BaseDao.paginated_select(model, *criteria, page=page, per_page=per_page, cursor=cursor)
             result = await session.execute(select)
             return typing.cast(list[T], result.scalars().all())
 
+    @staticmethod
+    async def get_versions(select: sa.Select[typing.Any], *columns: typing.Any) -> list[sa.Row[typing.Any]]:
+        """
+        Run `select` reading only the given columns, typically the ids and updated_at of a page,
+        as a cheap probe of whether the full rows changed.
+        """
+        async with read_session().begin() as session:
+            result = await session.execute(select.with_only_columns(*columns))
+            return list(result.all())
+
     @staticmethod
     async def get_one(model: typing.Type[T], *criteria: typing.Any) -> T:
-        async with async_session.begin() as session:
+        async with read_session().begin() as session:
             result = await session.execute(sa.select(model).filter(*criteria))  # type: ignore
             return typing.cast(T, result.scalars().first())
 
@@ -1,35 +1,82 @@
 import typing
+from datetime import datetime
 from typing import Any
 
 import sqlalchemy as sa
 from sqlalchemy.orm import joinedload
 
 from ads_directory.blueprints.schema import CreateCategorySchema
+from ads_directory.cache import CATEGORIES, cache
 from ads_directory.dao.base_dao import BaseDao, T
+from ads_directory.dao.read_model import rename_category
+from ads_directory.dao.schema_cache import schema_cache
 from ads_directory.database.connection import async_session
-from ads_directory.models.models import Category, CustomFields
+from ads_directory.database.routing import on_primary, read_session
+from ads_directory.models.models import Category, CategoryCustomFields, CustomFields
 
 
 class CategoryDao(BaseDao):
     @staticmethod
-    async def get_paginated_categories(page: int = 1, per_page: int = 20) -> list[Category]:
-        async with async_session.begin() as session:
-            result = await session.execute(
-                sa.select(Category)
-                .options(joinedload(Category.custom_fields))
-                .offset((page - 1) * per_page)
-                .limit(per_page)
+    async def get_paginated_categories(page: int = 1, per_page: int = 20, cursor: str | None = None) -> list[Category]:
+        async with read_session().begin() as session:
+            select = BaseDao.paginated_select(Category, page=page, per_page=per_page, cursor=cursor).options(
+                joinedload(Category.custom_fields)
             )
+            result = await session.execute(select)
             return result.scalars().unique().all()
 
+    @staticmethod
+    async def get_paginated_categories_versions(
+        page: int = 1, per_page: int = 20, cursor: str | None = None
+    ) -> tuple[list[sa.Row[Any]], sa.Row[Any]]:
+        """
+        The id and updated_at of the categories of a page, and the latest updated_at and number of
+        the custom fields, whose names and types are embedded in the page.
+        """
+        async with read_session().begin() as session:
+            select = BaseDao.paginated_select(Category, page=page, per_page=per_page, cursor=cursor)
+            rows = (await session.execute(select.with_only_columns(Category.id, Category.updated_at))).all()
+            custom_fields = await session.execute(
+                sa.select(sa.func.max(CustomFields.updated_at), sa.func.count(CustomFields.id))
+            )
+            return list(rows), custom_fields.one()
+
+    @staticmethod
+    async def get_category_version(category_id: int) -> sa.Row[Any] | None:
+        """The updated_at of the category and the latest updated_at and number of its custom fields."""
+        async with read_session().begin() as session:
+            result = await session.execute(
+                sa.select(Category.updated_at, sa.func.max(CustomFields.updated_at), sa.func.count(CustomFields.id))
+                .outerjoin(CategoryCustomFields, CategoryCustomFields.category_id == Category.id)
+                .outerjoin(CustomFields, CustomFields.id == CategoryCustomFields.custom_field_id)
+                .where(Category.id == category_id)
+                .group_by(Category.id, Category.updated_at)
+            )
+            return result.first()
+
     @staticmethod
     async def get_one(model: typing.Type[T], *criteria: typing.Any) -> T:
-        async with async_session.begin() as session:
+        async with read_session().begin() as session:
             result = await session.execute(
                 sa.select(Category).options(joinedload(Category.custom_fields)).where(*criteria)
             )
             return result.scalars().first()
 
+    @staticmethod
+    async def get_category(category_id: int) -> Category | None:
+        """Get a category with its custom fields, served from the schema cache when possible."""
+        category = schema_cache.get(category_id)
+        if category is not None:
+            return category
+
+        version = schema_cache.version
+        # a lagging replica could put back a category older than the last invalidation
+        with on_primary():
+            category = await CategoryDao.get_one(Category, Category.id == category_id)
+        if category is not None:
+            schema_cache.put(category, version)
+        return category
+
     @staticmethod
     async def create_category(data: CreateCategorySchema) -> Category:
         # if custom_fields are provided, fetch them from the database and add them to the category
@@ -47,7 +94,8 @@ class CategoryDao(BaseDao):
 
             session.add(c)
             await session.commit()
-            return c
+        await cache.invalidate(CATEGORIES)
+        return c
 
     @staticmethod
     async def update_category(category_id: int, data: CreateCategorySchema) -> Category:
@@ -60,6 +108,8 @@ class CategoryDao(BaseDao):
             cs_ids = data.custom_fields
             del data.custom_fields
 
+            # the listing documents embed the name and description of their category
+            renamed = (c.name, c.description) != (data.name, data.description)
             c.update(**data.dict())
 
             if cs_ids:
@@ -71,6 +121,18 @@ class CategoryDao(BaseDao):
             else:
                 c.custom_fields.clear()
 
+            # a change of the custom fields alone does not touch the category row, bump it for the ETag
+            c.updated_at = datetime.utcnow()
             await session.merge(c)
+            if renamed:
+                await session.flush()
+                await rename_category(session, category_id, c.name, c.description)
             await session.commit()
-            return c
+        await cache.invalidate(CATEGORIES)
+        return c
+
+    @staticmethod
+    async def delete_category(category_id: int) -> int:
+        rowcount = await BaseDao.delete(Category, Category.id == category_id)
+        await cache.invalidate(CATEGORIES)
+        return rowcount
@@ -0,0 +1,21 @@
+from typing import Any
+
+import sqlalchemy as sa
+
+from ads_directory.dao.base_dao import BaseDao
+from ads_directory.dao.read_model import rename_custom_field
+from ads_directory.database.connection import async_session
+from ads_directory.models.models import CustomFields
+
+
+class CustomFieldDao(BaseDao):
+    @staticmethod
+    async def update_custom_field(custom_field_id: int, **values: Any) -> None:
+        """Update the custom field, and the documents of the listings with a value of it when it is renamed."""
+        async with async_session.begin() as session:
+            name = await session.scalar(
+                sa.select(CustomFields.name).where(CustomFields.id == custom_field_id).with_for_update()
+            )
+            await session.execute(sa.update(CustomFields).where(CustomFields.id == custom_field_id).values(**values))
+            if name is not None and name != values.get("name", name):
+                await rename_custom_field(session, custom_field_id, values["name"])
@@ -0,0 +1,110 @@
+import operator
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Mapping
+
+from sqlalchemy import select
+from sqlalchemy.sql.elements import ColumnElement
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest
+
+from ads_directory.models.models import CustomFields, Listing, ListingCustomFields
+
+# custom field types whose values are stored in ListingCustomFields.value_number
+NUMERIC_FIELD_TYPES = frozenset({"number"})
+
+OPERATORS: dict[str, Callable[[Any, Any], ColumnElement[bool]]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+# cf[<name>] or cf[<name>][<operator>]
+_FILTER_PARAM = re.compile(r"^cf\[(?P<name>[^\[\]]+)\](?:\[(?P<op>[a-z]+)\])?$")
+
+
+@dataclass(frozen=True)
+class CustomFieldFilter:
+    name: str
+    op: str
+    value: str
+
+
+def parse_custom_field_filters(args: MultiDict[str, str]) -> list[CustomFieldFilter]:
+    """
+    Collect the custom field filters from the query string, e.g.
+    `cf[Car Make]=Toyota&cf[Bedrooms][gte]=3&cf[Car Fuel Type][in]=Petrol,Diesel`.
+    """
+    filters = []
+    for key, value in args.items(multi=True):
+        match = _FILTER_PARAM.match(key)
+        if match is None:
+            continue
+        op = match.group("op") or "eq"
+        if op not in OPERATORS and op != "in":
+            raise BadRequest(f"Unsupported operator {op} for custom field {match.group('name')}")
+        filters.append(CustomFieldFilter(name=match.group("name"), op=op, value=value))
+    return filters
+
+
+def is_numeric(custom_field: CustomFields) -> bool:
+    return custom_field.type in NUMERIC_FIELD_TYPES
+
+
+def _to_number(custom_field: CustomFields, value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise BadRequest(f"Custom field {custom_field.name} expects a number, got {value}")
+
+
+def typed_value(custom_field: CustomFields, value: str) -> dict[str, Any]:
+    """The column values used to store `value` for the given custom field."""
+    return {"value": value, "value_number": _to_number(custom_field, value) if is_numeric(custom_field) else None}
+
+
+def fields_by_name(custom_fields: Iterable[CustomFields]) -> dict[str, list[CustomFields]]:
+    """Group the custom fields by name, the names are not unique."""
+    grouped: dict[str, list[CustomFields]] = {}
+    for custom_field in custom_fields:
+        grouped.setdefault(custom_field.name, []).append(custom_field)
+    return grouped
+
+
+def custom_field_criteria(
+    filters: Iterable[CustomFieldFilter], fields_by_name: Mapping[str, list[CustomFields]]
+) -> list[ColumnElement[bool]]:
+    """
+    Translate the filters into `listings.id IN (...)` criteria. Every subquery is a range
+    scan on one of the (custom_field_id, value[_number], listing_id) indexes. A name shared by
+    several custom fields filters on all of them, they must store their values the same way.
+    """
+    criteria = []
+    for f in filters:
+        custom_fields = fields_by_name.get(f.name)
+        if not custom_fields:
+            raise BadRequest(f"Unknown custom field {f.name}")
+        numeric = {is_numeric(c) for c in custom_fields}
+        if len(numeric) > 1:
+            raise BadRequest(f"Custom field {f.name} is ambiguous, the fields of that name have different types")
+        custom_field = custom_fields[0]
+
+        values: list[Any] = f.value.split(",") if f.op == "in" else [f.value]
+        if is_numeric(custom_field):
+            column = ListingCustomFields.value_number
+            values = [_to_number(custom_field, v) for v in values]
+        else:
+            column = ListingCustomFields.value
+
+        condition = column.in_(values) if f.op == "in" else OPERATORS[f.op](column, values[0])
+        criteria.append(
+            Listing.id.in_(
+                select(ListingCustomFields.listing_id).where(
+                    ListingCustomFields.custom_field_id.in_([c.id for c in custom_fields]), condition
+                )
+            )
+        )
+    return criteria
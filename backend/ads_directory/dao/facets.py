@@ -0,0 +1,63 @@
+import hashlib
+from collections import Counter
+from typing import Any, Iterable
+
+from sqlalchemy import CompoundSelect, func, literal, select, union_all
+from sqlalchemy.sql.elements import ColumnElement
+
+from ads_directory.dao.custom_field_filters import CustomFieldFilter
+from ads_directory.models.models import Category, Listing, ListingCustomFields
+
+# custom field types faceted when the request does not name the fields
+FACETED_FIELD_TYPES = frozenset({"select"})
+
+CUSTOM_FIELD_FACET = "custom_field"
+CATEGORY_FACET = "category"
+
+
+def facets_signature(fields: Iterable[str] | None, filters: Iterable[CustomFieldFilter]) -> str:
+    """A key identifying the facets of a filter, whatever the order of the parameters."""
+    signature = repr((sorted(fields) if fields is not None else None, sorted((f.name, f.op, f.value) for f in filters)))
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
+
+def facets_statement(custom_field_ids: list[int], criteria: list[ColumnElement[bool]]) -> CompoundSelect:
+    """
+    The counts of the listings matching `criteria` per value of the given custom fields and
+    per category, as (kind, key, value, count) rows of a single statement. The custom field
+    counts are an index only scan of ix_listing_custom_fields_field_value.
+    """
+    by_value = (
+        select(
+            literal(CUSTOM_FIELD_FACET).label("kind"),
+            ListingCustomFields.custom_field_id.label("key"),
+            ListingCustomFields.value.label("value"),
+            func.count().label("count"),
+        )
+        .where(ListingCustomFields.custom_field_id.in_(custom_field_ids))
+        .group_by(ListingCustomFields.custom_field_id, ListingCustomFields.value)
+    )
+    if criteria:
+        by_value = by_value.where(ListingCustomFields.listing_id.in_(select(Listing.id).where(*criteria)))
+    by_category = (
+        select(literal(CATEGORY_FACET), Category.id, Category.name, func.count())
+        .join_from(Listing, Category, Listing.category_id == Category.id)
+        .where(*criteria)
+        .group_by(Category.id, Category.name)
+    )
+    return union_all(by_value, by_category)
+
+
+def facets_document(rows: Iterable[Any], field_names: dict[int, str]) -> dict[str, Any]:
+    """The facets of `facets_statement` rows by custom field name, the counts of the fields sharing a name add up."""
+    values: dict[str, Counter[str]] = {name: Counter() for name in field_names.values()}
+    categories = []
+    for kind, key, value, count in rows:
+        if kind == CUSTOM_FIELD_FACET:
+            values[field_names[key]][value] += count
+        else:
+            categories.append({"id": key, "name": value, "count": count})
+    facets = {name: [{"value": value, "count": count} for value, count in c.items()] for name, c in values.items()}
+    for counts in [*facets.values(), categories]:
+        counts.sort(key=lambda c: -c["count"])
+    return {"facets": facets, "categories": categories}
@@ -0,0 +1,75 @@
+import json
+from typing import Any
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from ads_directory.models.models import CategoryListingCount
+
+# a filtered set of up to that many listings is counted, a larger one is estimated on postgres
+EXACT_COUNT_LIMIT = 1000
+
+
+class Explain(Executable, ClauseElement):
+    """The postgres json plan of a statement, its parameters stay bound."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select[Any]) -> None:
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+async def adjust_listing_counts(session: AsyncSession, deltas: dict[int, int]) -> None:
+    """
+    Add `deltas` to the listing counters of their category, in the transaction writing the
+    listings so that the counters stay exact. One upsert whatever the number of categories.
+    """
+    rows = [{"category_id": category_id, "count": delta} for category_id, delta in deltas.items() if delta]
+    if not rows:
+        return
+    dialect = session.bind.dialect.name  # type: ignore
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(CategoryListingCount)
+    statement = statement.on_conflict_do_update(
+        index_elements=[CategoryListingCount.category_id],
+        set_={
+            "count": CategoryListingCount.count + statement.excluded.count,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+    await session.execute(statement, rows)
+
+
+async def counted_total(session: AsyncSession, category_id: int | None = None) -> int:
+    """The number of listings, of a category or of all of them, from the counters."""
+    total = select(func.coalesce(func.sum(CategoryListingCount.count), 0))
+    if category_id is not None:
+        total = total.where(CategoryListingCount.category_id == category_id)
+    return (await session.scalar(total)) or 0
+
+
+async def estimated_total(session: AsyncSession, statement: Select[Any]) -> tuple[int, bool]:
+    """
+    The number of rows of `statement` and whether it is exact. On postgres the rows are
+    counted up to EXACT_COUNT_LIMIT and a larger set is estimated from the planner statistics,
+    other databases count them.
+    """
+    if session.bind.dialect.name != "postgresql":  # type: ignore
+        return (await session.scalar(select(func.count()).select_from(statement.subquery()))) or 0, True
+
+    capped = select(func.count()).select_from(statement.limit(EXACT_COUNT_LIMIT + 1).subquery())
+    count = (await session.scalar(capped)) or 0
+    if count <= EXACT_COUNT_LIMIT:
+        return count, True
+    plan = await session.scalar(Explain(statement))
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return max(int(plan[0]["Plan"]["Plan Rows"]), count), False
@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from werkzeug.exceptions import BadRequest
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+    Datetimes are tagged so that they survive the round trip through json.
+    """
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int, sort: str | None = None) -> tuple[Any, ...]:
+    """
+    Decode a cursor produced by `encode_cursor` back into the sort key values.
+    The cursor is user input, so any malformed value is a 400, and so is a cursor
+    of another `sort` when the endpoint has several.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if sort is not None:
+            if not isinstance(payload, list) or not payload or payload.pop(0) != sort:
+                raise ValueError("cursor of another sort")
+        if not isinstance(payload, list) or len(payload) != size:
+            raise ValueError("unexpected cursor size")
+        return tuple(datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in payload)
+    except (ValueError, TypeError, KeyError) as e:
+        raise BadRequest(f"Invalid cursor: {cursor}") from e
+
+
+def next_cursor(rows: list[Any], per_page: int, *attributes: str, sort: str | None = None) -> str | None:
+    """
+    Build the cursor pointing after the last row of a full page, or None when
+    the page is not full and therefore there is nothing left to read.
+    """
+    if not rows or len(rows) < per_page:
+        return None
+    last = rows[-1]
+    values = [getattr(last, attribute) for attribute in attributes]
+    return encode_cursor(*values) if sort is None else encode_cursor(sort, *values)
@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Any
+
+import orjson
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.elements import ColumnElement
+
+from ads_directory.models.models import Category, Listing, ListingCustomFields, ListingDocument
+from ads_directory.serialization import listing_row_to_dict, listing_to_dict
+
+# listing_documents holds every listing as the API returns it, with its category and the names
+# of its custom fields, so that a listing page is read with one indexed query and no join to
+# categories, listing_custom_fields or custom_fields. The rows are rewritten in the transaction
+# changing any of their sources, by ListingDao, CategoryDao and CustomFieldDao.
+
+
+def listing_document(listing: Listing) -> dict[str, Any]:
+    """The document of a listing, its category and its custom field values with their custom field must be loaded."""
+    # stored as json, with the dates formatted as in the responses
+    return orjson.loads(orjson.dumps(listing_to_dict(listing)))
+
+
+def row_document(
+    listing: dict[str, Any], category: Category, custom_fields: list[dict[str, Any]], field_names: dict[int, str]
+) -> dict[str, Any]:
+    """
+    The document of a listing given as its listings and listing_custom_fields rows, the same as
+    `listing_document` builds, for bulk loads writing the documents together with the rows.
+    """
+    return orjson.loads(orjson.dumps(listing_row_to_dict(listing, category, custom_fields, field_names)))
+
+
+async def source_documents(session: AsyncSession, *criteria: ColumnElement[bool]) -> dict[int, dict[str, Any]]:
+    """The documents of the listings matching `criteria` rendered from their sources, by listing id."""
+    listings = (
+        (
+            await session.scalars(
+                sa.select(Listing)
+                .where(*criteria)
+                .options(
+                    joinedload(Listing.category),
+                    selectinload(Listing.custom_fields_association).joinedload(ListingCustomFields.custom_field),
+                )
+                .execution_options(populate_existing=True)
+            )
+        )
+        .unique()
+        .all()
+    )
+    return {listing.id: listing_document(listing) for listing in listings}
+
+
+async def refresh_documents(session: AsyncSession, *criteria: ColumnElement[bool]) -> int:
+    """
+    (Re)write the documents of the listings matching `criteria`, must be called after the
+    listings and their sources are flushed. Returns the number of documents written.
+    """
+    documents = await source_documents(session, *criteria)
+    await remove_documents(session, list(documents))
+    if documents:
+        now = datetime.utcnow()
+        await session.execute(
+            sa.insert(ListingDocument),
+            [
+                {"listing_id": listing_id, "document": document, "created_at": now, "updated_at": now}
+                for listing_id, document in documents.items()
+            ],
+        )
+    return len(documents)
+
+
+# Renames patch the documents embedding the renamed name in place, with one statement, instead of
+# rendering them again. listing_documents.document is json on postgres, patched as jsonb.
+_RENAME_CATEGORY = {
+    "sqlite": "json_set(document, '$.category.name', :name, '$.category.description', :description)",
+    "postgresql": (
+        "jsonb_set(jsonb_set(CAST(document AS jsonb), '{category,name}', to_jsonb(CAST(:name AS text))), "
+        "'{category,description}', to_jsonb(CAST(:description AS text)))::json"
+    ),
+}
+_RENAME_CUSTOM_FIELD = {
+    "sqlite": (
+        "json_set(document, '$.custom_fields', json(("
+        "SELECT json_group_array(CASE WHEN json_extract(value, '$.custom_field_id') = :custom_field_id "
+        "THEN json_set(value, '$.name', :name) ELSE json(value) END) "
+        "FROM json_each(document, '$.custom_fields'))))"
+    ),
+    "postgresql": (
+        "jsonb_set(CAST(document AS jsonb), '{custom_fields}', coalesce(("
+        "SELECT jsonb_agg(CASE WHEN (value ->> 'custom_field_id')::int = :custom_field_id "
+        "THEN jsonb_set(value, '{name}', to_jsonb(CAST(:name AS text))) ELSE value END ORDER BY position) "
+        "FROM jsonb_array_elements(CAST(document AS jsonb) -> 'custom_fields') WITH ORDINALITY AS f(value, position)"
+        "), '[]'::jsonb))::json"
+    ),
+}
+
+
+async def _patch_documents(session: AsyncSession, document: str, listing_ids: str, **params: Any) -> None:
+    await session.execute(
+        sa.text(
+            f"UPDATE listing_documents SET document = {document}, updated_at = :now "
+            f"WHERE listing_id IN ({listing_ids})"
+        ),
+        {**params, "now": datetime.utcnow()},
+    )
+
+
+async def rename_category(session: AsyncSession, category_id: int, name: str, description: str) -> None:
+    """Patch the category name and description in the documents of its listings."""
+    await _patch_documents(
+        session,
+        _RENAME_CATEGORY[session.bind.dialect.name],  # type: ignore
+        "SELECT id FROM listings WHERE category_id = :category_id",
+        category_id=category_id,
+        name=name,
+        description=description,
+    )
+
+
+async def rename_custom_field(session: AsyncSession, custom_field_id: int, name: str) -> None:
+    """Patch the custom field name in the documents of the listings with a value of it."""
+    await _patch_documents(
+        session,
+        _RENAME_CUSTOM_FIELD[session.bind.dialect.name],  # type: ignore
+        "SELECT listing_id FROM listing_custom_fields WHERE custom_field_id = :custom_field_id",
+        custom_field_id=custom_field_id,
+        name=name,
+    )
+
+
+async def remove_documents(session: AsyncSession, listing_ids: list[int]) -> None:
+    if listing_ids:
+        await session.execute(sa.delete(ListingDocument).where(ListingDocument.listing_id.in_(listing_ids)))
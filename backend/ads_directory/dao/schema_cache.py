@@ -0,0 +1,46 @@
+from typing import Any
+
+from ads_directory.cache import CATEGORIES, cache
+from ads_directory.models.models import Category
+from ads_directory.utilities import SingletonMeta
+
+
+class SchemaCache(metaclass=SingletonMeta):
+    """
+    In-process cache of the categories together with their custom fields.
+    The cached instances are detached from any session and must be treated as read only,
+    writers attach them to their own session with `session.merge(category, load=False)`.
+
+    Every invalidation bumps the version, a value loaded under an older version is
+    never stored so that a read racing with a write cannot put back a stale category.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._categories: dict[int, Category] = {}
+
+    def get(self, category_id: int) -> Category | None:
+        category = self._categories.get(category_id)
+        if category is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return category
+
+    def put(self, category: Category, version: int) -> None:
+        if version == self.version:
+            self._categories[category.id] = category
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._categories.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {"version": self.version, "size": len(self._categories), "hits": self.hits, "misses": self.misses}
+
+
+schema_cache = SchemaCache()
+# the other workers drop their categories too when one of them writes
+cache.on_invalidate(CATEGORIES, schema_cache.invalidate)
@@ -0,0 +1,110 @@
+import re
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ads_directory.models.models import Listing
+
+# sqlite keeps the text index in an fts5 table keyed by the listing id (rowid),
+# postgres in the listings.search_vector tsvector column with a GIN index.
+# Both are created by the full_text_search migration and are not mapped on the models.
+FTS_TABLE = "listings_fts"
+TS_CONFIG = "simple"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _dialect(session: AsyncSession) -> str:
+    return session.bind.dialect.name  # type: ignore
+
+
+def fts5_query(q: str) -> str:
+    """
+    Turn free text into a safe fts5 MATCH expression: every word is quoted so that
+    fts5 operators in the input are not interpreted, and the last one is a prefix match.
+    """
+    tokens = [f'"{t}"' for t in _TOKEN.findall(q)]
+    if tokens:
+        tokens[-1] += "*"
+    return " ".join(tokens)
+
+
+async def index_listings(session: AsyncSession, listing_ids: list[int]) -> None:
+    """(Re)index the given listings, must be called after they are flushed."""
+    if not listing_ids:
+        return
+    params = [{"id": listing_id} for listing_id in listing_ids]
+    if _dialect(session) == "sqlite":
+        await session.execute(sa.text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), params)
+        await session.execute(
+            sa.text(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+                "SELECT id, name, description FROM listings WHERE id = :id"
+            ),
+            params,
+        )
+    elif _dialect(session) == "postgresql":
+        await session.execute(
+            sa.text(
+                f"UPDATE listings SET search_vector = "
+                f"setweight(to_tsvector('{TS_CONFIG}', name), 'A') || "
+                f"setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'B') "
+                "WHERE id = :id"
+            ),
+            params,
+        )
+
+
+async def index_listing_range(session: AsyncSession, first_id: int, last_id: int) -> None:
+    """Index the listings of ids `first_id`..`last_id` with one statement, for bulk loads of new listings."""
+    params = {"first_id": first_id, "last_id": last_id}
+    if _dialect(session) == "sqlite":
+        await session.execute(
+            sa.text(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+                "SELECT id, name, description FROM listings WHERE id BETWEEN :first_id AND :last_id"
+            ),
+            params,
+        )
+    elif _dialect(session) == "postgresql":
+        await session.execute(
+            sa.text(
+                f"UPDATE listings SET search_vector = "
+                f"setweight(to_tsvector('{TS_CONFIG}', name), 'A') || "
+                f"setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'B') "
+                "WHERE id BETWEEN :first_id AND :last_id"
+            ),
+            params,
+        )
+
+
+async def remove_listings(session: AsyncSession, listing_ids: list[int]) -> None:
+    # on postgres the vector goes away together with the row
+    if listing_ids and _dialect(session) == "sqlite":
+        await session.execute(
+            sa.text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), [{"id": listing_id} for listing_id in listing_ids]
+        )
+
+
+def search_statement(session: AsyncSession, q: str) -> Any:
+    """A select of the listings matching `q`, ordered by relevance."""
+    if _dialect(session) == "postgresql":
+        vector = sa.literal_column("listings.search_vector")
+        query = sa.func.websearch_to_tsquery(TS_CONFIG, q)
+        return (
+            sa.select(Listing)
+            .where(vector.op("@@")(query))
+            .order_by(sa.func.ts_rank(vector, query).desc(), Listing.id)
+        )
+
+    fts = sa.table(FTS_TABLE, sa.column("rowid"))
+    match = fts5_query(q)
+    if not match:
+        return sa.select(Listing).where(sa.false())
+    return (
+        sa.select(Listing)
+        .join(fts, fts.c.rowid == Listing.id)
+        .where(sa.literal_column(FTS_TABLE).op("MATCH")(match))
+        .order_by(sa.func.bm25(sa.literal_column(FTS_TABLE)), Listing.id)
+    )
@@ -0,0 +1,39 @@
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from ads_directory.dao.base_dao import BaseDao
+from ads_directory.database.connection import async_session
+from ads_directory.models.models import User
+
+
+class UserDao(BaseDao):
+    @staticmethod
+    async def create_user(**values: Any) -> int | None:
+        """
+        Insert the user unless its email is taken, in a single statement relying on the unique
+        ix_users_email index. Returns the id of the new user, or None when the email exists.
+        """
+        async with async_session.begin() as session:
+            dialect = session.bind.dialect.name  # type: ignore
+            if dialect in ("postgresql", "sqlite"):
+                insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                statement = insert(User).values(**values).on_conflict_do_nothing(index_elements=[User.email])
+                result = await session.execute(statement.returning(User.id))
+                return result.scalar_one_or_none()
+
+        try:
+            async with async_session.begin() as session:
+                result = await session.execute(sa.insert(User).values(**values).returning(User.id))
+                return result.scalar_one()
+        except IntegrityError:
+            return None
+
+    @staticmethod
+    async def get_credentials(email: str) -> sa.Row[Any] | None:
+        """The id and password hash of the user, read through ix_users_email."""
+        async with async_session.begin() as session:
+            result = await session.execute(sa.select(User.id, User.password).where(User.email == email))
+            return result.first()
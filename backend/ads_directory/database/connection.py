@@ -1,7 +1,83 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import asyncio
+from typing import Any
 
-from ads_directory.config import settings
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
-engine = create_async_engine(settings.database.URI, echo=True)
+from ads_directory.config import Database, get_settings
+from ads_directory.database.pool import InstrumentedQueuePool
 
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+def _pool_options(database: Database) -> dict[str, Any]:
+    # in memory sqlite databases live in a single connection, keep the default StaticPool
+    if database.URI.startswith("sqlite") and (":memory:" in database.URI or database.URI.endswith("://")):
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": database.POOL_SIZE,
+        "max_overflow": database.MAX_OVERFLOW,
+        "pool_timeout": database.POOL_TIMEOUT,
+        "pool_pre_ping": database.POOL_PRE_PING,
+        "pool_recycle": database.POOL_RECYCLE,
+    }
+
+
+def replica_uris(database: Database) -> list[str]:
+    return [uri.strip() for uri in database.REPLICA_URIS.split(",") if uri.strip()]
+
+
+# bound to the engine by init_engine, the app creates it before serving and not on import so that
+# the workers start faster and the tests or the commands can pick the database
+async_session = async_sessionmaker(expire_on_commit=False)
+
+_engine: AsyncEngine | None = None
+# read only copies of the primary, see database/routing.py, filled in place by init_engine
+replica_engines: list[AsyncEngine] = []
+replica_sessions: list[async_sessionmaker[AsyncSession]] = []
+
+
+def init_engine(database: Database | None = None) -> AsyncEngine:
+    """
+    Create the engines of the primary and of the replicas of `database`, by default of the
+    settings, and bind the session factories to them. Does nothing when they already exist.
+    """
+    global _engine
+    if _engine is not None:
+        return _engine
+    database = database or get_settings().database
+    _engine = create_async_engine(database.URI, echo=database.ECHO, **_pool_options(database))
+    async_session.configure(bind=_engine)
+    replica_engines[:] = [
+        create_async_engine(uri, echo=database.ECHO, **_pool_options(database)) for uri in replica_uris(database)
+    ]
+    replica_sessions[:] = [async_sessionmaker(replica, expire_on_commit=False) for replica in replica_engines]
+    return _engine
+
+
+def get_engine() -> AsyncEngine:
+    if _engine is None:
+        raise RuntimeError("The database engine is not created, call init_engine first")
+    return _engine
+
+
+async def dispose_engine() -> None:
+    """Close the connections of every engine and forget them, the next init_engine creates new ones."""
+    global _engine
+    for target in [e for e in [_engine, *replica_engines] if e is not None]:
+        await target.dispose()
+    _engine = None
+    async_session.configure(bind=None)
+    replica_engines.clear()
+    replica_sessions.clear()
+
+
+async def warm_up_pool(connections: int) -> None:
+    """
+    Open `connections` connections at once to the primary and to every replica so that
+    they are in the pools before the first request.
+    """
+
+    async def connect(target: AsyncEngine) -> None:
+        async with target.connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+
+    await asyncio.gather(*(connect(e) for e in [get_engine(), *replica_engines] for _ in range(connections)))
@@ -0,0 +1,92 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from quart import Quart, Response, request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    # number of executions per statement text, identical texts are the same statement shape
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(statement, n) for statement, n in self.statements.items() if n >= threshold]
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _query_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect the statements executed within the block, outside of a request."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool):
+    if _query_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool):
+    stats = _query_stats.get()
+    if stats is None or not conn.info.get("query_start_time"):
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - conn.info["query_start_time"].pop()
+    stats.statements[statement] += 1
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    if not event.contains(engine.sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_app(app: Quart, n_plus_one_threshold: int) -> None:
+    """
+    Count and time the statements of every request, report them in a Server-Timing header
+    and log the statements repeated `n_plus_one_threshold` times or more as likely N+1 queries.
+    The engines are instrumented with `instrument_engine` once they are created.
+    """
+
+    @app.before_request
+    async def start_query_stats() -> None:
+        _query_stats.set(QueryStats())
+
+    @app.after_request
+    async def report_query_stats(response: Response) -> Response:
+        stats = _query_stats.get()
+        if stats is None:
+            return response
+        response.headers.add(
+            "Server-Timing", f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'
+        )
+        for statement, n in stats.repeated(n_plus_one_threshold):
+            logger.warning(
+                "Possible N+1 query in %s %s, the same statement ran %s times: %s",
+                request.method,
+                request.path,
+                n,
+                " ".join(statement.split())[:500],
+            )
+        return response
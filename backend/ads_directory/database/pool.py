@@ -0,0 +1,77 @@
+import os
+import time
+from collections import deque
+from typing import Any
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+
+class PoolStats:
+    """Connection checkout statistics of one worker's pool."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        # the most recent waits, used for the percentiles
+        self.recent_waits: deque[float] = deque(maxlen=window)
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+
+    def percentile(self, p: float) -> float:
+        if not self.recent_waits:
+            return 0.0
+        waits = sorted(self.recent_waits)
+        return waits[min(len(waits) - 1, int(len(waits) * p))]
+
+    def dict(self) -> dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / max(self.checkouts + self.timeouts, 1) * 1000, 3),
+            "p95_wait_ms": round(self.percentile(0.95) * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+def pool_status(pool: Pool) -> dict[str, Any]:
+    status: dict[str, Any] = {"pid": os.getpid(), "class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # negative while the pool has not opened pool_size connections yet
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        status["waits"] = pool.stats.dict()
+    return status
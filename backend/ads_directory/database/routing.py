@@ -0,0 +1,64 @@
+import contextlib
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Iterator
+
+from quart import Quart, Response, request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ads_directory.database.connection import async_session, replica_sessions
+
+# set on the clients that wrote, they read from the primary until the time it holds
+PRIMARY_COOKIE = "ads_read_primary_until"
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_on_primary: ContextVar[bool] = ContextVar("on_primary", default=False)
+_turns = itertools.count()
+
+
+def read_session() -> async_sessionmaker[AsyncSession]:
+    """
+    The session factory for a read: the next replica in turn, or the primary when there is
+    no replica or the current request is pinned to it. Writes always use `async_session`.
+    """
+    if not replica_sessions or _on_primary.get():
+        return async_session
+    return replica_sessions[next(_turns) % len(replica_sessions)]
+
+
+@contextlib.contextmanager
+def on_primary() -> Iterator[None]:
+    """Send the reads of the block to the primary, for values that must not be stale."""
+    token = _on_primary.set(True)
+    try:
+        yield
+    finally:
+        _on_primary.reset(token)
+
+
+def _read_primary_until() -> float:
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        return 0
+
+
+def init_app(app: Quart, window: float) -> None:
+    """
+    Pin the requests that write to the primary, and the requests of the clients that wrote
+    in the last `window` seconds so that they read their writes despite the replication lag.
+    """
+
+    @app.before_request
+    async def route_reads() -> None:
+        if request.method not in _READ_METHODS or _read_primary_until() > time.time():
+            _on_primary.set(True)
+
+    @app.after_request
+    async def remember_writes(response: Response) -> Response:
+        if request.method not in _READ_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PRIMARY_COOKIE, str(time.time() + window), max_age=int(window) + 1, httponly=True, samesite="Lax"
+            )
+        return response
@@ -0,0 +1,14 @@
+from typing import Any
+
+from ads_directory.jobs.handlers import JOB_TYPES, JobType, job_type
+from ads_directory.jobs.queue import enqueue, get_job
+from ads_directory.jobs.worker import Worker
+
+__all__ = ["JOB_TYPES", "JobType", "Worker", "get_job", "job_type", "submit"]
+
+
+async def submit(name: str, payload: dict[str, Any] | None = None, delay: float = 0) -> int:
+    """Queue a job of a registered type to run in `delay` seconds, returns its id."""
+    if name not in JOB_TYPES:
+        raise ValueError(f"Unknown job type {name}")
+    return await enqueue(name, payload or {}, JOB_TYPES[name].max_attempts, delay)
@@ -0,0 +1,86 @@
+import contextlib
+import logging
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Awaitable, Callable
+
+import sqlalchemy as sa
+
+from ads_directory.commands.import_listings import DEFAULT_BATCH_SIZE as IMPORT_BATCH_SIZE
+from ads_directory.commands.import_listings import import_path
+from ads_directory.commands.rebuild_read_model import DEFAULT_BATCH_SIZE as REBUILD_BATCH_SIZE
+from ads_directory.commands.rebuild_read_model import rebuild_documents
+from ads_directory.dao.search import index_listings
+from ads_directory.database.connection import async_session
+from ads_directory.jobs import queue
+from ads_directory.models.models import Listing
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict[str, Any]], Awaitable[dict[str, Any] | None]]
+
+
+@dataclass(frozen=True)
+class JobType:
+    handler: Handler
+    # jobs of the type running at the same time, over every worker
+    concurrency: int = 1
+    max_attempts: int = 5
+
+
+JOB_TYPES: dict[str, JobType] = {}
+
+
+def job_type(name: str, concurrency: int = 1, max_attempts: int = 5) -> Callable[[Handler], Handler]:
+    """Register the handler of a job type, it gets the payload and returns the result of the job."""
+
+    def decorator(handler: Handler) -> Handler:
+        JOB_TYPES[name] = JobType(handler, concurrency, max_attempts)
+        return handler
+
+    return decorator
+
+
+# an import is not idempotent, a retry would create again the listings of the batches already written
+@job_type("import_listings", concurrency=2, max_attempts=1)
+async def import_listings_job(payload: dict[str, Any]) -> dict[str, Any]:
+    path = payload["path"]
+    try:
+        report = await import_path(path, payload.get("format", "ndjson"), payload.get("batch_size", IMPORT_BATCH_SIZE))
+    finally:
+        # the job is not retried, the spooled feed would never be read again
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+    return report.dict()
+
+
+@job_type("rebuild_read_model")
+async def rebuild_read_model_job(payload: dict[str, Any]) -> dict[str, Any]:
+    written = await rebuild_documents(payload.get("batch_size", REBUILD_BATCH_SIZE), payload.get("missing", False))
+    return {"written": written}
+
+
+@job_type("reindex_listings")
+async def reindex_listings_job(payload: dict[str, Any]) -> dict[str, Any]:
+    """Rebuild the full text index of every listing, `batch_size` listings per transaction."""
+    batch_size = payload.get("batch_size", 1000)
+    indexed, last_id = 0, 0
+    while True:
+        async with async_session.begin() as session:
+            ids = list(
+                (
+                    await session.scalars(
+                        sa.select(Listing.id).where(Listing.id > last_id).order_by(Listing.id).limit(batch_size)
+                    )
+                ).all()
+            )
+            if not ids:
+                return {"indexed": indexed}
+            await index_listings(session, ids)
+        indexed, last_id = indexed + len(ids), ids[-1]
+
+
+@job_type("purge_jobs")
+async def purge_jobs_job(payload: dict[str, Any]) -> dict[str, Any]:
+    return {"deleted": await queue.purge(timedelta(days=payload.get("days", 7)))}
@@ -0,0 +1,141 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any
+
+import sqlalchemy as sa
+
+from ads_directory.database.connection import async_session
+from ads_directory.models.models import Job
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# keep the error of a failed attempt readable in the job status
+MAX_ERROR_LENGTH = 2000
+
+
+def backoff(attempts: int, base: float, cap: float) -> float:
+    """Seconds before the next attempt of a job that failed `attempts` times, doubling with jitter."""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def enqueue(job_type: str, payload: dict[str, Any], max_attempts: int, delay: float = 0) -> int:
+    now = datetime.utcnow()
+    async with async_session.begin() as session:
+        result = await session.execute(
+            sa.insert(Job)
+            .values(
+                type=job_type,
+                payload=payload,
+                status=QUEUED,
+                attempts=0,
+                max_attempts=max_attempts,
+                run_at=now + timedelta(seconds=delay),
+            )
+            .returning(Job.id)
+        )
+        return result.scalar_one()
+
+
+async def get_job(job_id: int) -> Job | None:
+    # on the primary, a client polling the status of its job must not see it go back in time
+    async with async_session.begin() as session:
+        return await session.get(Job, job_id)
+
+
+async def claim(job_type: str, concurrency: int, worker_id: str) -> Job | None:
+    """
+    Take the next due job of `job_type` for `worker_id`, unless `concurrency` jobs of that type
+    are already running on any worker. The check and the update are one statement, serialized
+    per type by an advisory lock on postgres and by the database lock on sqlite.
+    """
+    now = datetime.utcnow()
+    async with async_session.begin() as session:
+        if session.bind.dialect.name == "postgresql":  # type: ignore
+            await session.execute(sa.select(sa.func.pg_advisory_xact_lock(sa.func.hashtext(f"jobs:{job_type}"))))
+        running = (
+            sa.select(sa.func.count()).select_from(Job).where(Job.type == job_type, Job.status == RUNNING)
+        ).scalar_subquery()
+        # served by ix_jobs_type_status_run_at
+        next_job = (
+            sa.select(Job.id)
+            .where(Job.type == job_type, Job.status == QUEUED, Job.run_at <= now)
+            .order_by(Job.run_at, Job.id)
+            .limit(1)
+        ).scalar_subquery()
+        result = await session.scalars(
+            sa.update(Job)
+            .where(Job.id == next_job, running < concurrency)
+            .values(status=RUNNING, attempts=Job.attempts + 1, locked_by=worker_id, locked_at=now, updated_at=now)
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        )
+        return result.first()
+
+
+async def heartbeat(job: Job) -> None:
+    async with async_session.begin() as session:
+        await session.execute(
+            sa.update(Job)
+            .where(Job.id == job.id, Job.locked_by == job.locked_by, Job.status == RUNNING)
+            .values(locked_at=datetime.utcnow())
+        )
+
+
+async def complete(job: Job, result: dict[str, Any] | None) -> None:
+    async with async_session.begin() as session:
+        await session.execute(
+            sa.update(Job)
+            .where(Job.id == job.id, Job.locked_by == job.locked_by)
+            .values(status=SUCCEEDED, result=result, error=None, locked_by=None, locked_at=None)
+        )
+
+
+async def fail(job: Job, error: str, retry_in: float) -> bool:
+    """Record a failed attempt, the job is queued again in `retry_in` seconds unless it ran out of attempts."""
+    retry = job.attempts < job.max_attempts
+    async with async_session.begin() as session:
+        await session.execute(
+            sa.update(Job)
+            .where(Job.id == job.id, Job.locked_by == job.locked_by)
+            .values(
+                status=QUEUED if retry else FAILED,
+                run_at=datetime.utcnow() + timedelta(seconds=retry_in),
+                error=error[:MAX_ERROR_LENGTH],
+                locked_by=None,
+                locked_at=None,
+            )
+        )
+    return retry
+
+
+async def requeue_stale(lease: float) -> int:
+    """
+    Give back the running jobs whose worker has not sent a heartbeat for `lease` seconds, it
+    died or lost the database. They are queued again, or failed when out of attempts.
+    """
+    stale = sa.and_(Job.status == RUNNING, Job.locked_at < datetime.utcnow() - timedelta(seconds=lease))
+    async with async_session.begin() as session:
+        failed = await session.execute(
+            sa.update(Job)
+            .where(stale, Job.attempts >= Job.max_attempts)
+            .values(status=FAILED, error="The worker running the job stopped", locked_by=None, locked_at=None)
+        )
+        requeued = await session.execute(
+            sa.update(Job).where(stale).values(status=QUEUED, run_at=datetime.utcnow(), locked_by=None, locked_at=None)
+        )
+        return failed.rowcount + requeued.rowcount  # type: ignore
+
+
+async def purge(older_than: timedelta) -> int:
+    """Delete the succeeded and failed jobs that ended more than `older_than` ago."""
+    async with async_session.begin() as session:
+        result = await session.execute(
+            sa.delete(Job).where(
+                Job.status.in_([SUCCEEDED, FAILED]), Job.updated_at < datetime.utcnow() - older_than
+            )
+        )
+        return result.rowcount  # type: ignore
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+
+from ads_directory.jobs import queue
+from ads_directory.jobs.handlers import JobType
+from ads_directory.models.models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Run the queued jobs of `job_types`, at most `slots` at a time in this process and at most
+    the concurrency of each type over every worker. A running job sends a heartbeat every
+    third of `lease`, the jobs of a worker silent for longer are given to another one.
+    """
+
+    def __init__(
+        self,
+        job_types: dict[str, JobType],
+        slots: int = 4,
+        poll_interval: float = 1.0,
+        lease: float = 300,
+        backoff_base: float = 5,
+        backoff_max: float = 3600,
+    ) -> None:
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.job_types = job_types
+        self.slots = slots
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tasks: dict[asyncio.Task[None], str] = {}
+
+    def _running(self, name: str) -> int:
+        return sum(1 for job_type in self._tasks.values() if job_type == name)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Take jobs until `stop` is set, then wait for the running ones to finish."""
+        logger.info("Worker %s started for %s", self.id, ", ".join(self.job_types))
+        requeued_at = 0.0
+        while not stop.is_set():
+            try:
+                if time.monotonic() - requeued_at > self.lease / 3:
+                    requeued_at = time.monotonic()
+                    if requeued := await queue.requeue_stale(self.lease):
+                        logger.warning("Gave back %s jobs of stopped workers", requeued)
+                claimed = await self._claim()
+            except Exception:
+                # the database is away, keep the running jobs and try again later
+                logger.exception("Worker %s failed to take jobs", self.id)
+                claimed = False
+            if not claimed:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info("Worker %s stopped", self.id)
+
+    async def _claim(self) -> bool:
+        claimed = False
+        for name, job_type in self.job_types.items():
+            if len(self._tasks) >= self.slots:
+                break
+            if self._running(name) >= job_type.concurrency:
+                continue
+            job = await queue.claim(name, job_type.concurrency, self.id)
+            if job is not None:
+                task = asyncio.create_task(self._execute(job, job_type))
+                self._tasks[task] = name
+                task.add_done_callback(self._tasks.pop)
+                claimed = True
+        return claimed
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await queue.heartbeat(job)
+            except Exception:
+                logger.exception("Failed to send the heartbeat of job %s", job.id)
+
+    async def _execute(self, job: Job, job_type: JobType) -> None:
+        logger.info("Running job %s %s, attempt %s of %s", job.id, job.type, job.attempts, job.max_attempts)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        started = time.perf_counter()
+        try:
+            result = await job_type.handler(job.payload)
+        except Exception as e:
+            logger.exception("Job %s %s failed", job.id, job.type)
+            retry_in = queue.backoff(job.attempts, self.backoff_base, self.backoff_max)
+            if await queue.fail(job, f"{type(e).__name__}: {e}", retry_in):
+                logger.info("Job %s %s is retried in %.0fs", job.id, job.type, retry_in)
+        else:
+            await queue.complete(job, result)
+            logger.info("Job %s %s succeeded in %.1fs", job.id, job.type, time.perf_counter() - started)
+        finally:
+            heartbeat.cancel()
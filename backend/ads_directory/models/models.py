@@ -1,7 +1,19 @@
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, ForeignKeyConstraint, Integer, String, event
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+)
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -45,6 +57,11 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(200), nullable=False)
     password: Mapped[str] = mapped_column(String(200), nullable=False)
 
+    __table_args__ = (
+        # the login reads the id and password from the index alone on postgres
+        Index("ix_users_email", "email", unique=True, postgresql_include=["id", "password"]),
+    )
+
 
 class Category(Base):
     __tablename__ = "categories"
@@ -109,7 +126,32 @@ class Listing(Base):
         "ListingCustomFields", back_populates="listing"
     )
 
-    __table_args__ = (ForeignKeyConstraint(["category_id"], ["categories.id"]),)
+    __table_args__ = (
+        ForeignKeyConstraint(["category_id"], ["categories.id"]),
+        Index("ix_listings_created_at_id", "created_at", "id"),
+        Index("ix_listings_updated_at", "updated_at"),
+        Index("ix_listings_category_id_price_id", "category_id", "price", "id"),
+        Index("ix_listings_category_id_created_at_id", "category_id", "created_at", "id"),
+        Index("ix_listings_price_id", "price", "id"),
+    )
+
+
+class CategoryListingCount(Base):
+    """The number of listings of a category, maintained by ListingDao in the transactions writing listings."""
+
+    __tablename__ = "category_listing_counts"
+
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ListingDocument(Base):
+    """The read model of a listing, see ads_directory/dao/read_model.py."""
+
+    __tablename__ = "listing_documents"
+
+    listing_id: Mapped[int] = mapped_column(ForeignKey("listings.id", ondelete="CASCADE"), primary_key=True)
+    document: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
 
 
 class ListingCustomFields(Base):
@@ -118,6 +160,8 @@ class ListingCustomFields(Base):
     listing_id: Mapped[int] = mapped_column(ForeignKey("listings.id"), primary_key=True)
     custom_field_id: Mapped[int] = mapped_column(ForeignKey("custom_fields.id"), primary_key=True)
     value: Mapped[str] = mapped_column(String(200), nullable=False)
+    # typed copy of value for numeric custom fields, so that range filters can use an index
+    value_number: Mapped[float | None] = mapped_column(Float, nullable=True)
 
     listing: Mapped[Listing] = relationship("Listing", back_populates="custom_fields_association")
 
@@ -126,4 +170,32 @@ class ListingCustomFields(Base):
     __table_args__ = (
         ForeignKeyConstraint(["listing_id"], ["listings.id"]),
         ForeignKeyConstraint(["custom_field_id"], ["custom_fields.id"]),
+        Index("ix_listing_custom_fields_field_value", "custom_field_id", "value", "listing_id"),
+        Index("ix_listing_custom_fields_field_number", "custom_field_id", "value_number", "listing_id"),
+    )
+
+
+class Job(Base):
+    """A unit of background work run by the workers, see ads_directory/jobs/."""
+
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    type: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    # queued, running, succeeded or failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    # a queued job is not run before
+    run_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # the worker running the job and its last heartbeat
+    locked_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    locked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    result: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_type_status_run_at", "type", "status", "run_at"),
+        Index("ix_jobs_status_updated_at", "status", "updated_at"),
     )
@@ -0,0 +1,64 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+import bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+
+from ads_directory.config import get_settings
+
+R = TypeVar("R")
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def check_password(hashed: str, password: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a pool of `workers` threads so that the event loop keeps serving the
+    other requests while a password is hashed, bcrypt releases the GIL. At most
+    `queue_limit` calls wait for a thread, the next ones are rejected with a 503 instead
+    of piling up behind a login storm. With no workers the calls run on the event loop.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 4, queue_limit: int = 64) -> None:
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt") if workers else None
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def check(self, hashed: str, password: str) -> bool:
+        return await self._run(check_password, hashed, password)
+
+    async def _run(self, func: Callable[..., R], *args: Any) -> R:
+        if self._pending >= self.workers + self.queue_limit:
+            raise ServiceUnavailable("Too many password checks in progress, retry later")
+        self._pending += 1
+        try:
+            if self._executor is None:
+                return func(*args)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict[str, Any]:
+        return {"workers": self.workers, "queue_limit": self.queue_limit, "pending": self._pending}
+
+
+@functools.lru_cache
+def get_password_hasher() -> PasswordHasher:
+    """The hasher of the process, created with its thread pool on first use rather than on import."""
+    security = get_settings().security
+    return PasswordHasher(
+        rounds=security.BCRYPT_ROUNDS, workers=security.HASH_WORKERS, queue_limit=security.HASH_QUEUE_LIMIT
+    )
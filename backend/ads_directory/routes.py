@@ -1,16 +1,16 @@
+import os
 from typing import Any
 
-from flask_bcrypt import check_password_hash, generate_password_hash
 from pydantic.fields import Field
 from pydantic.main import BaseModel
 from quart import Blueprint
 from quart_jwt_extended import create_access_token
 from quart_schema import validate_request, validate_response
-from werkzeug.exceptions import UnprocessableEntity
+from werkzeug.exceptions import ServiceUnavailable, UnprocessableEntity
 
-from ads_directory.config import settings
-from ads_directory.dao.base_dao import BaseDao
-from ads_directory.models.models import User
+from ads_directory import startup
+from ads_directory.dao.user_dao import UserDao
+from ads_directory.passwords import get_password_hasher
 
 bp = Blueprint("", __name__)
 
@@ -33,6 +33,7 @@ class ErrorResponse(BaseModel):
 class PaginatedRequest(BaseModel):
     page: int = 1
     per_page: int = 20
+    cursor: str | None = Field(None, description="The next_cursor of the previous page, takes precedence over page")
 
 
 @bp.route("/health")
@@ -40,6 +41,14 @@ async def hello() -> str:
     return "Healthy as a horse!"
 
 
+@bp.route("/ready")
+async def ready() -> dict[str, Any]:
+    """Whether this worker connected to the database and serves, 503 while it starts or stops."""
+    if not startup.is_ready():
+        raise ServiceUnavailable("The worker is not ready")
+    return {"ready": True, "pid": os.getpid()}
+
+
 class LoginRequest(BaseModel):
     email: str = Field(..., description="The email of the user")
     password: str = Field(..., description="The password of the user")
@@ -54,15 +63,13 @@ class LoggedInResponse(BaseModel):
 @validate_request(LoginRequest)
 @validate_response(LoggedInResponse)
 async def login(data: LoginRequest):
-    # search for email in database
-    # if user is found, check password
-    user: User | None = await BaseDao.get_one(User, User.email == data.email)
-    if not user:
+    credentials = await UserDao.get_credentials(data.email)
+    if credentials is None:
         return ErrorResponse(success=False, message="User not found")
 
-    # hash the password and compare
-    if user and check_password_hash(user.password, data.password):
-        access_token = create_access_token(identity=user.id)
+    user_id, password = credentials
+    if await get_password_hasher().check(password, data.password):
+        access_token = create_access_token(identity=user_id)
         return LoggedInResponse(success=True, access_token=access_token)
 
     return ErrorResponse(success=False, message="Invalid credentials")
@@ -79,14 +86,15 @@ class RegisterUserRequest(BaseModel):
 @validate_request(RegisterUserRequest)
 @validate_response(CreatedResponse)
 async def register(data: RegisterUserRequest):
-    user: User | None = await BaseDao.get_one(User, User.email == data.email)
-    if user:
+    # a taken email is rejected before paying for the hash, create_user still handles a concurrent registration
+    if await UserDao.get_credentials(data.email) is not None:
         raise UnprocessableEntity("User already exists")
+    # substitute the password with a hashed version
+    data.password = await get_password_hasher().hash(data.password)
     try:
-        # substitute the password with a hashed version
-        data.password = generate_password_hash(data.password).decode("utf-8")
-        # create the user
-        user = await BaseDao.create(User, **data.dict())
-        return CreatedResponse(success=True, id=user.id)
+        user_id = await UserDao.create_user(**data.dict())
     except Exception as e:
         raise UnprocessableEntity(str(e))
+    if user_id is None:
+        raise UnprocessableEntity("User already exists")
+    return CreatedResponse(success=True, id=user_id)
@@ -0,0 +1,106 @@
+from typing import Any, Callable, Iterable, Mapping, TypeVar
+
+import orjson
+from pydantic.main import BaseModel
+from quart import Response
+from quart_schema.validation import QUART_SCHEMA_RESPONSE_ATTRIBUTE
+
+from ads_directory.models.models import Category, CustomFields, Listing
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class ORJSONResponse(Response):
+    """A json response whose body is encoded by orjson and written as is."""
+
+    default_mimetype = "application/json"
+
+    def __init__(self, content: Any, status: int = 200, **kwargs: Any) -> None:
+        super().__init__(orjson.dumps(content), status=status, **kwargs)
+
+
+def document_response(model_class: type[BaseModel], status_code: int = 200) -> Callable[[F], F]:
+    """
+    Document the response model in the OpenAPI schema like `validate_response`, but without
+    validating and re-serializing the returned value, for handlers returning a `ORJSONResponse`.
+    """
+
+    def decorator(func: F) -> F:
+        schemas = getattr(func, QUART_SCHEMA_RESPONSE_ATTRIBUTE, {})
+        schemas[status_code] = (model_class, None)
+        setattr(func, QUART_SCHEMA_RESPONSE_ATTRIBUTE, schemas)
+        return func
+
+    return decorator
+
+
+# The functions below build the same documents as the schemas in blueprints/schema.py straight from the rows.
+
+
+def custom_field_to_dict(custom_field: CustomFields, with_details: bool = True) -> dict[str, Any]:
+    return {
+        "id": custom_field.id,
+        "name": custom_field.name,
+        "type": custom_field.type,
+        "description": custom_field.description if with_details else None,
+        "field_config": custom_field.field_config if with_details else None,
+    }
+
+
+def category_to_dict(category: Category, with_custom_fields: bool = False) -> dict[str, Any]:
+    return {
+        "id": category.id,
+        "name": category.name,
+        "description": category.description,
+        "custom_fields": [custom_field_to_dict(c, with_details=False) for c in category.custom_fields]
+        if with_custom_fields
+        else None,
+    }
+
+
+def listing_row_to_dict(
+    listing: Mapping[str, Any],
+    category: Category,
+    custom_fields: Iterable[Mapping[str, Any]],
+    field_names: Mapping[int, str],
+) -> dict[str, Any]:
+    """
+    A listing given as its listings and listing_custom_fields rows, with the custom field names by id.
+    The custom fields are listed by id, whatever the order of the rows.
+    """
+    return {
+        "name": listing["name"],
+        "description": listing["description"],
+        "price": float(listing["price"]),
+        "id": listing["id"],
+        "custom_fields": [
+            {
+                "listing_id": c["listing_id"],
+                "custom_field_id": c["custom_field_id"],
+                "value": c["value"],
+                "name": field_names.get(c["custom_field_id"]),
+            }
+            for c in sorted(custom_fields, key=lambda c: c["custom_field_id"])
+        ],
+        "category": category_to_dict(category),
+        "created_at": listing["created_at"],
+        "updated_at": listing["updated_at"],
+    }
+
+
+def listing_to_dict(listing: Listing) -> dict[str, Any]:
+    # custom_fields_association and its custom_field must be loaded, see ListingDao
+    associations = listing.custom_fields_association
+    return listing_row_to_dict(
+        {
+            "name": listing.name,
+            "description": listing.description,
+            "price": listing.price,
+            "id": listing.id,
+            "created_at": listing.created_at,
+            "updated_at": listing.updated_at,
+        },
+        listing.category,
+        [{"listing_id": c.listing_id, "custom_field_id": c.custom_field_id, "value": c.value} for c in associations],
+        {c.custom_field_id: c.custom_field.name for c in associations if c.custom_field is not None},
+    )
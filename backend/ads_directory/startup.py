@@ -0,0 +1,191 @@
+"""
+Timing and readiness of the start of a worker.
+
+The phases of a start are timed with `phase` and logged once the worker is ready, that is
+when it created its engines and warmed up its connection pools. A ready worker answers 200
+on /ready and, when Startup.READY_DIR is set, creates READY_DIR/<pid> until it stops, so that a
+deployment or a hypercorn reload can wait for its workers:
+
+    python -m ads_directory.startup --wait-ready 4
+
+    python -m ads_directory.startup --profile-startup
+
+The second one starts the app in a fresh interpreter under `python -X importtime` and
+reports where its cold start goes: the imports per package and the slowest modules, then
+the initialization phases. Only the standard library is imported here, so that the import
+of the app can be timed from the first line of asgi.py.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# seconds spent in each phase of the start of this process, in order
+PHASES: dict[str, float] = {}
+
+_ready = False
+
+# run in the child interpreter of --profile-startup, prints the phases on the last line of stdout
+_PROFILED_START = """
+import asyncio, json
+from ads_directory import startup
+import ads_directory.asgi as asgi
+
+async def serve() -> None:
+    await asgi.app.startup()
+    await asgi.app.shutdown()
+
+asyncio.run(serve())
+print(json.dumps(startup.PHASES))
+"""
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASES[name] = PHASES.get(name, 0) + time.perf_counter() - start
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+def _ready_file(ready_dir: str) -> Path:
+    return Path(ready_dir) / str(os.getpid())
+
+
+def mark_ready(ready_dir: str = "") -> None:
+    global _ready
+    _ready = True
+    if ready_dir:
+        Path(ready_dir).mkdir(parents=True, exist_ok=True)
+        _ready_file(ready_dir).touch()
+    logger.info(
+        "Worker %s ready in %.3fs: %s",
+        os.getpid(),
+        sum(PHASES.values()),
+        ", ".join(f"{name} {seconds:.3f}s" for name, seconds in PHASES.items()),
+    )
+
+
+def mark_stopping(ready_dir: str = "") -> None:
+    global _ready
+    _ready = False
+    if ready_dir:
+        _ready_file(ready_dir).unlink(missing_ok=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def ready_workers(ready_dir: str) -> list[int]:
+    """The pids of the ready workers, the files left by the workers that died are removed."""
+    pids = []
+    for path in Path(ready_dir).glob("*"):
+        if not path.name.isdigit():
+            continue
+        if _alive(int(path.name)):
+            pids.append(int(path.name))
+        else:
+            path.unlink(missing_ok=True)
+    return sorted(pids)
+
+
+def wait_ready(ready_dir: str, workers: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while len(ready_workers(ready_dir)) < workers:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+def import_times(stderr: str) -> list[tuple[str, float]]:
+    """The (module, self seconds) of the `-X importtime` lines of `stderr`."""
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:") :].split("|")
+        times.append((name.strip(), int(own) / 1e6))
+    return times
+
+
+def _package(module: str) -> str:
+    # the modules of the app are reported one by one, the other ones per top level package
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] == "ads_directory" else parts[0]
+
+
+def profile_startup(top: int = 15) -> str:
+    """Start and stop the app once in a fresh interpreter and report where the time went."""
+    start = time.perf_counter()
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROFILED_START], capture_output=True, text=True, check=False
+    )
+    wall = time.perf_counter() - start
+    if child.returncode != 0:
+        raise RuntimeError(f"The app failed to start:\n{child.stderr[-4000:]}")
+    phases: dict[str, float] = json.loads(child.stdout.strip().splitlines()[-1])
+    modules = import_times(child.stderr)
+
+    packages: dict[str, float] = defaultdict(float)
+    for module, seconds in modules:
+        packages[_package(module)] += seconds
+    lines = [f"Cold start {wall:.3f}s, interpreter included", "", f"Imports {sum(packages.values()):.3f}s"]
+    lines += [f"  {name:<40} {s:.3f}s" for name, s in sorted(packages.items(), key=lambda p: -p[1])[:top]]
+    lines += ["", "Slowest modules, own time"]
+    lines += [f"  {name:<40} {s:.3f}s" for name, s in sorted(modules, key=lambda m: -m[1])[:top]]
+    lines += ["", "Phases"]
+    lines += [f"  {name:<40} {s:.3f}s" for name, s in phases.items()]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile-startup", action="store_true", help="Report the import and initialization time.")
+    parser.add_argument("--top", type=int, default=15, help="Packages and modules listed by --profile-startup.")
+    parser.add_argument("--wait-ready", type=int, metavar="WORKERS", help="Wait until that many workers are ready.")
+    parser.add_argument("--ready-dir", help="The Startup.READY_DIR of the workers, from the settings by default.")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        print(profile_startup(args.top))
+    if args.wait_ready is not None:
+        ready_dir = args.ready_dir
+        if ready_dir is None:
+            from ads_directory.config import get_settings
+
+            ready_dir = get_settings().startup.READY_DIR
+        if not ready_dir:
+            parser.error("Startup.READY_DIR is not set, the workers do not report that they are ready")
+        if not wait_ready(ready_dir, args.wait_ready, args.timeout):
+            sys.exit(f"{len(ready_workers(ready_dir))} of {args.wait_ready} workers ready after {args.timeout}s")
+        print(f"{args.wait_ready} workers ready")
+    if not args.profile_startup and args.wait_ready is None:
+        parser.print_usage()
+
+
+if __name__ == "__main__":
+    main()
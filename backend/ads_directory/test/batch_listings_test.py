@@ -0,0 +1,45 @@
+from typing import Any
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from ads_directory.blueprints.schema import BatchOperation
+from ads_directory.commands.batch_listings import apply_batch
+from ads_directory.dao.ListingDao import ListingDao
+
+
+@pytest.mark.asyncio
+async def test_invalid_operations_are_reported_without_writing() -> None:
+    operations = [BatchOperation(op="delete"), BatchOperation(op="update", id=1)]
+
+    report = await apply_batch(operations, chunk_size=10)
+
+    assert [(r.success, r.error) for r in report.results] == [
+        (False, "The id of the listing to delete is required"),
+        (False, "The listing is required"),
+    ]
+    assert report.transactions == 0
+
+
+@pytest.mark.asyncio
+async def test_small_chunks_exceeding_the_statement_cap_are_rejected() -> None:
+    operations = [BatchOperation(op="delete", id=i) for i in range(100)]
+
+    with pytest.raises(BadRequest):
+        await apply_batch(operations, chunk_size=1)
+
+
+@pytest.mark.asyncio
+async def test_a_failing_chunk_does_not_report_the_database_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def write_batch(*args: Any) -> None:
+        raise Exception("(psycopg.errors.DeadlockDetected) deadlock detected on relation listings")
+
+    monkeypatch.setattr(ListingDao, "write_batch", write_batch)
+
+    report = await apply_batch([BatchOperation(op="delete", id=1), BatchOperation(op="delete", id=2)], chunk_size=10)
+
+    assert [(r.success, r.error) for r in report.results] == [
+        (False, "Chunk failed, none of its operations were written"),
+        (False, "Chunk failed, none of its operations were written"),
+    ]
+    assert report.transactions == 0
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from quart import Quart
+
+from ads_directory.cache.backends import CacheBackend, MemoryBackend, SQLiteBackend
+from ads_directory.cache.response import _key
+from ads_directory.cache.shared_cache import SharedCache
+from ads_directory.routes import PaginatedRequest
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request: pytest.FixtureRequest, tmp_path) -> CacheBackend:
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "cache.db"), poll_interval=0.01)
+
+
+async def test_tags_invalidate_entries(backend: CacheBackend) -> None:
+    cache = SharedCache(backend)
+    _, versions = await cache.get("listing", ["listing:1", "categories"])
+    await cache.set("listing", b"body", versions)
+
+    assert await cache.get("listing", ["listing:1", "categories"]) == (b"body", versions)
+
+    await cache.invalidate("categories")
+
+    value, versions = await cache.get("listing", ["listing:1", "categories"])
+    assert value is None
+    assert versions == {"listing:1": 0, "categories": 1}
+
+
+async def test_entries_expire(backend: CacheBackend) -> None:
+    cache = SharedCache(backend)
+    await cache.set("listing", b"body", {}, ttl=-1)
+
+    assert await cache.get("listing", []) == (None, {})
+
+
+async def _stored_keys(backend: CacheBackend) -> list[str]:
+    if isinstance(backend, MemoryBackend):
+        return list(backend._values)
+    assert isinstance(backend, SQLiteBackend)
+    return [key for key, in await backend._run("SELECT key FROM cache_entries")]  # type: ignore
+
+
+async def test_expired_entries_are_purged(backend: CacheBackend) -> None:
+    backend.PURGE_EVERY = 2  # type: ignore[attr-defined]
+    await backend.set("expired", b"body", -1)
+    assert await _stored_keys(backend) == ["expired"]
+
+    await backend.set("fresh", b"body", 60)
+
+    assert await _stored_keys(backend) == ["fresh"]
+
+
+async def test_unknown_query_parameters_share_the_cached_response(app: Quart) -> None:
+    async with app.test_request_context("/api/ads/categories/?per_page=5&x=1"):
+        key = _key({"query_args": PaginatedRequest(per_page=5)})
+    async with app.test_request_context("/api/ads/categories/?x=2&per_page=5"):
+        assert _key({"query_args": PaginatedRequest(per_page=5)}) == key
+        assert _key({"query_args": PaginatedRequest(per_page=6)}) != key
+
+
+async def test_invalidations_reach_the_other_workers(tmp_path) -> None:
+    path = str(tmp_path / "cache.db")
+    worker, other_worker = SharedCache(SQLiteBackend(path, 0.01)), SharedCache(SQLiteBackend(path, 0.01))
+    invalidated = asyncio.Event()
+    other_worker.on_invalidate("categories", invalidated.set)
+    listener = asyncio.create_task(other_worker.listen())
+    await asyncio.sleep(0.05)
+
+    await worker.invalidate("categories")
+
+    await asyncio.wait_for(invalidated.wait(), 1)
+    listener.cancel()
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+from quart import Quart
+
+from ads_directory.conditional import Version, conditional, set_version
+
+
+def test_version_of_rows() -> None:
+    updated_at = datetime(2024, 6, 10, 22, 21, 21, 191585)
+
+    version = Version.of(1, (updated_at, datetime(2024, 1, 1)))
+
+    assert version == Version.of(1, [updated_at, datetime(2024, 1, 1)])
+    assert version.last_modified == updated_at
+    assert Version.of(2, (updated_at, datetime(2024, 1, 1))).etag != version.etag
+    assert Version.of((1, updated_at), last_modified=False).last_modified is None
+
+
+@pytest.mark.asyncio
+async def test_not_modified() -> None:
+    app = Quart(__name__)
+    version = Version.of(1, datetime(2024, 6, 10, 22, 21, 21, 191585))
+
+    async with app.test_request_context("/", headers={"If-None-Match": f'W/"{version.etag}"'}):
+        assert version.not_modified()
+    async with app.test_request_context("/", headers={"If-Modified-Since": "Mon, 10 Jun 2024 22:21:21 GMT"}):
+        assert version.not_modified()
+    async with app.test_request_context(
+        "/", headers={"If-None-Match": 'W/"other"', "If-Modified-Since": "Mon, 10 Jun 2024 22:21:21 GMT"}
+    ):
+        assert not version.not_modified()
+
+
+@pytest.mark.asyncio
+async def test_conditional_probes_only_requests_with_validators() -> None:
+    app = Quart(__name__)
+    version = Version.of(1, datetime(2024, 6, 10, 22, 21, 21, 191585))
+    probes = []
+
+    async def probe() -> Version:
+        probes.append(1)
+        return version
+
+    @app.get("/")
+    @conditional(probe)
+    async def view() -> dict[str, int]:
+        set_version(version)
+        return {"id": 1}
+
+    response = await app.test_client().get("/")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'W/"{version.etag}"'
+    assert probes == []
+
+    response = await app.test_client().get("/", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert probes == [1]
@@ -12,12 +12,15 @@ from quart.typing import TestClientProtocol
 from sqlalchemy import delete
 
 from ads_directory.app import create_app
-from ads_directory.database.connection import async_session
+from ads_directory.database.connection import async_session, init_engine
 
 
 @pytest.fixture(scope="session")
 def app() -> Quart:
-    return create_app()
+    app = create_app()
+    # the test client does not run the before_serving functions which create it
+    init_engine()
+    return app
 
 
 @pytest.fixture()
@@ -0,0 +1,47 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest
+
+from ads_directory.dao.custom_field_filters import (
+    CustomFieldFilter,
+    custom_field_criteria,
+    fields_by_name,
+    parse_custom_field_filters,
+    typed_value,
+)
+from ads_directory.models.models import CustomFields
+
+
+def test_parse_custom_field_filters() -> None:
+    args = MultiDict([("page", "2"), ("cf[Car Make]", "Toyota"), ("cf[Bedrooms][gte]", "3")])
+
+    assert parse_custom_field_filters(args) == [
+        CustomFieldFilter(name="Car Make", op="eq", value="Toyota"),
+        CustomFieldFilter(name="Bedrooms", op="gte", value="3"),
+    ]
+
+
+def test_parse_custom_field_filters_rejects_unknown_operator() -> None:
+    with pytest.raises(BadRequest):
+        parse_custom_field_filters(MultiDict([("cf[Bedrooms][between]", "3")]))
+
+
+def test_typed_value() -> None:
+    bedrooms = CustomFields(id=3, name="Bedrooms", type="number")
+    car_make = CustomFields(id=1, name="Car Make", type="select")
+
+    assert typed_value(bedrooms, "3") == {"value": "3", "value_number": 3.0}
+    assert typed_value(car_make, "Toyota") == {"value": "Toyota", "value_number": None}
+    with pytest.raises(BadRequest):
+        typed_value(bedrooms, "three")
+
+
+def test_a_shared_name_filters_on_every_field_of_that_name() -> None:
+    makes = [CustomFields(id=1, name="Make", type="select"), CustomFields(id=4, name="Make", type="text")]
+    toyota = CustomFieldFilter(name="Make", op="eq", value="Toyota")
+
+    (criterion,) = custom_field_criteria([toyota], fields_by_name(makes))
+
+    assert "custom_field_id IN (1, 4)" in str(criterion.compile(compile_kwargs={"literal_binds": True}))
+    with pytest.raises(BadRequest):
+        custom_field_criteria([toyota], fields_by_name([*makes, CustomFields(id=5, name="Make", type="number")]))
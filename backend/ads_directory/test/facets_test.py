@@ -0,0 +1,103 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ads_directory.dao.custom_field_filters import CustomFieldFilter, custom_field_criteria, fields_by_name
+from ads_directory.dao.facets import (
+    CATEGORY_FACET,
+    CUSTOM_FIELD_FACET,
+    facets_document,
+    facets_signature,
+    facets_statement,
+)
+from ads_directory.models.models import Base, Category, CustomFields, Listing, ListingCustomFields
+
+
+def test_signature_ignores_the_order_of_the_parameters() -> None:
+    make, fuel = CustomFieldFilter("Car Make", "eq", "Toyota"), CustomFieldFilter("Car Fuel Type", "eq", "Petrol")
+
+    assert facets_signature(["a", "b"], [make, fuel]) == facets_signature(["b", "a"], [fuel, make])
+    assert facets_signature(None, [make]) != facets_signature([], [make])
+
+
+def test_document_sorts_the_counts() -> None:
+    rows = [
+        (CUSTOM_FIELD_FACET, 1, "Honda", 980),
+        (CUSTOM_FIELD_FACET, 1, "Toyota", 1204),
+        (CATEGORY_FACET, 3, "Cars", 2184),
+    ]
+
+    assert facets_document(rows, {1: "Car Make", 2: "Car Fuel Type"}) == {
+        "facets": {
+            "Car Make": [{"value": "Toyota", "count": 1204}, {"value": "Honda", "count": 980}],
+            "Car Fuel Type": [],
+        },
+        "categories": [{"id": 3, "name": "Cars", "count": 2184}],
+    }
+
+
+def test_document_adds_up_the_fields_sharing_a_name() -> None:
+    rows = [
+        (CUSTOM_FIELD_FACET, 1, "Toyota", 3),
+        (CUSTOM_FIELD_FACET, 4, "Toyota", 2),
+        (CUSTOM_FIELD_FACET, 4, "Ford", 1),
+    ]
+
+    assert facets_document(rows, {1: "Make", 4: "Make"})["facets"] == {
+        "Make": [{"value": "Toyota", "count": 5}, {"value": "Ford", "count": 1}]
+    }
+
+
+@pytest.mark.asyncio
+async def test_statement_counts_the_filtered_listings() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    tables = [Category.__table__, CustomFields.__table__, Listing.__table__, ListingCustomFields.__table__]
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=tables)
+    session = async_sessionmaker(engine)
+    # the car and the van makes are two custom fields of the same name
+    fields = [
+        CustomFields(id=1, name="Make", type="select", description=""),
+        CustomFields(id=2, name="Fuel", type="select", description=""),
+        CustomFields(id=4, name="Make", type="select", description=""),
+    ]
+    values = {
+        1: {1: "Toyota", 2: "Petrol"},
+        2: {1: "Toyota", 2: "Diesel"},
+        3: {1: "Honda", 2: "Petrol"},
+        4: {4: "Toyota", 2: "Diesel"},
+    }
+
+    async with session.begin() as s:
+        await s.execute(sa.insert(Category), [{"id": 3, "name": "Cars", "description": ""}])
+        await s.execute(sa.insert(Category), [{"id": 5, "name": "Vans", "description": ""}])
+        await s.execute(
+            sa.insert(Listing),
+            [
+                {"id": i, "name": f"Listing {i}", "description": "", "price": 1, "category_id": 5 if i == 4 else 3}
+                for i in values
+            ],
+        )
+        await s.execute(
+            sa.insert(ListingCustomFields),
+            [
+                {"listing_id": i, "custom_field_id": f, "value": v}
+                for i, by_field in values.items()
+                for f, v in by_field.items()
+            ],
+        )
+
+    async with session() as s:
+        rows = await s.execute(facets_statement([1, 4], []))
+        assert facets_document(rows, {1: "Make", 4: "Make"}) == {
+            "facets": {"Make": [{"value": "Toyota", "count": 3}, {"value": "Honda", "count": 1}]},
+            "categories": [{"id": 3, "name": "Cars", "count": 3}, {"id": 5, "name": "Vans", "count": 1}],
+        }
+
+        criteria = custom_field_criteria([CustomFieldFilter("Make", "eq", "Toyota")], fields_by_name(fields))
+        rows = await s.execute(facets_statement([2], criteria))
+        assert facets_document(rows, {2: "Fuel"}) == {
+            "facets": {"Fuel": [{"value": "Diesel", "count": 2}, {"value": "Petrol", "count": 1}]},
+            "categories": [{"id": 3, "name": "Cars", "count": 2}, {"id": 5, "name": "Vans", "count": 1}],
+        }
+    await engine.dispose()
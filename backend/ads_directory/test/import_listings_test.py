@@ -0,0 +1,69 @@
+from typing import AsyncIterator
+
+import pytest
+
+from ads_directory.commands.import_listings import MAX_RECORD_LINES, _iter_records, iter_lines
+
+
+async def _chunks(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_splits_chunks_on_newlines() -> None:
+    # "ë" is split between two chunks
+    lines = [line async for line in iter_lines(_chunks(b'{"a": 1}\r\n{"b": "\xc3', b'\xab"}\n', b"last"))]
+
+    assert lines == ['{"a": 1}', '{"b": "ë"}', "last"]
+
+
+@pytest.mark.asyncio
+async def test_csv_records_may_span_several_lines() -> None:
+    lines = iter_lines(_chunks(b'name,description\nVilla,"big\nhouse"\n\nHut,small\n'))
+
+    records = [record async for record in _iter_records(lines, "csv")]
+
+    assert records == [
+        (3, {"name": "Villa", "description": "big\nhouse"}),
+        (5, {"name": "Hut", "description": "small"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_csv_quotes_inside_unquoted_values_are_kept() -> None:
+    lines = iter_lines(_chunks(b'name,description\nTV 55" screen,"a ""smart"" tv"\nRadio,old\n'))
+
+    records = [record async for record in _iter_records(lines, "csv")]
+
+    assert records == [
+        (2, {"name": 'TV 55" screen', "description": 'a "smart" tv'}),
+        (3, {"name": "Radio", "description": "old"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_csv_unterminated_record_is_reported() -> None:
+    lines = iter_lines(_chunks(b'name,description\nHut,small\nVilla,"big\nhouse\n'))
+
+    records = [record async for record in _iter_records(lines, "csv")]
+
+    assert records[0] == (2, {"name": "Hut", "description": "small"})
+    line, error = records[1]
+    assert line == 3
+    assert isinstance(error, ValueError)
+
+
+@pytest.mark.asyncio
+async def test_csv_record_over_the_line_cap_is_reported_once() -> None:
+    rows = b"".join(b"Hut %d,small\n" % i for i in range(MAX_RECORD_LINES + 10))
+    lines = iter_lines(_chunks(b'name,description\nVilla,"big\n' + rows))
+
+    records = [record async for record in _iter_records(lines, "csv")]
+
+    line, error = records[0]
+    assert line == 2
+    assert isinstance(error, ValueError)
+    # parsing resumes on the line after the capped record
+    assert records[1] == (MAX_RECORD_LINES + 3, {"name": f"Hut {MAX_RECORD_LINES}", "description": "small"})
+    assert len(records) == 11
@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from ads_directory.database.instrumentation import instrument_engine, track_queries
+
+
+@pytest.mark.asyncio
+async def test_track_queries_counts_statement_shapes() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine)
+
+    with track_queries() as stats:
+        async with engine.connect() as connection:
+            for i in range(3):
+                await connection.exec_driver_sql("SELECT ?", (i,))
+            await connection.exec_driver_sql("SELECT 'other'")
+
+    assert stats.count == 4
+    assert stats.duration > 0
+    assert stats.repeated(3) == [("SELECT ?", 3)]
+    await engine.dispose()
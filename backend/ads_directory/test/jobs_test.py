@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ads_directory.jobs import queue
+from ads_directory.jobs.queue import backoff
+from ads_directory.models.models import Job
+
+
+@pytest.mark.parametrize("attempts, low, high", [(1, 2.5, 5), (2, 5, 10), (3, 10, 20), (20, 30, 60)])
+def test_backoff_doubles_with_jitter_up_to_the_cap(attempts: int, low: float, high: float) -> None:
+    for _ in range(100):
+        assert low <= backoff(attempts, base=5, cap=60) <= high
+
+
+@pytest.fixture()
+async def jobs_database(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[async_sessionmaker]:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Job.__table__.create)
+    session = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(queue, "async_session", session)
+    yield session
+    await engine.dispose()
+
+
+async def _status(session: async_sessionmaker, job_id: int) -> str:
+    async with session() as s:
+        return await s.scalar(sa.select(Job.status).where(Job.id == job_id))
+
+
+@pytest.mark.asyncio
+async def test_claim_respects_the_concurrency_of_the_type(jobs_database: async_sessionmaker) -> None:
+    for _ in range(3):
+        await queue.enqueue("import", {}, max_attempts=1)
+    other = await queue.enqueue("reindex", {}, max_attempts=1)
+
+    first = await queue.claim("import", 2, "worker-1")
+    second = await queue.claim("import", 2, "worker-2")
+
+    assert first is not None and second is not None and first.id != second.id
+    assert await queue.claim("import", 2, "worker-3") is None
+    # the limit is per type
+    assert (await queue.claim("reindex", 1, "worker-3")).id == other
+
+    await queue.complete(first, None)
+    assert await queue.claim("import", 2, "worker-3") is not None
+
+
+@pytest.mark.asyncio
+async def test_fail_queues_again_until_the_last_attempt(jobs_database: async_sessionmaker) -> None:
+    job_id = await queue.enqueue("import", {}, max_attempts=2)
+
+    assert await queue.fail(await queue.claim("import", 1, "worker"), "boom", retry_in=0)
+    assert await _status(jobs_database, job_id) == queue.QUEUED
+
+    assert not await queue.fail(await queue.claim("import", 1, "worker"), "boom", retry_in=0)
+    assert await _status(jobs_database, job_id) == queue.FAILED
+    assert await queue.claim("import", 1, "worker") is None
+
+
+@pytest.mark.asyncio
+async def test_requeue_stale_gives_back_the_jobs_of_dead_workers(jobs_database: async_sessionmaker) -> None:
+    last_attempt = await queue.enqueue("import", {}, max_attempts=1)
+    retried = await queue.enqueue("import", {}, max_attempts=3)
+    alive = await queue.enqueue("import", {}, max_attempts=3)
+    for _ in range(3):
+        await queue.claim("import", 3, "worker")
+    async with jobs_database.begin() as s:
+        await s.execute(
+            sa.update(Job).where(Job.id != alive).values(locked_at=datetime.utcnow() - timedelta(minutes=5))
+        )
+
+    assert await queue.requeue_stale(lease=60) == 2
+
+    assert await _status(jobs_database, last_attempt) == queue.FAILED
+    assert await _status(jobs_database, retried) == queue.QUEUED
+    assert await _status(jobs_database, alive) == queue.RUNNING
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ads_directory.dao.listing_counts import (
+    EXACT_COUNT_LIMIT,
+    Explain,
+    adjust_listing_counts,
+    counted_total,
+    estimated_total,
+)
+from ads_directory.models.models import CategoryListingCount, Listing
+
+
+@pytest.mark.asyncio
+async def test_counters_add_up_the_deltas() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(CategoryListingCount.__table__.create)
+    session = async_sessionmaker(engine)
+
+    async with session.begin() as s:
+        await adjust_listing_counts(s, {1: 3, 2: 1, 3: 0})
+        await adjust_listing_counts(s, {1: -1, 2: 1})
+
+    async with session.begin() as s:
+        assert await counted_total(s) == 4
+        assert await counted_total(s, 1) == 2
+        assert await counted_total(s, 3) == 0
+        # a database without planner estimates counts the rows
+        assert await estimated_total(s, CategoryListingCount.__table__.select()) == (2, True)
+    await engine.dispose()
+
+
+class _PostgresSession:
+    """Answers the capped count and the plan of estimated_total like postgres would."""
+
+    bind = SimpleNamespace(dialect=postgresql.dialect())
+
+    def __init__(self) -> None:
+        self.statements: list[Any] = []
+
+    async def scalar(self, statement: Any) -> Any:
+        self.statements.append(statement)
+        if isinstance(statement, Explain):
+            return [{"Plan": {"Plan Rows": 5000}}]
+        return EXACT_COUNT_LIMIT + 1
+
+
+@pytest.mark.asyncio
+async def test_large_totals_are_estimated_with_bound_parameters() -> None:
+    session = _PostgresSession()
+    # a colon in a value must not be read as a bind parameter of the explained statement
+    statement = select(Listing.id).where(Listing.name == "a :b")
+
+    assert await estimated_total(session, statement) == (5000, False)  # type: ignore[arg-type]
+
+    explain = session.statements[-1].compile(dialect=postgresql.dialect())
+    assert str(explain).startswith("EXPLAIN (FORMAT JSON) SELECT listings.id")
+    assert "a :b" not in str(explain)
+    assert list(explain.params.values()) == ["a :b"]
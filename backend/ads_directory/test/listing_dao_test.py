@@ -0,0 +1,142 @@
+from typing import Any, Iterator
+
+import pytest
+from sqlalchemy import event, select
+from werkzeug.exceptions import BadRequest
+
+from ads_directory.blueprints.schema import CreateListingSchema
+from ads_directory.dao.listing_counts import counted_total
+from ads_directory.dao.ListingDao import ListingDao
+from ads_directory.database.connection import async_session, get_engine
+from ads_directory.database.instrumentation import instrument_engine, track_queries
+from ads_directory.models.models import Category, CustomFields, Listing, ListingCustomFields
+
+_WRITES = ("INSERT INTO listing_custom_fields", "UPDATE listing_custom_fields", "DELETE FROM listing_custom_fields")
+
+
+@pytest.fixture()
+async def categories(migrated_database: None) -> dict[str, Any]:
+    async with async_session.begin() as session:
+        fields = {
+            "color": CustomFields(name="color", type="text", description="Color"),
+            "year": CustomFields(name="year", type="number", description="Year"),
+            "doors": CustomFields(name="doors", type="number", description="Doors"),
+            "fuel": CustomFields(name="fuel", type="text", description="Fuel"),
+        }
+        cars = Category(name="Cars", description="Cars", custom_fields=list(fields.values()))
+        vans = Category(name="Vans", description="Vans", custom_fields=[fields["color"], fields["year"]])
+        session.add_all([cars, vans])
+    return {"cars": cars.id, "vans": vans.id, **{name: f.id for name, f in fields.items()}}
+
+
+def _listing(category_id: int, values: dict[int, str], name: str = "Golf") -> CreateListingSchema:
+    return CreateListingSchema(
+        name=name,
+        description="A car",
+        price=5000,
+        category_id=category_id,
+        custom_fields=[CreateListingSchema.CustomFieldItem(id=i, value=v) for i, v in values.items()],
+    )
+
+
+async def _values(listing_id: int) -> dict[int, tuple[str, float | None]]:
+    async with async_session() as session:
+        result = await session.execute(
+            select(
+                ListingCustomFields.custom_field_id, ListingCustomFields.value, ListingCustomFields.value_number
+            ).where(ListingCustomFields.listing_id == listing_id)
+        )
+        return {custom_field_id: (value, number) for custom_field_id, value, number in result}
+
+
+@pytest.fixture()
+def writes() -> Iterator[list[tuple[int, str, Any]]]:
+    """The listing_custom_fields writes, with the number of the transaction they ran in."""
+    instrument_engine(get_engine())
+    engine = get_engine().sync_engine
+    recorded: list[tuple[int, str, Any]] = []
+    transactions = 0
+
+    def begin(conn: Any) -> None:
+        nonlocal transactions
+        transactions += 1
+
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        if statement.startswith(_WRITES):
+            recorded.append((transactions, statement.split()[0], parameters))
+
+    event.listen(engine, "begin", begin)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield recorded
+    event.remove(engine, "begin", begin)
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.mark.asyncio
+async def test_update_listing_writes_only_the_changed_values(
+    categories: dict[str, Any], writes: list[tuple[int, str, Any]]
+) -> None:
+    c = categories
+    listing = await ListingDao.create_listing(
+        _listing(c["cars"], {c["color"]: "red", c["year"]: "2010", c["doors"]: "4"})
+    )
+    writes.clear()
+
+    with track_queries() as stats:
+        await ListingDao.update_listing(
+            listing.id, _listing(c["cars"], {c["color"]: "red", c["year"]: "2012", c["fuel"]: "diesel"})
+        )
+
+    # one statement per kind of change, the unchanged color is not written
+    assert sorted(verb for _, verb, _ in writes) == ["DELETE", "INSERT", "UPDATE"]
+    assert sum(n for statement, n in stats.statements.items() if statement.startswith(_WRITES)) == 3
+    parameters = {verb: parameters for _, verb, parameters in writes}
+    assert "2012" in parameters["UPDATE"]
+    assert c["doors"] in parameters["DELETE"]
+    assert "diesel" in parameters["INSERT"]
+    assert len({transaction for transaction, _, _ in writes}) == 1
+    assert await _values(listing.id) == {
+        c["color"]: ("red", None),
+        c["year"]: ("2012", 2012.0),
+        c["fuel"]: ("diesel", None),
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_listing_moves_the_listing_to_another_category(categories: dict[str, Any]) -> None:
+    c = categories
+    listing = await ListingDao.create_listing(_listing(c["cars"], {c["color"]: "red", c["doors"]: "4"}))
+    async with async_session() as session:
+        cars, vans = await counted_total(session, c["cars"]), await counted_total(session, c["vans"])
+
+    await ListingDao.update_listing(
+        listing.id, _listing(c["vans"], {c["color"]: "white", c["year"]: "2015"}, "Transit")
+    )
+
+    async with async_session() as session:
+        moved = await session.get(Listing, listing.id)
+        assert moved is not None
+        assert (moved.name, moved.category_id) == ("Transit", c["vans"])
+        assert await counted_total(session, c["cars"]) == cars - 1
+        assert await counted_total(session, c["vans"]) == vans + 1
+    assert await _values(listing.id) == {c["color"]: ("white", None), c["year"]: ("2015", 2015.0)}
+    document = (await ListingDao.get_listing_document(listing.id)).document
+    assert document["category"]["id"] == c["vans"]
+    assert {f["name"]: f["value"] for f in document["custom_fields"]} == {"color": "white", "year": "2015"}
+
+
+@pytest.mark.asyncio
+async def test_update_listing_with_an_invalid_value_leaves_the_listing_untouched(categories: dict[str, Any]) -> None:
+    c = categories
+    listing = await ListingDao.create_listing(_listing(c["cars"], {c["color"]: "red", c["year"]: "2010"}))
+
+    with pytest.raises(BadRequest):
+        await ListingDao.update_listing(
+            listing.id, _listing(c["cars"], {c["color"]: "blue", c["year"]: "two thousand"}, "Polo")
+        )
+
+    async with async_session() as session:
+        unchanged = await session.get(Listing, listing.id)
+        assert unchanged is not None
+        assert unchanged.name == "Golf"
+    assert await _values(listing.id) == {c["color"]: ("red", None), c["year"]: ("2010", 2010.0)}
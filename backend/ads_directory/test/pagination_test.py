@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from ads_directory.dao.pagination import decode_cursor, encode_cursor, next_cursor
+
+
+class Row:
+    def __init__(self, id: int, created_at: datetime):
+        self.id = id
+        self.created_at = created_at
+
+
+def test_cursor_round_trip() -> None:
+    created_at = datetime(2024, 6, 10, 22, 21, 21, 191585)
+
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor, 2) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(1, 2), encode_cursor({"dt": "yesterday"})])
+def test_invalid_cursor_is_a_bad_request(cursor: str) -> None:
+    with pytest.raises(BadRequest):
+        decode_cursor(cursor, 1)
+
+
+def test_next_cursor_only_for_full_pages() -> None:
+    rows = [Row(1, datetime(2024, 1, 1)), Row(2, datetime(2024, 1, 2))]
+
+    assert next_cursor(rows, 3, "id") is None
+    assert decode_cursor(next_cursor(rows, 2, "created_at", "id"), 2) == (datetime(2024, 1, 2), 2)
+
+
+def test_cursor_of_another_sort_is_a_bad_request() -> None:
+    rows = [Row(1, datetime(2024, 1, 1))]
+    cursor = next_cursor(rows, 1, "created_at", "id", sort="-created_at")
+
+    assert decode_cursor(cursor, 2, sort="-created_at") == (datetime(2024, 1, 1), 1)
+    with pytest.raises(BadRequest):
+        decode_cursor(cursor, 2, sort="created_at")
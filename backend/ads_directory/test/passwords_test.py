@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+from werkzeug.exceptions import ServiceUnavailable
+
+from ads_directory.passwords import PasswordHasher
+
+
+async def test_hash_and_check() -> None:
+    hasher = PasswordHasher(rounds=4, workers=2)
+
+    hashed = await hasher.hash("secret")
+
+    assert await hasher.check(hashed, "secret")
+    assert not await hasher.check(hashed, "other")
+
+
+async def test_rejects_calls_above_the_queue_limit() -> None:
+    hasher = PasswordHasher(rounds=10, workers=1, queue_limit=1)
+
+    results = await asyncio.gather(*(hasher.hash("secret") for _ in range(3)), return_exceptions=True)
+
+    assert [isinstance(r, ServiceUnavailable) for r in results] == [False, False, True]
+    assert hasher.stats()["pending"] == 0
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+async def test_flask_bcrypt_hashes_are_still_valid(workers: int) -> None:
+    # generated by flask_bcrypt.generate_password_hash("pass")
+    hashed = "$2b$04$D6WNr.oMPD1kD2zL8uLLOejGu0hJ50SPvEMo82PoKarD2uErz.aGy"
+
+    assert await PasswordHasher(workers=workers).check(hashed, "pass")
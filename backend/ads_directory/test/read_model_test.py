@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ads_directory.dao.read_model import listing_document, rename_category, rename_custom_field, row_document
+from ads_directory.models.models import Base, Category, CustomFields, Listing, ListingCustomFields, ListingDocument
+
+
+def _listing() -> Listing:
+    make = CustomFields(id=1, name="Car Make", type="text")
+    listing = Listing(
+        id=7,
+        name="Corolla",
+        description="Low mileage",
+        price=9500,
+        category=Category(id=3, name="Cars", description="Cars category"),
+        created_at=datetime(2024, 6, 10, 22, 21, 21, 191585),
+        updated_at=datetime(2024, 6, 10, 22, 21, 21, 191585),
+    )
+    listing.custom_fields_association.append(
+        ListingCustomFields(listing_id=7, custom_field_id=1, value="Toyota", custom_field=make)
+    )
+    return listing
+
+
+def test_document_embeds_the_category_and_the_custom_field_names() -> None:
+    assert listing_document(_listing()) == {
+        "id": 7,
+        "name": "Corolla",
+        "description": "Low mileage",
+        "price": 9500.0,
+        "custom_fields": [{"listing_id": 7, "custom_field_id": 1, "value": "Toyota", "name": "Car Make"}],
+        "category": {"id": 3, "name": "Cars", "description": "Cars category", "custom_fields": None},
+        "created_at": "2024-06-10T22:21:21.191585",
+        "updated_at": "2024-06-10T22:21:21.191585",
+    }
+
+
+def test_row_document_is_the_document_of_the_listing() -> None:
+    created_at = datetime(2024, 6, 10, 22, 21, 21, 191585)
+    category = Category(id=3, name="Cars", description="Cars category")
+    row = {"id": 7, "name": "Corolla", "description": "Low mileage", "price": 9500, "category_id": 3}
+    value = {"listing_id": 7, "custom_field_id": 1, "value": "Toyota", "value_number": None}
+    listing = Listing(**row, category=category, created_at=created_at, updated_at=created_at)
+    listing.custom_fields_association.append(
+        ListingCustomFields(**value, custom_field=CustomFields(id=1, name="Car Make", type="select"))
+    )
+
+    dated = {**row, "created_at": created_at, "updated_at": created_at}
+    assert row_document(dated, category, [value], {1: "Car Make"}) == listing_document(listing)
+
+
+@pytest.mark.asyncio
+async def test_renames_patch_the_documents() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    tables = [Listing.__table__, ListingCustomFields.__table__, ListingDocument.__table__]
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=tables)
+    session = async_sessionmaker(engine)
+    document = listing_document(_listing())
+
+    async with session.begin() as s:
+        await s.execute(
+            sa.insert(Listing), [{"id": 7, "name": "Corolla", "description": "", "price": 1, "category_id": 3}]
+        )
+        await s.execute(sa.insert(ListingCustomFields), [{"listing_id": 7, "custom_field_id": 1, "value": "Toyota"}])
+        await s.execute(sa.insert(ListingDocument), [{"listing_id": 7, "document": document}])
+        await rename_category(s, 3, "Autos", "Autos category")
+        await rename_custom_field(s, 1, "Make")
+
+    async with session() as s:
+        assert await s.scalar(sa.select(ListingDocument.document)) == {
+            **document,
+            "custom_fields": [{"listing_id": 7, "custom_field_id": 1, "value": "Toyota", "name": "Make"}],
+            "category": {"id": 3, "name": "Autos", "description": "Autos category", "custom_fields": None},
+        }
+    await engine.dispose()
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+from quart import Quart
+
+from ads_directory.database import routing
+from ads_directory.database.connection import async_session
+from ads_directory.database.routing import PRIMARY_COOKIE, init_app, on_primary, read_session
+
+REPLICAS = ["replica-1", "replica-2"]
+
+
+@pytest.fixture()
+def replicas(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    monkeypatch.setattr(routing, "replica_sessions", REPLICAS)
+    return REPLICAS
+
+
+@pytest.fixture()
+def routed_app(replicas: list[str]) -> Quart:
+    app = Quart(__name__)
+    init_app(app, window=5)
+
+    def target() -> str:
+        session = read_session()
+        return "primary" if session is async_session else str(session)
+
+    @app.route("/", methods=["GET", "POST"])
+    async def read() -> str:
+        return target()
+
+    @app.post("/invalid")
+    async def invalid() -> tuple[str, int]:
+        return target(), 400
+
+    return app
+
+
+def test_reads_rotate_across_the_replicas(replicas: list[str]) -> None:
+    sessions = [read_session() for _ in range(4)]
+
+    assert sessions[:2] == sessions[2:]
+    assert sorted(sessions[:2]) == replicas
+
+
+def test_on_primary_overrides_the_replicas(replicas: list[str]) -> None:
+    with on_primary():
+        assert read_session() is async_session
+    assert read_session() in replicas
+
+
+def test_reads_use_the_primary_without_replicas(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(routing, "replica_sessions", [])
+
+    assert read_session() is async_session
+
+
+@pytest.mark.asyncio
+async def test_writes_are_pinned_to_the_primary_and_set_the_cookie(routed_app: Quart) -> None:
+    client = routed_app.test_client()
+
+    response = await client.get("/")
+    assert await response.get_data(as_text=True) in REPLICAS
+    assert PRIMARY_COOKIE not in response.headers.get("Set-Cookie", "")
+
+    response = await client.post("/")
+    assert await response.get_data(as_text=True) == "primary"
+    assert PRIMARY_COOKIE in response.headers["Set-Cookie"]
+
+
+@pytest.mark.asyncio
+async def test_failed_writes_do_not_set_the_cookie(routed_app: Quart) -> None:
+    response = await routed_app.test_client().post("/invalid")
+
+    assert await response.get_data(as_text=True) == "primary"
+    assert PRIMARY_COOKIE not in response.headers.get("Set-Cookie", "")
+
+
+@pytest.mark.asyncio
+async def test_clients_that_wrote_recently_read_from_the_primary(routed_app: Quart) -> None:
+    client = routed_app.test_client()
+
+    client.set_cookie("localhost", PRIMARY_COOKIE, str(time.time() + 5))
+    assert await (await client.get("/")).get_data(as_text=True) == "primary"
+
+    client.set_cookie("localhost", PRIMARY_COOKIE, str(time.time() - 1))
+    assert await (await client.get("/")).get_data(as_text=True) in REPLICAS
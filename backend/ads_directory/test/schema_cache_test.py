@@ -0,0 +1,27 @@
+from ads_directory.dao.schema_cache import SchemaCache
+from ads_directory.models.models import Category
+
+
+def test_schema_cache_counts_hits_and_misses() -> None:
+    cache = SchemaCache()
+    cache.invalidate()
+    category = Category(id=1, name="Cars", description="Cars category")
+
+    assert cache.get(1) is None
+    cache.put(category, cache.version)
+
+    assert cache.get(1) is category
+    stats = cache.stats()
+    assert stats["size"] == 1
+    assert stats["hits"] >= 1 and stats["misses"] >= 1
+
+
+def test_schema_cache_drops_values_loaded_before_an_invalidation() -> None:
+    cache = SchemaCache()
+    cache.invalidate()
+    version = cache.version
+
+    cache.invalidate()
+    cache.put(Category(id=1, name="Cars", description="Cars category"), version)
+
+    assert cache.get(1) is None
@@ -0,0 +1,10 @@
+from ads_directory.dao.search import fts5_query
+
+
+def test_fts5_query_quotes_terms_and_prefixes_the_last_one() -> None:
+    assert fts5_query("red corolla") == '"red" "corolla"*'
+
+
+def test_fts5_query_ignores_fts5_syntax() -> None:
+    assert fts5_query('name:toyota NEAR("a" "b")') == '"name" "toyota" "NEAR" "a" "b"*'
+    assert fts5_query('"*') == ""
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from ads_directory import startup
+
+
+def test_import_times_are_read_from_the_importtime_lines() -> None:
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _io\n"
+        "import time:      2500 |       3000 | ads_directory.config\n"
+        "a warning\n"
+    )
+    assert startup.import_times(stderr) == [("_io", 0.00012), ("ads_directory.config", 0.0025)]
+
+
+def test_ready_workers_forget_the_workers_that_died(tmp_path: Path) -> None:
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    (tmp_path / dead.stdout.strip()).touch()
+
+    startup.mark_ready(str(tmp_path))
+    assert startup.is_ready()
+    assert startup.ready_workers(str(tmp_path)) == [os.getpid()]
+    assert [path.name for path in tmp_path.iterdir()] == [str(os.getpid())]
+
+    startup.mark_stopping(str(tmp_path))
+    assert not startup.is_ready()
+    assert startup.ready_workers(str(tmp_path)) == []
+
+
+def test_importing_the_app_loads_no_settings() -> None:
+    # the settings, the engine and the bcrypt thread pool are created when the app starts
+    check = (
+        "import ads_directory.app; from ads_directory.config import get_settings; "
+        "print(get_settings.cache_info().misses)"
+    )
+    child = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True)
+    assert child.stdout.strip() == "0"
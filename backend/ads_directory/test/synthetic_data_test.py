@@ -0,0 +1,67 @@
+from ads_directory.commands.synthetic_data import VERTICALS, GeneratedCategory, ListingGenerator
+from ads_directory.dao.read_model import listing_document
+from ads_directory.models.models import Category, CustomFields, Listing, ListingCustomFields
+
+
+def _categories() -> list[GeneratedCategory]:
+    categories, custom_field_ids = [], {}
+    for category_id, (name, vertical) in enumerate(VERTICALS.items(), 1):
+        fields = []
+        for spec in vertical.fields:
+            custom_field_id = custom_field_ids.setdefault(spec.name, len(custom_field_ids) + 1)
+            fields.append((CustomFields(id=custom_field_id, name=spec.name, type=spec.type), spec))
+        categories.append(GeneratedCategory(Category(id=category_id, name=name, description=name), vertical, fields))
+    return categories
+
+
+def test_the_same_seed_generates_the_same_rows_whatever_the_ids() -> None:
+    first = ListingGenerator(_categories(), seed=3).batch(1, 50)
+    again = ListingGenerator(_categories(), seed=3).batch(1001, 50)
+    other = ListingGenerator(_categories(), seed=4).batch(1, 50)
+
+    def without_ids(rows):
+        return [[{k: v for k, v in row.items() if k not in ("id", "listing_id")} for row in table] for table in rows]
+
+    assert without_ids(first)[:2] == without_ids(again)[:2]
+    assert first[0] != other[0]
+
+
+def test_custom_field_values_match_their_field() -> None:
+    categories = _categories()
+    specs = {c.id: spec for category in categories for c, spec in category.custom_fields}
+    listings, custom_fields, documents = ListingGenerator(categories).batch(1, 200)
+
+    assert [listing["id"] for listing in listings] == [document["listing_id"] for document in documents]
+    for value in custom_fields:
+        spec = specs[value["custom_field_id"]]
+        if spec.options:
+            assert value["value"] in spec.options and value["value_number"] is None
+        else:
+            assert spec.low <= value["value_number"] <= spec.high
+
+
+def test_documents_are_the_documents_of_the_read_model() -> None:
+    categories = _categories()
+    generator = ListingGenerator(categories)
+    listings, custom_fields, documents = generator.batch(1, 50)
+    by_id = {category.category.id: category.category for category in categories}
+    custom_field_types = {c.id: c.type for category in categories for c, _ in category.custom_fields}
+
+    for listing_row, document in zip(listings, documents):
+        listing = Listing(**listing_row, category=by_id[listing_row["category_id"]])
+        # the read model loads the values in no particular order
+        for value in reversed([v for v in custom_fields if v["listing_id"] == listing_row["id"]]):
+            custom_field = CustomFields(
+                id=value["custom_field_id"],
+                name=generator.field_names[value["custom_field_id"]],
+                type=custom_field_types[value["custom_field_id"]],
+            )
+            listing.custom_fields_association.append(
+                ListingCustomFields(
+                    listing_id=value["listing_id"],
+                    custom_field_id=value["custom_field_id"],
+                    value=value["value"],
+                    custom_field=custom_field,
+                )
+            )
+        assert document["document"] == listing_document(listing)
@@ -0,0 +1,34 @@
+from typing import AsyncIterator
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ads_directory.dao import user_dao
+from ads_directory.dao.user_dao import UserDao
+from ads_directory.models.models import User
+
+
+@pytest.fixture()
+async def users_database(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[async_sessionmaker]:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(User.__table__.create)
+    session = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(user_dao, "async_session", session)
+    yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_create_user_skips_a_taken_email(users_database: async_sessionmaker) -> None:
+    user = {"name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "password": "hash"}
+
+    user_id = await UserDao.create_user(**user)
+    duplicate_id = await UserDao.create_user(**{**user, "name": "Other", "password": "other"})
+
+    assert user_id is not None
+    assert duplicate_id is None
+    async with users_database() as s:
+        assert (await s.execute(sa.select(User.id, User.name))).all() == [(user_id, "Ada")]
+    assert await UserDao.get_credentials("ada@example.com") == (user_id, "hash")
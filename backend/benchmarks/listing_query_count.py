@@ -0,0 +1,110 @@
+"""
+Show that the listing endpoints run a constant number of queries whatever the page size.
+
+    PYTHONPATH=. poetry run python benchmarks/listing_query_count.py --listings 2000
+
+The benchmark runs against a throw-away sqlite database and never touches the configured one.
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+import time
+
+DATABASE = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+# must be set before ads_directory.config loads the settings
+os.environ["DATABASE_URI"] = f"sqlite+aiosqlite:///{DATABASE}"
+os.environ["DATABASE_ECHO"] = "false"
+os.environ["INSTRUMENTATION_ENABLED"] = "true"
+
+from sqlalchemy import insert  # noqa: E402
+
+from ads_directory.app import create_app  # noqa: E402
+from ads_directory.commands.rebuild_read_model import rebuild_documents  # noqa: E402
+from ads_directory.config import settings  # noqa: E402
+from ads_directory.dao.search import FTS_TABLE  # noqa: E402
+from ads_directory.database.connection import init_engine  # noqa: E402
+from ads_directory.models.models import (  # noqa: E402
+    Base,
+    Category,
+    CategoryCustomFields,
+    CustomFields,
+    Listing,
+    ListingCustomFields,
+)
+
+SERVER_TIMING = re.compile(r'dur=(?P<duration>[\d.]+);desc="(?P<queries>\d+) queries"')
+
+
+async def seed(listings: int) -> None:
+    async with init_engine().begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.exec_driver_sql(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, description)")
+        await connection.execute(insert(Category), [{"id": 1, "name": "Cars", "description": "Cars"}])
+        await connection.execute(
+            insert(CustomFields),
+            [
+                {"id": 1, "name": "Car Make", "type": "select", "description": "Car make"},
+                {"id": 2, "name": "Mileage", "type": "number", "description": "Mileage"},
+            ],
+        )
+        await connection.execute(
+            insert(CategoryCustomFields),
+            [{"category_id": 1, "custom_field_id": 1}, {"category_id": 1, "custom_field_id": 2}],
+        )
+        ids = range(1, listings + 1)
+        await connection.execute(
+            insert(Listing),
+            [{"id": i, "name": f"Car {i}", "description": "A car", "price": i, "category_id": 1} for i in ids],
+        )
+        await connection.execute(
+            insert(ListingCustomFields),
+            [{"listing_id": i, "custom_field_id": 1, "value": "Toyota"} for i in ids]
+            + [{"listing_id": i, "custom_field_id": 2, "value": str(i), "value_number": i} for i in ids],
+        )
+        await connection.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) SELECT id, name, description FROM listings"
+        )
+    # the listing pages are read from the listing documents
+    await rebuild_documents()
+
+
+async def main(listings: int, page_sizes: list[int], repeat: int) -> None:
+    await seed(listings)
+    app = create_app()
+    # instruments the engine and warms it up as when serving
+    await app.startup()
+    client = app.test_client()
+    base_path = settings.base_path
+
+    print(f"{'endpoint':<32}{'per_page':>10}{'queries':>10}{'db ms':>10}{'total ms':>10}")
+    for per_page in page_sizes:
+        for path in (
+            f"{base_path}/listings/?per_page={per_page}",
+            f"{base_path}/listings/search?q=car&per_page={per_page}",
+        ):
+            queries, db_ms, total_ms = 0, 0.0, 0.0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = await client.get(path)
+                total_ms += (time.perf_counter() - start) * 1000
+                timing = SERVER_TIMING.search(response.headers["Server-Timing"])
+                assert timing is not None
+                queries = int(timing.group("queries"))
+                db_ms += float(timing.group("duration"))
+            endpoint = path.replace(base_path, "").split("?")[0]
+            print(f"{endpoint:<32}{per_page:>10}{queries:>10}{db_ms / repeat:>10.2f}{total_ms / repeat:>10.2f}")
+
+    response = await client.get(f"{base_path}/listings/1")
+    print(f"{'/listings/<id>':<32}{1:>10}{response.headers['Server-Timing']:>30}")
+    await app.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=2000)
+    parser.add_argument("--per-page", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.listings, args.per_page, args.repeat))
@@ -0,0 +1,368 @@
+"""
+Load test the service with a weighted mix of requests and report the throughput and the
+latency percentiles of every route, to compare deploys and commits.
+
+    PYTHONPATH=. poetry run python benchmarks/loadtest.py --mix browse --concurrency 32 --duration 20
+    PYTHONPATH=. poetry run python benchmarks/loadtest.py --url http://127.0.0.1:8080 --mix mixed
+    PYTHONPATH=. poetry run python benchmarks/loadtest.py --mix browse --compare results/loadtest-<commit>.json
+
+Without --url the app runs in-process against a throw-away sqlite database seeded with
+--listings listings, and never touches the configured one. With --url the target must be
+seeded already (e.g. with the seed-db command) and --email/--password must log in.
+
+Every run writes a json result file, named after the commit, with the settings of the run
+and the statistics of each route. --compare runs the load test as usual and also prints
+the change of every route against a previous result file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+DATABASE = os.path.join(tempfile.mkdtemp(), "loadtest.db")
+# must be set before ads_directory.config loads the settings, only used in-process
+os.environ.setdefault("DATABASE_URI", f"sqlite+aiosqlite:///{DATABASE}")
+os.environ.setdefault("DATABASE_ECHO", "false")
+os.environ.setdefault("INSTRUMENTATION_ENABLED", "false")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
+import httpx  # noqa: E402
+
+EMAIL, PASSWORD = "loadtest@email.com", "pass"
+MAKES = ["Toyota", "Honda", "Ford", "Audi", "Fiat", "Opel", "Kia", "Seat"]
+
+# relative weights of the routes of each mix
+MIXES: dict[str, dict[str, int]] = {
+    "browse": {"listings": 50, "listings_filtered": 20, "listing": 20, "categories": 10},
+    "mixed": {
+        "listings": 35,
+        "listings_filtered": 15,
+        "listing": 15,
+        "categories": 10,
+        "login": 5,
+        "create_listing": 10,
+        "update_listing": 10,
+    },
+    "write": {"listing": 20, "create_listing": 40, "update_listing": 40},
+    "login": {"login": 80, "listings": 20},
+}
+
+
+@dataclass
+class Dataset:
+    """What the routes pick from, discovered on the target before the run."""
+
+    base_path: str
+    email: str
+    password: str
+    categories: list[dict[str, Any]] = field(default_factory=list)
+    listings: list[dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, seconds: float) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "rps": round(len(latencies) / seconds, 1),
+            "mean_ms": round(statistics.fmean(latencies), 2) if latencies else None,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": round(latencies[-1], 2) if latencies else None,
+        }
+
+
+def percentile(latencies: list[float], p: float) -> float | None:
+    # nearest rank, `latencies` is sorted
+    if not latencies:
+        return None
+    return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+
+def git_commit() -> dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=False).stdout.strip()
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked=no"))}
+
+
+Route = Callable[[httpx.AsyncClient, Dataset, random.Random], Awaitable[httpx.Response]]
+
+
+def listing_payload(listing: dict[str, Any], rng: random.Random) -> dict[str, Any]:
+    return {
+        "name": listing["name"],
+        "description": listing["description"],
+        "price": round(rng.uniform(100, 50000), 2),
+        "category_id": listing["category"]["id"],
+        "custom_fields": [{"id": c["custom_field_id"], "value": c["value"]} for c in listing["custom_fields"]],
+    }
+
+
+async def listings(client: httpx.AsyncClient, data: Dataset, rng: random.Random) -> httpx.Response:
+    return await client.get(f"{data.base_path}/listings/", params={"per_page": 20, "page": rng.randint(1, 5)})
+
+
+async def listings_filtered(client: httpx.AsyncClient, data: Dataset, rng: random.Random) -> httpx.Response:
+    params: dict[str, Any] = {"per_page": 20, "sort": rng.choice(["price", "-price", "-created_at"])}
+    if data.categories:
+        params["category_id"] = rng.choice(data.categories)["id"]
+    if rng.random() < 0.5:
+        params["price_max"] = rng.choice([1000, 10000, 30000])
+    else:
+        params["cf[Make]"] = rng.choice(MAKES)
+    return await client.get(f"{data.base_path}/listings/", params=params)
+
+
+async def listing(client: httpx.AsyncClient, data: Dataset, rng: random.Random) -> httpx.Response:
+    return await client.get(f"{data.base_path}/listings/{rng.choice(data.listings)['id']}")
+
+
+async def categories(client: httpx.AsyncClient, data: Dataset, rng: random.Random) -> httpx.Response:
+    return await client.get(f"{data.base_path}/categories/", params={"per_page": 20})
+
+
+async def login(client: httpx.AsyncClient, data: Dataset, rng: random.Random) -> httpx.Response:
+    return await client.post(f"{data.base_path}/login", json={"email": data.email, "password": data.password})
+
+
+async def create_listing(client: httpx.AsyncClient, data: Dataset, rng: random.Random) -> httpx.Response:
+    payload = listing_payload(rng.choice(data.listings), rng)
+    payload["name"] = f"Load test {rng.getrandbits(32):08x}"
+    return await client.post(f"{data.base_path}/listings/", json=payload)
+
+
+async def update_listing(client: httpx.AsyncClient, data: Dataset, rng: random.Random) -> httpx.Response:
+    listing = rng.choice(data.listings)
+    return await client.put(f"{data.base_path}/listings/{listing['id']}", json=listing_payload(listing, rng))
+
+
+ROUTES: dict[str, Route] = {
+    "listings": listings,
+    "listings_filtered": listings_filtered,
+    "listing": listing,
+    "categories": categories,
+    "login": login,
+    "create_listing": create_listing,
+    "update_listing": update_listing,
+}
+
+
+async def seed(listings_count: int, categories_count: int, bcrypt_rounds: int) -> None:
+    """Seed the migrated database, the listings through the DAO which maintains their read models."""
+    from sqlalchemy import insert
+
+    from ads_directory.dao.ListingDao import ListingDao
+    from ads_directory.database.connection import async_session, init_engine
+    from ads_directory.models.models import Category, CategoryCustomFields, CustomFields, User
+    from ads_directory.passwords import hash_password
+
+    init_engine()
+    rng = random.Random(0)
+    async with async_session.begin() as session:
+        await session.execute(
+            insert(User),
+            [{"name": "Load", "last_name": "Test", "email": EMAIL, "password": hash_password(PASSWORD, bcrypt_rounds)}],
+        )
+        await session.execute(insert(CustomFields), [{"id": 1, "name": "Make", "type": "text", "description": "Make"}])
+        await session.execute(
+            insert(Category),
+            [{"id": i, "name": f"Category {i}", "description": "Seeded"} for i in range(1, categories_count + 1)],
+        )
+        await session.execute(
+            insert(CategoryCustomFields),
+            [{"category_id": i, "custom_field_id": 1} for i in range(1, categories_count + 1)],
+        )
+
+    for start in range(0, listings_count, 1000):
+        await ListingDao.bulk_create_listings(
+            [
+                (
+                    {
+                        "name": f"Listing {i}",
+                        "description": f"A seeded listing number {i}",
+                        "price": round(rng.uniform(100, 50000), 2),
+                        "category_id": rng.randint(1, categories_count),
+                    },
+                    [{"custom_field_id": 1, "value": rng.choice(MAKES), "value_number": None}],
+                )
+                for i in range(start, min(start + 1000, listings_count))
+            ]
+        )
+
+
+async def discover(client: httpx.AsyncClient, base_path: str, email: str, password: str, sample: int) -> Dataset:
+    data = Dataset(base_path, email, password)
+    response = await client.get(f"{base_path}/categories/", params={"per_page": 100})
+    response.raise_for_status()
+    data.categories = response.json()["categories"]
+    cursor = None
+    while len(data.listings) < sample:
+        params = {"per_page": 100, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(f"{base_path}/listings/", params=params)
+        response.raise_for_status()
+        page = response.json()
+        data.listings.extend(page["listings"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    if not data.listings:
+        raise SystemExit("The target has no listings, seed it first")
+    return data
+
+
+async def run(
+    client: httpx.AsyncClient,
+    data: Dataset,
+    mix: dict[str, int],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> tuple[dict[str, RouteStats], float]:
+    """Run `concurrency` closed loop clients, each sending its next request once it got the last response."""
+    names, weights = list(mix), list(mix.values())
+    stats = {name: RouteStats() for name in names}
+    started = time.perf_counter()
+    measured_from, deadline = started + warmup, started + warmup + duration
+
+    async def user(index: int) -> None:
+        rng = random.Random(seed + index)
+        while (now := time.perf_counter()) < deadline:
+            name = rng.choices(names, weights)[0]
+            try:
+                response = await ROUTES[name](client, data, rng)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if now >= measured_from:
+                stats[name].latencies.append((time.perf_counter() - now) * 1000)
+                stats[name].errors += failed
+
+    await asyncio.gather(*(user(index) for index in range(concurrency)))
+    return stats, time.perf_counter() - measured_from
+
+
+def print_report(result: dict[str, Any], previous: dict[str, Any] | None) -> None:
+    def change(route: str, key: str) -> str:
+        if previous is None or previous["routes"].get(route, {}).get(key) in (None, 0):
+            return ""
+        before, after = previous["routes"][route][key], result["routes"][route][key]
+        return f" ({(after - before) / before:+.0%})"
+
+    print(f"{result['target']}, mix {result['mix']}, {result['concurrency']} clients for {result['duration']}s")
+    print(f"{'route':<20}{'requests':>10}{'errors':>8}{'rps':>16}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}")
+    for route, summary in result["routes"].items():
+        print(
+            f"{route:<20}{summary['requests']:>10}{summary['errors']:>8}"
+            f"{str(summary['rps']) + change(route, 'rps'):>16}"
+            + "".join(f"{str(summary[key]) + change(route, key):>18}" for key in ("p50_ms", "p95_ms", "p99_ms"))
+        )
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    if args.url:
+        base_path = args.base_path
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        app = None
+    else:
+        from ads_directory.app import create_app
+        from ads_directory.config import settings
+
+        await seed(args.listings, args.categories, args.bcrypt_rounds)
+        base_path = settings.base_path
+        app = create_app()
+        await app.startup()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=args.timeout
+        )
+
+    try:
+        data = await discover(client, base_path, args.email, args.password, args.sample)
+        stats, seconds = await run(
+            client, data, MIXES[args.mix], args.concurrency, args.duration, args.warmup, args.seed
+        )
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.shutdown()
+
+    total = RouteStats()
+    for route in stats.values():
+        total.latencies.extend(route.latencies)
+        total.errors += route.errors
+    return {
+        **git_commit(),
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "target": args.url or "in-process",
+        "mix": args.mix,
+        "weights": MIXES[args.mix],
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "seed": args.seed,
+        "dataset": {"listings": args.listings, "categories": args.categories} if not args.url else None,
+        "python": platform.python_version(),
+        "routes": {name: route.summary(seconds) for name, route in stats.items()},
+        "total": total.summary(seconds),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Load test a running instance instead of the app in-process")
+    parser.add_argument("--base-path", default="/api/ads", help="The base path of the running instance")
+    parser.add_argument("--email", default=EMAIL, help="The user of the login route")
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--mix", choices=MIXES, default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds measured, after the warm-up")
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random choices of the clients")
+    parser.add_argument("--sample", type=int, default=500, help="Listings discovered for the detail and write routes")
+    parser.add_argument("--listings", type=int, default=5000, help="Listings seeded in-process")
+    parser.add_argument("--categories", type=int, default=10, help="Categories seeded in-process")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="Work factor of the seeded password hash")
+    parser.add_argument("--output", help="The result file, results/loadtest-<commit>-<time>.json by default")
+    parser.add_argument("--compare", help="A previous result file to compare this run with")
+    args = parser.parse_args()
+
+    if not args.url:
+        from alembic import command
+        from alembic.config import Config
+
+        # before the event loop starts, the migrations run their own
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+        config = Config(os.path.join(root, "alembic.ini"))
+        config.set_main_option("script_location", os.path.join(root, "migrations"))
+        command.upgrade(config, "head")
+
+    result = asyncio.run(main(args))
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(result, previous)
+
+    output = args.output or os.path.join(
+        "results", f"loadtest-{(result['commit'] or 'unknown')[:12]}-{result['started_at'].replace(':', '')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Wrote {output}")
@@ -0,0 +1,129 @@
+"""
+Measure the latency of the listing page while a storm of logins hashes passwords, with bcrypt
+running on the event loop (--workers 0, the old behaviour) and in the password hashing pool.
+
+    PYTHONPATH=. poetry run python benchmarks/login_storm.py --concurrency 32 --seconds 5
+
+The benchmark runs against a throw-away sqlite database and never touches the configured one.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+DATABASE = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+# must be set before ads_directory.config loads the settings
+os.environ["DATABASE_URI"] = f"sqlite+aiosqlite:///{DATABASE}"
+os.environ["DATABASE_ECHO"] = "false"
+os.environ["INSTRUMENTATION_ENABLED"] = "false"
+os.environ["CACHE_BACKEND"] = "memory"
+
+from sqlalchemy import insert  # noqa: E402
+
+from ads_directory import routes  # noqa: E402
+from ads_directory.app import create_app  # noqa: E402
+from ads_directory.commands.rebuild_read_model import rebuild_documents  # noqa: E402
+from ads_directory.config import settings  # noqa: E402
+from ads_directory.database.connection import init_engine  # noqa: E402
+from ads_directory.models.models import Base, Category, Listing, User  # noqa: E402
+from ads_directory.passwords import PasswordHasher, hash_password  # noqa: E402
+
+EMAIL, PASSWORD = "storm@email.com", "pass"
+
+
+async def seed() -> None:
+    async with init_engine().begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(
+            insert(User),
+            [
+                {
+                    "name": "Storm",
+                    "last_name": "User",
+                    "email": EMAIL,
+                    "password": hash_password(PASSWORD, settings.security.BCRYPT_ROUNDS),
+                }
+            ],
+        )
+        await connection.execute(insert(Category), [{"id": 1, "name": "Cars", "description": "Cars"}])
+        await connection.execute(
+            insert(Listing),
+            [
+                {"id": i, "name": f"Car {i}", "description": "A car", "price": i, "category_id": 1}
+                for i in range(1, 101)
+            ],
+        )
+    # the listing pages are read from the listing documents
+    await rebuild_documents()
+
+
+def percentile(values: list[float], p: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(client, concurrency: int, seconds: float) -> tuple[list[float], int, int]:
+    """Latencies of the listing page while `concurrency` clients log in, and the logins done and rejected."""
+    base_path = settings.base_path
+    deadline = time.perf_counter() + seconds
+    logins, rejected = 0, 0
+
+    async def login() -> None:
+        nonlocal logins, rejected
+        while time.perf_counter() < deadline:
+            response = await client.post(f"{base_path}/login", json={"email": EMAIL, "password": PASSWORD})
+            if response.status_code == 503:
+                rejected += 1
+            else:
+                logins += 1
+
+    async def browse() -> list[float]:
+        latencies = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get(f"{base_path}/listings/?per_page=20")
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.01)
+        return latencies
+
+    storm = [asyncio.create_task(login()) for _ in range(concurrency)]
+    latencies = await browse()
+    await asyncio.gather(*storm)
+    return latencies, logins, rejected
+
+
+async def main(concurrency: int, seconds: float, workers: list[int]) -> None:
+    await seed()
+    app = create_app()
+    await app.startup()
+    client = app.test_client()
+
+    baseline, _, _ = await run(client, 0, 1)
+    print(f"bcrypt rounds {settings.security.BCRYPT_ROUNDS}, {concurrency} concurrent logins for {seconds}s")
+    print(f"{'mode':<16}{'logins/s':>10}{'rejected':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    print(
+        f"{'no logins':<16}{'':>10}{'':>10}{statistics.median(baseline):>10.2f}"
+        f"{percentile(baseline, 0.95):>10.2f}{max(baseline):>10.2f}"
+    )
+    for count in workers:
+        hasher = PasswordHasher(
+            rounds=settings.security.BCRYPT_ROUNDS, workers=count, queue_limit=settings.security.HASH_QUEUE_LIMIT
+        )
+        routes.get_password_hasher = lambda hasher=hasher: hasher
+        latencies, logins, rejected = await run(client, concurrency, seconds)
+        mode = f"{count} threads" if count else "event loop"
+        print(
+            f"{mode:<16}{logins / seconds:>10.1f}{rejected:>10}{statistics.median(latencies):>10.2f}"
+            f"{percentile(latencies, 0.95):>10.2f}{max(latencies):>10.2f}"
+        )
+    await app.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, settings.security.HASH_WORKERS])
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.seconds, args.workers))
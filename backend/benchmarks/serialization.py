@@ -0,0 +1,94 @@
+"""
+Compare the pydantic list response path with the orjson fast path of ads_directory.serialization.
+
+    PYTHONPATH=. poetry run python benchmarks/serialization.py --per-page 100
+
+No database is needed, the listings are built in memory.
+"""
+import argparse
+import asyncio
+import timeit
+from datetime import datetime
+
+import orjson
+
+from ads_directory.app import create_app
+from ads_directory.blueprints.schema import CategorySchema, ListingCustomFieldSchema, ListingRecordSchema
+from ads_directory.models.models import Category, CustomFields, Listing, ListingCustomFields
+from ads_directory.serialization import listing_to_dict
+
+
+def listing_record(listing: Listing) -> ListingRecordSchema:
+    # what the handlers built before the orjson path
+    return ListingRecordSchema(
+        id=listing.id,
+        name=listing.name,
+        description=listing.description,
+        price=listing.price,
+        category=CategorySchema(
+            id=listing.category.id, name=listing.category.name, description=listing.category.description
+        ),
+        custom_fields=[
+            ListingCustomFieldSchema(
+                listing_id=c.listing_id, custom_field_id=c.custom_field_id, value=c.value, name=c.custom_field.name
+            )
+            for c in listing.custom_fields_association
+        ],
+        created_at=listing.created_at,
+        updated_at=listing.updated_at,
+    )
+
+
+def build_listings(per_page: int) -> list[Listing]:
+    category = Category(id=1, name="Cars", description="Cars category")
+    make = CustomFields(id=1, name="Car Make", type="text")
+    fuel = CustomFields(id=2, name="Fuel", type="text")
+    listings = []
+    for i in range(per_page):
+        listing = Listing(
+            id=i,
+            name=f"Car {i}",
+            description="A well kept car with low mileage",
+            price=1000.0 + i,
+            category=category,
+            created_at=datetime(2024, 6, 10, 22, 21, 21, 191585),
+            updated_at=datetime(2024, 6, 10, 22, 21, 21, 191585),
+        )
+        listing.custom_fields_association = [
+            ListingCustomFields(listing_id=i, custom_field_id=1, value="Toyota", custom_field=make),
+            ListingCustomFields(listing_id=i, custom_field_id=2, value="Petrol", custom_field=fuel),
+        ]
+        listings.append(listing)
+    return listings
+
+
+async def main(per_page: int, number: int) -> None:
+    app = create_app()
+    listings = build_listings(per_page)
+
+    async with app.app_context():
+
+        def pydantic_path() -> bytes:
+            # what the handlers did: schema objects encoded by the app json provider
+            payload = {"listings": [listing_record(listing) for listing in listings], "next_cursor": None}
+            return app.json.dumps(payload).encode("utf-8")
+
+        def orjson_path() -> bytes:
+            return orjson.dumps({"listings": [listing_to_dict(listing) for listing in listings], "next_cursor": None})
+
+        assert orjson.loads(pydantic_path()) == orjson.loads(orjson_path()), "the two paths must produce the same json"
+
+        results = {}
+        for name, path in (("pydantic", pydantic_path), ("orjson", orjson_path)):
+            seconds = min(timeit.repeat(path, number=number, repeat=5)) / number
+            results[name] = seconds
+            print(f"{name:<10} {seconds * 1000:8.3f} ms per page of {per_page}")
+        print(f"speedup    {results['pydantic'] / results['orjson']:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.per_page, args.number))
@@ -0,0 +1,23 @@
+"""listings updated_at index
+
+Revision ID: 0e6a4f8c2d95
+Revises: 9d4c0b6f3a17
+Create Date: 2026-10-18 12:48:55.093412
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0e6a4f8c2d95"
+down_revision = "9d4c0b6f3a17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # serves the updated_since filter of the listings export
+    op.create_index("ix_listings_updated_at", "listings", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_listings_updated_at", table_name="listings")
@@ -0,0 +1,29 @@
+"""unique user email
+
+Revision ID: 3f7b9e1c5a28
+Revises: 0e6a4f8c2d95
+Create Date: 2026-10-18 15:02:17.408126
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f7b9e1c5a28"
+down_revision = "0e6a4f8c2d95"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # registration used to check for the email and insert in two transactions, so a race may have
+    # left duplicates behind, they have to be merged by hand rather than dropped here
+    result = op.get_bind().execute(sa.text("SELECT email FROM users GROUP BY email HAVING count(*) > 1"))
+    duplicates = result.scalars().all()
+    if duplicates:
+        raise RuntimeError(f"Cannot add a unique index on users.email, duplicated emails: {', '.join(duplicates)}")
+    op.create_index("ix_users_email", "users", ["email"], unique=True, postgresql_include=["id", "password"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email", table_name="users")
@@ -0,0 +1,62 @@
+"""typed custom field values
+
+Revision ID: 5b3e7d2a91c4
+Revises: c1f80aef9e04
+Create Date: 2026-10-18 10:03:17.551620
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b3e7d2a91c4"
+down_revision = "c1f80aef9e04"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("listing_custom_fields", sa.Column("value_number", sa.Float(), nullable=True))
+    # backfill the typed column for the existing values of numeric custom fields, the values
+    # that are not numbers stay NULL instead of failing the cast (postgres) or becoming 0 (sqlite)
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text(
+            "SELECT listing_id, custom_field_id, value FROM listing_custom_fields "
+            "WHERE custom_field_id IN (SELECT id FROM custom_fields WHERE type = 'number')"
+        )
+    )
+    numbers = []
+    for listing_id, custom_field_id, value in rows:
+        try:
+            number = float(value)
+        except ValueError:
+            continue
+        numbers.append({"listing_id": listing_id, "custom_field_id": custom_field_id, "number": number})
+    if numbers:
+        bind.execute(
+            sa.text(
+                "UPDATE listing_custom_fields SET value_number = :number "
+                "WHERE listing_id = :listing_id AND custom_field_id = :custom_field_id"
+            ),
+            numbers,
+        )
+    op.create_index(
+        "ix_listing_custom_fields_field_value",
+        "listing_custom_fields",
+        ["custom_field_id", "value", "listing_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_listing_custom_fields_field_number",
+        "listing_custom_fields",
+        ["custom_field_id", "value_number", "listing_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_listing_custom_fields_field_number", table_name="listing_custom_fields")
+    op.drop_index("ix_listing_custom_fields_field_value", table_name="listing_custom_fields")
+    with op.batch_alter_table("listing_custom_fields") as batch_op:
+        batch_op.drop_column("value_number")
@@ -0,0 +1,29 @@
+"""listing filter indexes
+
+Revision ID: 7a2d5e9b4c61
+Revises: 3f7b9e1c5a28
+Create Date: 2026-10-18 15:42:07.218554
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7a2d5e9b4c61"
+down_revision = "3f7b9e1c5a28"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # the category and price filters of the listing page, each ending with the keyset of a sort
+    op.create_index("ix_listings_category_id_price_id", "listings", ["category_id", "price", "id"], unique=False)
+    op.create_index(
+        "ix_listings_category_id_created_at_id", "listings", ["category_id", "created_at", "id"], unique=False
+    )
+    op.create_index("ix_listings_price_id", "listings", ["price", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_listings_price_id", table_name="listings")
+    op.drop_index("ix_listings_category_id_created_at_id", table_name="listings")
+    op.drop_index("ix_listings_category_id_price_id", table_name="listings")
@@ -0,0 +1,41 @@
+"""full text search
+
+Revision ID: 9d4c0b6f3a17
+Revises: 5b3e7d2a91c4
+Create Date: 2026-10-18 11:26:02.870314
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "9d4c0b6f3a17"
+down_revision = "5b3e7d2a91c4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # the text index is kept in sync by ListingDao, see ads_directory/dao/search.py
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.add_column("listings", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True))
+        op.execute(
+            "UPDATE listings SET search_vector = "
+            "setweight(to_tsvector('simple', name), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+        )
+        op.create_index("ix_listings_search_vector", "listings", ["search_vector"], postgresql_using="gin")
+    elif dialect == "sqlite":
+        op.execute("CREATE VIRTUAL TABLE listings_fts USING fts5(name, description)")
+        op.execute("INSERT INTO listings_fts (rowid, name, description) SELECT id, name, description FROM listings")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_listings_search_vector", table_name="listings")
+        op.drop_column("listings", "search_vector")
+    elif dialect == "sqlite":
+        op.execute("DROP TABLE listings_fts")
@@ -0,0 +1,36 @@
+"""category listing counts
+
+Revision ID: b8e1f3a6d042
+Revises: 7a2d5e9b4c61
+Create Date: 2026-10-18 16:20:31.604127
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b8e1f3a6d042"
+down_revision = "7a2d5e9b4c61"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # maintained by ListingDao from now on, see ads_directory/dao/listing_counts.py
+    op.create_table(
+        "category_listing_counts",
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["category_id"], ["categories.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("category_id"),
+    )
+    op.execute(
+        "INSERT INTO category_listing_counts (category_id, count, created_at, updated_at) "
+        "SELECT category_id, count(*), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP FROM listings GROUP BY category_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("category_listing_counts")
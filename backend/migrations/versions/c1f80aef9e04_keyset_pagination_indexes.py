@@ -0,0 +1,23 @@
+"""keyset pagination indexes
+
+Revision ID: c1f80aef9e04
+Revises: 68fa21e13ff4
+Create Date: 2026-10-18 09:12:41.402113
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c1f80aef9e04"
+down_revision = "68fa21e13ff4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # categories and custom fields seek on their primary key, listings seek on (created_at, id)
+    op.create_index("ix_listings_created_at_id", "listings", ["created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_listings_created_at_id", table_name="listings")
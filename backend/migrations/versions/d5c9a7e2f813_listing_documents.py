@@ -0,0 +1,32 @@
+"""listing documents
+
+Revision ID: d5c9a7e2f813
+Revises: b8e1f3a6d042
+Create Date: 2026-10-18 17:05:48.930261
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d5c9a7e2f813"
+down_revision = "b8e1f3a6d042"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # the documents are rendered by the application, backfill them with `quart rebuild-read-model --missing`
+    op.create_table(
+        "listing_documents",
+        sa.Column("listing_id", sa.Integer(), nullable=False),
+        sa.Column("document", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["listing_id"], ["listings.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("listing_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("listing_documents")
@@ -0,0 +1,44 @@
+"""jobs
+
+Revision ID: e2a8c4b7f190
+Revises: d5c9a7e2f813
+Create Date: 2026-10-18 18:12:40.517306
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e2a8c4b7f190"
+down_revision = "d5c9a7e2f813"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(length=100), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_by", sa.String(length=100), nullable=True),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # the workers take the due jobs of a type, and count its running ones, with the first index
+    op.create_index("ix_jobs_type_status_run_at", "jobs", ["type", "status", "run_at"], unique=False)
+    op.create_index("ix_jobs_status_updated_at", "jobs", ["status", "updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_status_updated_at", table_name="jobs")
+    op.drop_index("ix_jobs_type_status_run_at", table_name="jobs")
+    op.drop_table("jobs")
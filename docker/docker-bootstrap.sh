@@ -6,6 +6,9 @@ set -eo
 /app/docker/docker-init.sh
 
 echo "Starting docker bootstraping"
+# run the background job workers next to the app, they stop with the container
+echo "Starting the job worker\n"
+(cd /app/ads_directory && quart run-worker) &
 # run the app
 echo "Starting the app\n"
 /app/.venv/bin/hypercorn --config=hypercorn.toml ads_directory/asgi:app
@@ -5,4 +5,7 @@ alembic upgrade head
 
 # run the seed command
 cd /app/ads_directory
-quart seed-db
\ No newline at end of file
+quart seed-db
+
+# write the listing documents of the listings created before the read model
+quart rebuild-read-model --missing
\ No newline at end of file